@@ -15,8 +15,8 @@ import math
 from collections import Counter
 #import pygame
 import sys
-from battle_logger import battle_logger
-from ui import format_damage_log
+from battle_logger import battle_logger, BUFF, DAMAGE, INFO
+from ui import format_damage_log, format_effect_log
 
 
 class Buff(ABC):
@@ -50,6 +50,20 @@ class Buff(ABC):
         """
         return None
 
+    def next_tick_in(self):
+        """
+        距离下一次计时效果（跳伤、回血、到期）还有多少秒，供战斗调度器直接跳到该时刻。
+        返回 None 表示没有按时间触发的效果。
+        """
+        return None
+
+    def modify_stats(self, wearer):
+        """
+        施加或叠层时触发，用 wearer.add_modifier(属性, self, ...) 登记属性修正；
+        Buff 被移除时修正会自动撤销。
+        """
+        pass
+
     def before_take_damage(self, wearer, dmg):
         """受到伤害前触发，可修改 dmg"""
         return dmg
@@ -58,6 +72,10 @@ class Buff(ABC):
         """每次被攻击后触发"""
         pass
 
+    def after_take_damage(self, wearer, details):
+        """每次受到伤害（包括跳伤、反伤）结算完之后触发，details 为 take_damage 的伤害报告"""
+        pass
+
     def on_fatal(self, wearer):
         """
         临界（hp<=0）时触发一次，自救或其他
@@ -66,6 +84,58 @@ class Buff(ABC):
         return False
 
 
+class BuffContainer:
+    """
+    角色身上的 Buff 集合，按 Buff 类索引：同类 Buff 只保留一个实例，叠层记在实例上。
+    迭代顺序按 priority 从高到低，同优先级按施加先后；"是否禁手" 在施加/移除时维护，不必每帧扫描。
+    """
+    def __init__(self, buffs=()):
+        self._by_class = {}
+        self._ordered = ()
+        self._disable_attack = 0
+        for buff in buffs: self.add(buff)
+
+    def add(self, buff):
+        self._by_class[type(buff)] = buff
+        if buff.disable_attack: self._disable_attack += 1
+        self._reorder()
+
+    def remove(self, buff):
+        if self._by_class.get(type(buff)) is not buff:
+            raise ValueError(f"{buff!r} 不在 Buff 列表中")
+        del self._by_class[type(buff)]
+        if buff.disable_attack: self._disable_attack -= 1
+        self._reorder()
+
+    def clear(self):
+        self._by_class.clear()
+        self._ordered = ()
+        self._disable_attack = 0
+
+    def get(self, buff_class, default=None):
+        """按类取出身上的该 Buff 实例，没有则返回 default。"""
+        return self._by_class.get(buff_class, default)
+
+    def stacks(self, buff_class):
+        """某类 Buff 当前的层数，没有则为 0。"""
+        buff = self._by_class.get(buff_class)
+        return buff.stacks if buff is not None else 0
+
+    @property
+    def attack_disabled(self):
+        return self._disable_attack > 0
+
+    def _reorder(self):
+        # sorted 是稳定排序，字典保持插入顺序，所以同优先级按施加先后排列
+        self._ordered = tuple(sorted(self._by_class.values(), key=lambda b: -b.priority))
+
+    def __iter__(self): return iter(self._ordered)
+    def __len__(self): return len(self._ordered)
+    def __contains__(self, item):
+        if isinstance(item, type): return item in self._by_class
+        return self._by_class.get(type(item)) is item
+
+
 class SteelHeartBuff(Buff):
     """刚毅：受到致命伤时自救一次，可叠加"""
     display_name = "刚毅"
@@ -97,6 +167,9 @@ class RegenerationBuff(Buff):
         super().__init__(stacks=stacks)
         self._timer = 0.0  # 新增：秒计时器
 
+    def next_tick_in(self):
+        return 1.0 - self._timer
+
     def on_tick(self, wearer, dt):
         self._timer += dt  # 累加每帧的时间
         
@@ -125,6 +198,9 @@ class PoisonDebuff(Buff):
         super().__init__(stacks=stacks)
         self._timer = 0.0
 
+    def next_tick_in(self):
+        return 1.0 - self._timer
+
     def on_tick(self, wearer, dt):
         self._timer += dt
         while self._timer >= 1.0:
@@ -153,6 +229,9 @@ class AttackDisabledBuff(Buff):
         super().__init__(stacks=1)
         self.remaining = duration
 
+    def next_tick_in(self):
+        return self.remaining  # None 表示无限期禁手
+
     def on_tick(self, wearer, dt):
         if self.remaining is None:
             return None
@@ -176,11 +255,13 @@ class StunDebuff(Buff):
         super().__init__(duration_override=duration)
 
     def on_apply(self, wearer):
-        for b in wearer.buffs:
-            if b is not self and isinstance(b, StunDebuff):
-                b.remaining = max(b.remaining, self.remaining)
-                wearer.remove_buff(self)
-                return
+        existing = wearer.buffs.get(StunDebuff)
+        if existing is not None and existing is not self:
+            existing.remaining = max(existing.remaining, self.remaining)
+            wearer.remove_buff(self)
+
+    def next_tick_in(self):
+        return self.remaining
 
     def on_tick(self, wearer, dt):
         self.remaining -= dt
@@ -218,24 +299,41 @@ class PhoenixCrownStage1Buff(Buff):
         super().__init__(stacks=1)
         self._boosted = False
 
+    # 属性转换都登记在属性账本里（来源是这个 Buff），进入第二阶段、Buff 被移除时随之撤销。
+    # 原效果是直接把属性改成某个值，这里登记成 "目标值 - 当前值" 的加算修正，其余来源的修正照常叠加。
+
     def on_apply(self, wearer):
         bm = wearer.base_max_hp
-        wearer.max_hp = bm * 2
-        wearer.hp     = min(wearer.hp + bm, wearer.max_hp)
+        hp = wearer.hp
+        wearer.add_modifier("max_hp", self, flat=bm * 2 - wearer.max_hp)
+        wearer.recalculate_stats()
+        wearer.hp = min(hp + bm, wearer.max_hp)
+
+    def next_tick_in(self):
+        # 属性转换在第一次 tick 时生效，让调度器立即处理；之后在受伤时检查血线
+        return None if self._boosted else 0.0
+
+    def _check_threshold(self, wearer):
+        if wearer.hp > 0 and wearer.hp / wearer.max_hp <= 0.2:
+            lost = wearer.max_hp - wearer.hp  # 第二阶段反击的伤害按觉醒状态下损失的生命计算
+            wearer.remove_buff(self)
+            wearer.add_buff(PhoenixCrownStage2Buff(lost))
+
+    def after_take_damage(self, wearer, details):
+        # 血线在这一击结算时就检查，不等下一个计时事件
+        self._check_threshold(wearer)
 
     def on_tick(self, wearer, dt):
         if not self._boosted:
             bd = wearer.base_defense
             ba = wearer.base_attack
             bs = wearer.base_attack_speed
-            wearer.attack = ba + bd
-            wearer.attack_speed = bs + bd * 0.05
-            wearer.attack_interval = 6.0 / wearer.attack_speed
-            wearer.defense = 0
+            wearer.add_modifier("attack", self, flat=ba + bd - wearer.attack)
+            wearer.add_modifier("attack_speed", self, flat=bs + bd * 0.05 - wearer.attack_speed)
+            wearer.add_modifier("defense", self, mult=0)
+            wearer.recalculate_stats()
             self._boosted = True
-        if wearer.hp / wearer.max_hp <= 0.2:
-            wearer.remove_buff(self)
-            wearer.add_buff(PhoenixCrownStage2Buff())
+            self._check_threshold(wearer)  # 进战斗时血线就已经很低
         return None
 
 
@@ -248,10 +346,11 @@ class PhoenixCrownStage2Buff(Buff):
     is_debuff       = False
     disable_attack  = True
 
-    def __init__(self):
+    def __init__(self, damage_to_deal=None):
         super().__init__(stacks=1)
         # ### 核心修改 1：不再使用 _healed_total，改为 _damage_to_deal ###
-        self._damage_to_deal = 0.0
+        # 由第一阶段传入进入第二阶段时损失的生命；不传时在生效时按当前损失的生命计算
+        self._damage_to_deal = damage_to_deal
         self._rec_atk        = None
         self._rec_def        = None
         self._rec_as         = None
@@ -261,14 +360,19 @@ class PhoenixCrownStage2Buff(Buff):
     def on_apply(self, wearer):
         # ### 核心修改 2：在Buff生效时，立刻计算并储存应造成的总伤害 ###
         # 这个伤害值等于角色当时已损失的生命值。
-        self._damage_to_deal = wearer.max_hp - wearer.hp
+        if self._damage_to_deal is None: self._damage_to_deal = wearer.max_hp - wearer.hp
         
         # 保存角色属性 (这部分不变)
         self._rec_atk  = wearer.attack
         self._rec_def  = wearer.defense
         self._rec_as   = wearer.attack_speed
         self._rec_dr   = wearer.damage_resistance
-        wearer.damage_resistance = self._rec_dr + 0.5
+        # 减伤登记在属性账本里，反击后 Buff 移除时撤销
+        wearer.add_modifier("damage_resistance", self, flat=0.5)
+        wearer.recalculate_stats()
+
+    def next_tick_in(self):
+        return 1.0 - self._timer
 
     # 文件: Buffs.py (在 PhoenixCrownStage2Buff 类中，替换 on_tick 方法)
     def on_tick(self, wearer, dt):
@@ -293,8 +397,7 @@ class PhoenixCrownStage2Buff(Buff):
                 from ui import format_damage_log
                 packet = DamagePacket(total, DamageType.TRUE, source=wearer, is_sourceless=True)
                 damage_details = opponent.take_damage(packet)
-                log_parts = format_damage_log(damage_details, action_name="不灭反击")
-                battle_logger.log(log_parts)
+                battle_logger.emit(DAMAGE, INFO, format_damage_log, damage_details, "不灭反击")
 
             # ... (恢复属性的部分不变) ...
             wearer.remove_buff(self)
@@ -318,6 +421,9 @@ class BleedDebuff(Buff):
         super().__init__(stacks=stacks, duration_override=duration)
         self._timer = 0.0
 
+    def next_tick_in(self):
+        return min(1.0 - self._timer, self.remaining)
+
     def on_tick(self, wearer, dt):
         self._timer += dt
         if self._timer >= 1.0:
@@ -344,7 +450,7 @@ class BlockBuff(Buff):
 
     def before_take_damage(self, wearer, packet: DamagePacket): # <-- 参数改为 packet
         if self.stacks > 0 and packet.amount > 0:
-            print(f"[格挡] 效果触发！抵挡了 {int(packet.amount)} 点伤害。")
+            battle_logger.emit(BUFF, INFO, format_effect_log, "格挡", "效果触发！抵挡了 {} 点伤害。", int(packet.amount))
             self.stacks -= 1
             if self.stacks <= 0:
                 wearer.remove_buff(self)
@@ -370,6 +476,9 @@ class SunderDebuff(Buff):
     is_debuff    = True
     max_stacks   = 99
 
+    def modify_stats(self, wearer):
+        wearer.add_modifier("defense", self, flat=-self.stacks)
+
 class VitalityBloomBuff(Buff):
     """【生机绽放】(Buff): 受到伤害时，恢复等同于 层数 * 1% 最大生命值的生命。"""
     display_name = "生机绽放"
@@ -387,6 +496,9 @@ class WitheredCurseDebuff(Buff):
     is_debuff    = True
     duration     = 5.0 # 假设持续5秒
 
+    def next_tick_in(self):
+        return self.remaining
+
     def on_tick(self, wearer, dt):
         # 持续时间递减
         self.remaining -= dt
@@ -396,7 +508,7 @@ class WitheredCurseDebuff(Buff):
     def before_healed(self, wearer, amount):
         """这是一个新的自定义钩子，会在Character.heal中被调用"""
         if amount > 0:
-            print(f"[凋零咒印] {wearer.name} 的治疗被转化为了伤害！")
+            battle_logger.emit(BUFF, INFO, format_effect_log, "凋零咒印", "{} 的治疗被转化为了伤害！", wearer.name)
             from damage import DamagePacket, DamageType
             packet = DamagePacket(amount, DamageType.TRUE, is_sourceless=True)
             wearer.take_damage(packet)
@@ -407,11 +519,16 @@ class FrenzyBuff(Buff):
     display_name = "狂热"
     duration     = 8.0 # 假设持续8秒
 
+    def modify_stats(self, wearer):
+        wearer.add_modifier("attack_speed", self, mult=2)
+
+    def next_tick_in(self):
+        return self.remaining
+
     def on_tick(self, wearer, dt):
         self.remaining -= dt
         if self.remaining <= 0:
-            wearer.remove_buff(self)
-            wearer.recalculate_stats() # Buff消失后，需要重算属性
+            wearer.remove_buff(self) # 移除时攻速加成随之撤销
 
 class SunfireAuraDebuff(Buff):
     """【日炎灼烧】(Debuff): 每秒受到施加者最大生命值5%的真实伤害。"""
@@ -423,6 +540,9 @@ class SunfireAuraDebuff(Buff):
         self.source = source_char # 需要知道是谁施加的
         self._timer = 0.0
 
+    def next_tick_in(self):
+        return 1.0 - self._timer
+
     def on_tick(self, wearer, dt):
         self._timer += dt
         if self._timer >= 1.0:
@@ -437,6 +557,9 @@ class CovenantOfFateBuff(Buff):
     display_name = "命运契约"
     duration     = 10.0 # 假设持续10秒
 
+    def next_tick_in(self):
+        return self.remaining
+
     def on_tick(self, wearer, dt):
         self.remaining -= dt
         if self.remaining <= 0:
@@ -445,7 +568,7 @@ class CovenantOfFateBuff(Buff):
     def on_attacked(self, wearer, attacker, dmg):
         if attacker and attacker.hp > 0 and dmg > 0:
             from damage import DamagePacket, DamageType
-            print(f"[命运契约] 对 {attacker.name} 反弹了 {int(dmg)} 点真实伤害！")
+            battle_logger.emit(BUFF, INFO, format_effect_log, "命运契约", "对 {} 反弹了 {} 点真实伤害！", attacker.name, int(dmg))
             packet = DamagePacket(dmg, DamageType.TRUE, source=wearer)
             attacker.take_damage(packet)
             
@@ -458,5 +581,5 @@ class StormDebuff(Buff):
 
     def before_take_damage(self, wearer, packet: DamagePacket):
         if packet.amount > 0:
-            print(f"[风暴印记] 额外造成 {self.stacks} 点伤害！")
+            battle_logger.emit(BUFF, INFO, format_effect_log, "风暴印记", "额外造成 {} 点伤害！", self.stacks)
             packet.amount += self.stacks
\ No newline at end of file
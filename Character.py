@@ -1,8 +1,9 @@
 # Character.py (最终完整版)
-import pygame
 import sys
 import time
 import collections
+import contextlib
+import copy
 import math
 import random
 # from rich.console import Console  <- No longer needed
@@ -13,12 +14,51 @@ import Talents
 import Equips
 from damage import DamagePacket, DamageType
 from settings import CRYSTALS_PER_RARITY, RARITY_COLORS, UPGRADE_COST_PER_RARITY
-from ui import format_damage_log
+from stat_ledger import StatLedger
+from ui import format_damage_log, format_effect_log
+from battle_logger import battle_logger, DAMAGE, TALENT, SYSTEM, INFO, DEBUG
 
 RARITY_GOLD_VALUE = {"common": 10, "uncommon": 25, "rare": 60, "epic": 150, "legendary": 400, "mythic": 1000}
 
+# 基类上的空实现钩子：子类没有覆写时不放进分发表，省掉一次无意义的调用
+_NOOP_HOOKS = {getattr(base, name) for base in (Equips.Equipment, Buffs.Buff, Talents.Talent)
+               for name in dir(base) if name.startswith(("on_", "before_", "after_", "next_", "modify_"))}
+
+def _implements_hook(obj, name):
+    impl = getattr(type(obj), name, None)
+    return impl is not None and impl not in _NOOP_HOOKS
+
+# 装备上的加成字段 -> 属性账本中的装备合计属性
+ITEM_BONUS_STATS = {"hp_bonus": "base_max_hp", "def_bonus": "base_defense", "magic_resist_bonus": "base_magic_resist",
+                    "atk_bonus": "base_attack", "as_bonus": "base_attack_speed", "crit_bonus": "base_crit_chance",
+                    "crit_dmg_bonus": "base_crit_multiplier"}
+# 派生属性 -> 计入它的装备合计属性
+DERIVED_STATS = {"max_hp": "base_max_hp", "attack": "base_attack", "defense": "base_defense", "magic_resist": "base_magic_resist",
+                 "attack_speed": "base_attack_speed", "crit_chance": "base_crit_chance", "crit_multiplier": "base_crit_multiplier"}
+
+def _format_extra_text(text):
+    # 天赋 on_attack 返回的附加说明，显示为普攻下方的缩进行
+    return [("  └ ", (150, 150, 150)), (text, (150, 150, 150))]
+
 class Character:
     DEFAULT_SLOT_CAPACITY = {"weapon": 1, "offhand": 1, "helmet": 1, "armor": 1, "pants": 1, "accessory": 4}
+    # 钩子来源：equipment = 已装备的物品；items = 已装备 + 背包中的珍贵物品；talents = 已装备天赋；buffs = 身上的状态
+    HOOK_SOURCES = ("equipment", "items", "talents", "buffs")
+    # 暴击、装备/天赋触发等战斗随机数的来源；战斗引擎会注入本场战斗的独立流，未注入时退回全局 random 模块
+    rng = random
+    # 战斗回放录制器（replay.ReplayRecorder）；录制时由战斗引擎注入，平时为 None
+    recorder = None
+    # 钩子分析器（profiler.HookProfiler）；分析战斗性能时由战斗引擎注入，平时为 None
+    profiler = None
+    # 对方的全部角色（遭遇战里可能不止一个）；战斗中由战斗引擎设置，current_opponent 是其中当前的攻击目标
+    opponents = ()
+    current_opponent = None
+    # 批量换装的嵌套深度；大于 0 时 recalculate_stats() 只记下需要重算，到最外层 batch_loadout() 结束时统一重算
+    _loadout_batch = 0
+    _batch_dirty = False
+    _disabled_dt = 0.0  # 旧存档里没有这个字段
+    # 战斗调度器用：受伤、Buff 增减、属性变化等可能改变计时的事件发生后置为 True，调度器重新询问这个角色的计时源
+    timing_dirty = True
 
     def __init__(self, name, hp, defense, magic_resist, attack, attack_speed,
                 equipment=None, talents=None, id=None):
@@ -36,35 +76,34 @@ class Character:
         self.toughness = 5
         self.attribute_points = 0 # 可用属性点
 
-        self.base_max_hp, self.base_defense, self.base_magic_resist, self.base_attack, self.base_attack_speed = 0, 0, 0, 0, 0
-        self.base_crit_chance = 0.0
-        self.base_crit_multiplier = 1.5
-
         self.max_talent_slots = 3
         self.learned_talents = talents or []
         self.equipped_talents = [None] * self.max_talent_slots
-        self.buffs = []
+        self.buffs = Buffs.BuffContainer()
+        self._hook_tables = {source: {} for source in self.HOOK_SOURCES}  # 来源 -> {钩子名: (绑定方法, ...)}
         self.shield = 0
         self._cd = 0.0
-        self.damage_resistance = 0.0
+        self._disabled_dt = 0.0  # 上一次 update() 里处于禁手的时长，try_attack 用完即清零
 
         # --- 修改：innate (固有的) 属性现在代表角色的绝对基础值 ---
         self._innate_max_hp, self._innate_defense, self._innate_magic_resist, self._innate_attack, self._innate_attack_speed = hp, defense, magic_resist, attack, attack_speed
 
         self.slots = { slot: [None] * capacity for slot, capacity in self.SLOT_CAPACITY.items() }
+        self._setup_stat_ledger()
+        # 先用固有属性算一次，保证装备/天赋的 on_init 能读到 max_hp、attack 等派生属性
+        self.recalculate_stats()
 
-        for eq in (equipment or []):
-            if getattr(eq, 'slot', None) is not None: self.equip(eq)
-            else: self.backpack.append(eq)
-
-        initial_talents_to_equip = self.learned_talents[:]
-        self.learned_talents = [] 
+        with self.batch_loadout():
+            for eq in (equipment or []):
+                if getattr(eq, 'slot', None) is not None: self.equip(eq)
+                else: self.backpack.append(eq)
 
-        for talent in initial_talents_to_equip:
-            self.learn_talent(talent)
-            self.equip_talent(talent)
+            initial_talents_to_equip = self.learned_talents[:]
+            self.learned_talents = []
 
-        self.recalculate_stats()
+            for talent in initial_talents_to_equip:
+                self.learn_talent(talent)
+                self.equip_talent(talent)
         self.hp = self.max_hp
         
     def add_gold(self, amount, source=""):
@@ -101,12 +140,13 @@ class Character:
             return f"转化({item_name}): 获得了 {gold_value} G 和 {crystal_value} 淬炼结晶。"
         else:
             self.backpack.append(item_to_pickup)
+            self.invalidate_hooks("items")
             return f"物品「{item_name}」已放入你的背包。"
         
     def learn_talent(self, talent_to_learn):
         if not any(isinstance(t, talent_to_learn.__class__) for t in self.learned_talents):
             self.learned_talents.append(talent_to_learn)
-            print(f"学会了新天赋: {talent_to_learn.display_name}")
+            self._notify(f"学会了新天赋: {talent_to_learn.display_name}")
             return True
         return False
 
@@ -123,8 +163,9 @@ class Character:
             if 0 <= specific_index < self.max_talent_slots:
                 if self.equipped_talents[specific_index] is None:
                     self.equipped_talents[specific_index] = talent_to_equip
+                    self.invalidate_hooks("talents")
                     self.recalculate_stats()
-                    print(f"已装备天赋: {talent_to_equip.display_name} 到槽位 {specific_index}")
+                    self._notify(f"已装备天赋: {talent_to_equip.display_name} 到槽位 {specific_index}")
                     return True
                 else: # Slot is occupied, this should be handled by swap logic in the UI
                     return False 
@@ -134,8 +175,9 @@ class Character:
             try:
                 empty_index = self.equipped_talents.index(None)
                 self.equipped_talents[empty_index] = talent_to_equip
+                self.invalidate_hooks("talents")
                 self.recalculate_stats()
-                print(f"已装备天赋: {talent_to_equip.display_name} 到槽位 {empty_index}")
+                self._notify(f"已装备天赋: {talent_to_equip.display_name} 到槽位 {empty_index}")
                 return True
             except ValueError:
                 print("天赋槽已满！")
@@ -147,79 +189,258 @@ class Character:
         # Find the talent and replace it with None, instead of removing it
         index = self.equipped_talents.index(talent_to_unequip)
         self.equipped_talents[index] = None
+        self.invalidate_hooks("talents")
         self.recalculate_stats()
-        print(f"已卸下天赋: {talent_to_unequip.display_name}")
+        self._notify(f"已卸下天赋: {talent_to_unequip.display_name}")
         
     def on_enter_combat(self):
-        self.buffs.clear(); self.shield = 0; self._cd = 0.0;
+        for buff in self.buffs:
+            self.stat_ledger.remove(buff)
+        self.buffs.clear(); self.shield = 0; self._cd = 0.0; self._disabled_dt = 0.0
+        self.invalidate_hooks()  # 界面里可能直接改过背包，进战斗前整张表重建一次
 
         # 新增逻辑：重置装备的战斗内状态
         for eq in self.all_equipment:
             if isinstance(eq, Equips.AdventurersPouch):
                 eq.atk_bonus = 0 # 战斗准备时，将钱袋的加成清零
+                self._register_item(eq)
 
-        # 重置完后再重算一次属性，确保一个干净的状态
+        # 重置完后再重算一次属性，确保一个干净的状态；天赋的 on_init 也重新触发一次
+        self._sync_talent_modifiers(force=True)
         self.recalculate_stats() 
-        print(f"{self.name} 已进入战斗准备状态！")
+        battle_logger.emit(SYSTEM, DEBUG, format_effect_log, "战斗准备", "{} 已进入战斗准备状态！", self.name)
 
 # Character.py
 
     def update(self, dt) -> list[str]:
         texts = []
+        # 记下禁手 Buff 还剩多久：禁手在这一步中途结束时，只有结束之后的那段时间计入普攻冷却（见 try_attack）
+        disabled_for = None
+        if self.buffs.attack_disabled:
+            disabled_for = max(dt if b.remaining is None else b.remaining for b in self.buffs if b.disable_attack)
         # 这个函数只处理Buff和物品的计时效果
-        for item in self.all_active_items:
-            if hasattr(item, "on_tick"):
-                res = item.on_tick(self, dt)
-                if isinstance(res, str) and res:
-                    texts.append(res)
-        for buff in list(self.buffs):
-            if hasattr(buff, "on_tick"):
-                res = buff.on_tick(self, dt)
-                if isinstance(res, str) and res:
-                    texts.append(res)
+        for on_tick in self.hooks("items", "on_tick"):
+            res = on_tick(self, dt)
+            if isinstance(res, str) and res:
+                texts.append(res)
+        for on_tick in self.hooks("buffs", "on_tick"):
+            res = on_tick(self, dt)
+            if isinstance(res, str) and res:
+                texts.append(res)
+        self._disabled_dt = 0.0 if disabled_for is None else min(dt, max(0.0, disabled_for))
         return texts
     
-    def recalculate_stats(self):
-        hp_percent = self.hp / self.max_hp if hasattr(self, 'max_hp') and self.max_hp > 0 else 1
+    def _setup_stat_ledger(self):
+        self.stat_ledger = StatLedger()
+        self._ledger_items, self._ledger_talents = [], []
+        self.stat_ledger.set("crit_multiplier", "innate", 1.5, label="固有")
+        self.stat_ledger.set("damage_resistance", "innate", 0.0, label="固有")
+        self._sync_innate_and_attributes()
+        for stat, base_stat in DERIVED_STATS.items():
+            self.stat_ledger.link(base_stat, stat, "装备")
+
+    def _sync_innate_and_attributes(self):
+        # 数值没变时 set() 什么也不做，所以每次重算都同步一遍也很便宜
+        ledger = self.stat_ledger
+        for stat in ("max_hp", "attack", "defense", "magic_resist", "attack_speed"):
+            ledger.set(stat, "innate", getattr(self, "_innate_" + stat), label="固有")
+        ledger.set("max_hp", "attributes", self.vitality * 5, label="属性点")
+        ledger.set("attack", "attributes", self.strength * 2, label="属性点")
+        ledger.set("defense", "attributes", (self.toughness * 1) + (self.strength // 2), label="属性点")
+        ledger.set("magic_resist", "attributes", self.toughness // 2, label="属性点")
+        ledger.set("attack_speed", "attributes", self.dexterity * 0.01, label="属性点")
+        ledger.set("crit_chance", "attributes", (self.dexterity // 5) * 0.01, label="属性点")
+
+    def _register_item(self, eq):
+        label = getattr(eq, "display_name", eq.__class__.__name__)
+        for field, stat in ITEM_BONUS_STATS.items():
+            value = getattr(eq, field, 0)
+            if value: self.stat_ledger.set(stat, eq, value, label=label)
+            else: self.stat_ledger.remove(eq, (stat,))
+
+    def _sync_item_modifiers(self):
+        current = self.all_equipment
+        if current == self._ledger_items: return
+        for eq in self._ledger_items:
+            if eq not in current: self.stat_ledger.remove(eq)  # 连同物品自己登记的战斗修正（如铁剑的暴击率）
+        for eq in current:
+            if eq not in self._ledger_items: self._register_item(eq)
+        self._ledger_items = current
+
+    def _sync_talent_modifiers(self, force=False):
+        talents = [t for t in self.equipped_talents if t]
+        if not force and talents == self._ledger_talents: return
+        for talent in self._ledger_talents: self.stat_ledger.remove(talent)
+        self.SLOT_CAPACITY = self.DEFAULT_SLOT_CAPACITY.copy()
+        for on_init in self.hooks("talents", "on_init"): on_init(self)
+        self._ledger_talents = talents
+        self._fit_slots_to_capacity()
+
+    def _fit_slots_to_capacity(self):
+        """天赋改变槽位数量后调整装备栏：扩容时补空位，缩容时把放不下的装备退回背包。"""
+        for slot, capacity in self.SLOT_CAPACITY.items():
+            slot_items = self.slots.setdefault(slot, [])
+            if len(slot_items) < capacity:
+                slot_items.extend([None] * (capacity - len(slot_items)))
+            elif len(slot_items) > capacity:
+                overflow = [eq for eq in slot_items[capacity:] if eq is not None]
+                del slot_items[capacity:]
+                if overflow:
+                    self.backpack.extend(overflow)
+                    self.invalidate_hooks("equipment", "items")
+
+    def add_modifier(self, stat, source, flat=0, mult=1, label=None):
+        """
+        登记来源 source 对 stat 的加算 / 乘算修正（天赋 on_init、Buff 的 modify_stats、事件等使用）。
+        同一来源再次登记会覆盖旧值；之后调用 recalculate_stats() 生效。
+        """
+        self.stat_ledger.set(stat, source, flat, mult, label or getattr(source, "display_name", None) or str(source))
 
-        all_eq = self.all_equipment
-        self.base_max_hp = sum(getattr(eq, "hp_bonus", 0) for eq in all_eq)
-        self.base_defense = sum(getattr(eq, "def_bonus", 0) for eq in all_eq)
-        self.base_magic_resist = sum(getattr(eq, "magic_resist_bonus", 0) for eq in all_eq)
-        self.base_attack = sum(getattr(eq, "atk_bonus", 0) for eq in all_eq)
-        self.base_attack_speed = sum(getattr(eq, "as_bonus", 0) for eq in all_eq)
-        self.base_crit_chance = sum(getattr(eq, "crit_bonus", 0) for eq in all_eq)
+    def remove_modifier(self, source):
+        """撤销来源 source 登记的全部修正；之后调用 recalculate_stats() 生效。"""
+        self.stat_ledger.remove(source)
 
-        # --- 核心修复：从装备中累加暴击伤害加成 ---
-        self.base_crit_multiplier = 1.5 + sum(getattr(eq, "crit_dmg_bonus", 0) for eq in all_eq)
-        # --- 修复结束 ---
+    def refresh_item_modifiers(self, eq):
+        """物品的加成数值在运行中变化后（如冒险家的钱袋）调用，重新登记它的贡献并立即生效。"""
+        self._register_item(eq)
+        self._apply_stat_changes()
 
-        self.damage_resistance = 0.0
+    def stat_breakdown(self, stat):
+        """某项属性的来源明细 [(标签, 加算, 乘算), ...]，直接读账本，不会触发重算。"""
+        return self.stat_ledger.breakdown(stat)
 
-        self.SLOT_CAPACITY = self.DEFAULT_SLOT_CAPACITY.copy()
-        for talent in self.equipped_talents:
-            if talent and hasattr(talent, 'on_init'):
-                talent.on_init(self)
-
-        self.max_hp = self._innate_max_hp + (self.vitality * 5) + self.base_max_hp
-        self.attack = self._innate_attack + (self.strength * 2) + self.base_attack
-        self.defense = self._innate_defense + (self.toughness * 1) + (self.strength // 2) + self.base_defense
-        self.magic_resist = self._innate_magic_resist + (self.toughness // 2) + self.base_magic_resist
-        self.attack_speed = self._innate_attack_speed + (self.dexterity * 0.01) + self.base_attack_speed
-        self.crit_chance = self.base_crit_chance + (self.dexterity // 5) * 0.01
-
-        # --- 核心修复：计算最终的暴击伤害倍率 ---
-        self.crit_multiplier = self.base_crit_multiplier
-        # --- 修复结束 ---
-
-        self.defense -= sum(b.stacks for b in self.buffs if isinstance(b, Buffs.SunderDebuff))
-        self.defense = max(0, self.defense)
-        if any(isinstance(b, Buffs.FrenzyBuff) for b in self.buffs):
-            self.attack_speed *= 2
-
-        self.hp = min(self.max_hp, self.max_hp * hp_percent)
-        self.attack_interval = 6.0 / self.attack_speed if self.attack_speed > 0 else 999
-        print("角色属性已更新！")
+    def recalculate_stats(self):
+        """同步固有属性、属性点、装备和天赋在属性账本中的贡献，只重算发生变化的属性。"""
+        if self._loadout_batch:
+            self._batch_dirty = True
+            return
+        self._sync_innate_and_attributes()
+        self._sync_talent_modifiers()  # 天赋可能改变槽位数量，先于装备同步
+        self._sync_item_modifiers()
+        self._apply_stat_changes()
+
+    @contextlib.contextmanager
+    def batch_loadout(self):
+        """
+        批量换装：块内的 equip / unequip / equip_talent 等不再各自重算属性，也不逐条打印提示，
+        最外层的块结束时只重算一次。可以嵌套。
+
+            with player.batch_loadout():
+                for talent in talents: player.equip_talent(talent)
+                for eq in items: player.equip(eq)
+        """
+        self._loadout_batch += 1
+        try:
+            yield self
+        finally:
+            self._loadout_batch -= 1
+            if not self._loadout_batch and self._batch_dirty:
+                self._batch_dirty = False
+                self.recalculate_stats()
+
+    def apply_loadout(self, equipment=(), talents=()):
+        """
+        一次换上一整套配装：先学会并装备天赋（它们可能改变槽位数量），再穿上装备，最后只重算一次属性。
+        返回被替换下来或装不上的装备，由调用方决定放回背包还是丢弃。
+        """
+        leftovers = []
+        with self.batch_loadout():
+            for talent in talents:
+                if talent not in self.learned_talents: self.learn_talent(talent)
+                self.equip_talent(talent)
+            for eq in equipment:
+                replaced = self.equip(eq)
+                if replaced is not None: leftovers.append(replaced)
+        return leftovers
+
+    def _notify(self, message):
+        if not self._loadout_batch: print(message)
+
+    def _apply_stat_changes(self):
+        dirty = self.stat_ledger.pop_dirty()
+        if not dirty: return
+        self.timing_dirty = True
+        if "max_hp" in dirty:
+            hp_percent = self.hp / self.max_hp if hasattr(self, 'max_hp') and self.max_hp > 0 else 1
+        for stat in dirty:
+            setattr(self, stat, self.stat_ledger.get(stat))
+        if "defense" in dirty:
+            self.defense = max(0, self.defense)
+        if "max_hp" in dirty:
+            self.hp = min(self.max_hp, self.max_hp * hp_percent)
+        if "attack_speed" in dirty:
+            self.attack_interval = 6.0 / self.attack_speed if self.attack_speed > 0 else 999
+
+    def hooks(self, source, name):
+        """
+        返回某一来源上实现了钩子 name 的绑定方法元组，顺序与遍历 all_equipment / all_active_items /
+        equipped_talents / buffs 时一致。结果按 (来源, 钩子名) 缓存，直到 invalidate_hooks() 清掉。
+        """
+        table = self._hook_tables[source]
+        handlers = table.get(name)
+        if handlers is None:
+            handlers = tuple(getattr(obj, name) for obj in self._hook_owners(source) if _implements_hook(obj, name))
+            if self.profiler is not None:
+                handlers = tuple(self.profiler.wrap(h.__self__, name, h) for h in handlers)
+            table[name] = handlers
+        return handlers
+
+    def _hook_owners(self, source):
+        if source == "equipment": return self.all_equipment
+        if source == "items": return self.all_active_items
+        if source == "talents": return [t for t in self.equipped_talents if t]
+        return list(self.buffs)  # BuffContainer 已按 priority 排好序
+
+    def invalidate_hooks(self, *sources):
+        """装备、背包、天赋或 Buff 变化后调用，对应来源的钩子表会在下次分发时重建；不带参数则全部重建。"""
+        for source in sources or self.HOOK_SOURCES:
+            self._hook_tables[source].clear()
+        self.timing_dirty = True
+
+    def clone(self):
+        """
+        复制出一个互不影响的新角色，比重新构造便宜得多：不再逐个学习、装备天赋，也不重算属性。
+        装备、天赋、Buff 对象各复制一份（上面有战斗计数等可变状态），属性账本里以它们为来源的条目换成副本；
+        其余数值字段直接沿用。钩子表、录制器和分析器与存档一样不复制。
+        """
+        copies = {}  # id(原对象) -> 副本
+        def dup(obj):
+            if obj is None: return None
+            twin_obj = copies.get(id(obj))
+            if twin_obj is None: twin_obj = copies[id(obj)] = copy.copy(obj)
+            return twin_obj
+
+        state = self.__getstate__()
+        state["learned_talents"] = [dup(t) for t in self.learned_talents]
+        state["equipped_talents"] = [dup(t) for t in self.equipped_talents]
+        state["slots"] = {slot: [dup(eq) for eq in items] for slot, items in self.slots.items()}
+        state["backpack"] = [dup(eq) for eq in self.backpack]
+        state["buffs"] = Buffs.BuffContainer([dup(buff) for buff in self.buffs])
+        state["_ledger_items"] = [dup(eq) for eq in self._ledger_items]
+        state["_ledger_talents"] = [dup(t) for t in self._ledger_talents]
+        state["SLOT_CAPACITY"] = dict(self.SLOT_CAPACITY)
+        state["stat_ledger"] = self.stat_ledger.copy(lambda key: copies.get(id(key), key))
+
+        twin = object.__new__(type(self))
+        twin.__dict__.update(state)
+        twin._hook_tables = {source: {} for source in self.HOOK_SOURCES}
+        return twin
+
+    def __getstate__(self):
+        # 钩子表里是绑定方法，不写进存档；读档后按需重建。录制器和分析器只在战斗中挂着，也不写进存档
+        state = self.__dict__.copy()
+        state.pop("_hook_tables", None)
+        state.pop("recorder", None)
+        state.pop("profiler", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._hook_tables = {source: {} for source in self.HOOK_SOURCES}
+        if isinstance(self.buffs, list): self.buffs = Buffs.BuffContainer(self.buffs)  # 旧存档里是普通列表
+        if "stat_ledger" not in state:  # 旧存档没有属性账本，按当前装备和天赋重建
+            self._setup_stat_ledger()
+            self.recalculate_stats()
 
     @property
     def all_equipment(self):
@@ -239,6 +460,7 @@ class Character:
     def equip(self, eq_to_equip, specific_index=None):
         """装备一件物品，可以指定精确的槽位索引。"""
         slot = eq_to_equip.slot
+        if self._loadout_batch: self._sync_talent_modifiers()  # 批量换装时天赋可能刚变过，先让槽位数量跟上
         if slot not in self.SLOT_CAPACITY:
             raise ValueError(f"未知插槽：{slot}")
 
@@ -249,6 +471,7 @@ class Character:
                 unequipped_item = self.slots[slot][specific_index]
                 # 穿上新物品
                 self.slots[slot][specific_index] = eq_to_equip
+                self.invalidate_hooks("equipment", "items")
                 self.recalculate_stats()
                 return unequipped_item # 返回被替换下的物品 (可能是None)
             else:
@@ -260,6 +483,7 @@ class Character:
                 # 找到第一个空槽位 (值为None)
                 empty_index = self.slots[slot].index(None)
                 self.slots[slot][empty_index] = eq_to_equip
+                self.invalidate_hooks("equipment", "items")
                 self.recalculate_stats()
                 return None # 成功装备到空槽，没有物品被替换
             except ValueError:
@@ -268,6 +492,7 @@ class Character:
                 if self.SLOT_CAPACITY[slot] == 1:
                     unequipped_item = self.slots[slot][0]
                     self.slots[slot][0] = eq_to_equip
+                    self.invalidate_hooks("equipment", "items")
                     self.recalculate_stats()
                     return unequipped_item
                 else: # 多槽位已满且未指定索引，则失败
@@ -282,16 +507,15 @@ class Character:
             index = self.slots[slot].index(eq_to_unequip)
             # 将该位置设置回 None
             self.slots[slot][index] = None
+            self.invalidate_hooks("equipment", "items")
             self.recalculate_stats()
             return eq_to_unequip # 返回被卸下的物品
         return None
 
     def take_damage(self, packet: DamagePacket):
-        # --- 核心修改：使用新的“智能列表” ---
-        for item in self.all_active_items: # <-- 从 all_equipment 改为 all_active_items
-            if hasattr(item, 'before_take_damage'): item.before_take_damage(self, packet)
-        for buff in list(self.buffs):
-            if hasattr(buff, 'before_take_damage'): buff.before_take_damage(self, packet)
+        self.timing_dirty = True
+        for hook in self.hooks("items", "before_take_damage"): hook(self, packet)
+        for hook in self.hooks("buffs", "before_take_damage"): hook(self, packet)
 
         initial_amount_after_hooks = packet.amount
         final_shield_absorbed = 0
@@ -315,142 +539,138 @@ class Character:
         self.hp -= final_hp_deduction
         if self.hp < 0: self.hp = 0
 
-        if packet.source:
-            self.on_attacked(packet.source, final_hp_deduction)
-
-        return {
+        details = {
             "source": packet.source, "target": self,
             "final_amount": final_hp_deduction, "shield_absorbed": int(final_shield_absorbed),
             "damage_type": packet.damage_type, "is_critical": packet.is_critical,
             "is_dot": packet.is_dot, "is_fatal": self.hp <= 0,
         }
+        if self.recorder: self.recorder.damage(self, details)
+
+        if packet.source:
+            self.on_attacked(packet.source, final_hp_deduction)
+        for hook in self.hooks("buffs", "after_take_damage"): hook(self, details)
+
+        return details
 
     def on_attacked(self, attacker, dmg):
         """每次被攻击后触发"""
-        # --- 核心修改：使用新的“智能列表” ---
-        for item in self.all_active_items: # <-- 从 all_equipment 改为 all_active_items
-            if hasattr(item, "on_attacked"):
-                item.on_attacked(self, attacker, dmg)
-        for b in self.buffs:
-            if hasattr(b, "on_attacked"):
-                b.on_attacked(self, attacker, dmg)
+        for hook in self.hooks("items", "on_attacked"): hook(self, attacker, dmg)
+        for hook in self.hooks("buffs", "on_attacked"): hook(self, attacker, dmg)
+
+    def next_attack_in(self):
+        """距离下一次普攻还有多少秒；被禁手或已倒下时返回 None。"""
+        if self.hp <= 0 or self.buffs.attack_disabled: return None
+        return max(0.0, self.attack_interval - self._cd)
 
     def try_attack(self, target, dt):
-        if any(getattr(b, "disable_attack", False) for b in self.buffs): return None
-        self._cd += dt
+        """攻击计时到了就普攻一次，返回伤害报告 (take_damage 的返回值)；没有出手时返回 None。"""
+        if self.buffs.attack_disabled: return None
+        self._cd += dt - min(dt, self._disabled_dt)  # 这一步里被禁手的时间不算冷却
+        self._disabled_dt = 0.0
         if self._cd < self.attack_interval or self.hp <= 0: return None
 
-        is_crit = (random.random() < self.crit_chance)
+        is_crit = (self.rng.random() < self.crit_chance)
         damage = self.attack * self.crit_multiplier if is_crit else self.attack
         packet = DamagePacket(amount=damage, damage_type=DamageType.PHYSICAL, source=self, is_critical=is_crit)
 
-        for t in self.equipped_talents:
-            if t and hasattr(t, "before_attack"): t.before_attack(self, target, packet)
-
-        # --- 核心修改：使用新的“智能列表” ---
-        for item in self.all_active_items: # <-- 从 all_equipment 改为 all_active_items
-            if hasattr(item, "before_attack"): item.before_attack(self, target, packet)
+        for hook in self.hooks("talents", "before_attack"): hook(self, target, packet)
+        for hook in self.hooks("items", "before_attack"): hook(self, target, packet)
 
+        if self.recorder: self.recorder.attack(self)
         damage_details = target.take_damage(packet)
         actual_dmg = damage_details["final_amount"]
+        battle_logger.emit(DAMAGE, INFO, format_damage_log, damage_details, "普攻")
 
-        extra_texts = []
-        for t in self.equipped_talents:
-            if t and hasattr(t, "on_attack"):
-                out = t.on_attack(self, target, actual_dmg)
-                if out: extra_texts.extend(out)
+        for hook in self.hooks("talents", "on_attack"):
+            for text in hook(self, target, actual_dmg) or ():
+                battle_logger.emit(TALENT, INFO, _format_extra_text, text)
         self._cd -= self.attack_interval
 
-        log_parts = format_damage_log(damage_details, action_name="普攻")
-
-        return (log_parts, extra_texts, damage_details)
+        return damage_details
 
     def perform_extra_attack(self, target):
         """
         执行一次标准化的额外攻击。
         这个方法现在会自己处理伤害计算和日志记录。
         """
-        from battle_logger import battle_logger, format_damage_log
-        
         # 1. 准备伤害包裹 (与 try_attack 逻辑一致)
-        is_crit = (random.random() < self.crit_chance)
+        is_crit = (self.rng.random() < self.crit_chance)
         damage = self.attack * self.crit_multiplier if is_crit else self.attack
         packet = DamagePacket(amount=damage, damage_type=DamageType.PHYSICAL, source=self, is_critical=is_crit)
         
         # 2. 触发攻击前钩子
-        for eq in self.all_equipment:
-            if hasattr(eq, "before_attack"): eq.before_attack(self, target, packet)
+        for hook in self.hooks("equipment", "before_attack"): hook(self, target, packet)
         
         # 3. 造成伤害并获取伤害报告
         damage_details = target.take_damage(packet)
         actual_dmg = damage_details["final_amount"]
         
-        # 4. 使用标准工具格式化日志并播报
-        log_parts = format_damage_log(damage_details, action_name="额外攻击")
-        battle_logger.log(log_parts)
+        # 4. 播报 (与普攻走同一条日志通道，显示时才格式化)
+        battle_logger.emit(DAMAGE, INFO, format_damage_log, damage_details, "额外攻击")
         
         # 5. 触发攻击后钩子
-        for eq in self.all_equipment:
-            if hasattr(eq, "after_attack"): eq.after_attack(self, target, actual_dmg)
-        if is_crit:
-            for eq in self.all_equipment:
-                if hasattr(eq, "on_critical"): eq.on_critical(self, target, actual_dmg)
-        else:
-            for eq in self.all_equipment:
-                if hasattr(eq, "on_non_critical"): eq.on_non_critical(self, target, actual_dmg)
+        for hook in self.hooks("equipment", "after_attack"): hook(self, target, actual_dmg)
+        for hook in self.hooks("equipment", "on_critical" if is_crit else "on_non_critical"):
+            hook(self, target, actual_dmg)
 
     def heal(self, amount: float, combat_target=None) -> float:
         # 钩子：治疗前
-        for buff in list(self.buffs):
-            if hasattr(buff, 'before_healed'):
-                amount = buff.before_healed(self, amount)
+        for hook in self.hooks("buffs", "before_healed"):
+            amount = hook(self, amount)
 
         healed = min(self.max_hp - self.hp, amount)
         if healed <= 0: return 0.0
         self.hp += healed
 
         # 钩子：治疗后
-        for talent in list(self.equipped_talents):
-            if talent and hasattr(talent, 'on_healed'):
-                talent.on_healed(self, healed, combat_target)
+        for hook in self.hooks("talents", "on_healed"):
+            hook(self, healed, combat_target)
 
         return healed
         
     def add_status(self, status: Buffs.Buff, *, source: "Character" = None):
-        final_buff = None
+        self.timing_dirty = True
+        if source is not None: source.timing_dirty = True  # 施加者的天赋可能随之改攻速（竹叶青）
         added_stacks = status.stacks
-        for b in self.buffs:
-            if isinstance(b, status.__class__):
-                if b.max_stacks == 1:
-                    b.remaining = b.duration
-                else:
-                    b.stacks = min(b.stacks + status.stacks, b.max_stacks)
-                final_buff = b
-                break
-        if final_buff is None:
+        final_buff = self.buffs.get(type(status))
+        if final_buff is not None:
+            if final_buff.max_stacks == 1:
+                final_buff.remaining = final_buff.duration
+            else:
+                final_buff.stacks = min(final_buff.stacks + status.stacks, final_buff.max_stacks)
+        else:
             final_buff = status
-            self.buffs.append(status)
+            self.buffs.add(status)
+            self.invalidate_hooks("buffs")
             status.on_apply(self)
+        if self.recorder: self.recorder.buff_added(self, final_buff)
+        if _implements_hook(final_buff, "modify_stats"):
+            final_buff.modify_stats(self)
+            self._apply_stat_changes()
         
         # --- 新增的钩子 ---
         # 触发装备的 on_buff_applied 效果
-        for eq in self.all_equipment:
-            if hasattr(eq, 'on_buff_applied'):
-                eq.on_buff_applied(self, final_buff)
+        for hook in self.hooks("equipment", "on_buff_applied"):
+            hook(self, final_buff)
         # --- 钩子结束 ---
 
         if source is not None and source is not self and getattr(final_buff, "is_debuff", False):
-            for t in source.equipped_talents: # 注意：这里检查的是 source 的天赋
-                if hasattr(t, "on_inflict_debuff"):
-                    t.on_inflict_debuff(source, self, final_buff, added_stacks)
+            for hook in source.hooks("talents", "on_inflict_debuff"): # 注意：这里检查的是 source 的天赋
+                hook(source, self, final_buff, added_stacks)
         if getattr(final_buff, "dispellable", False) and getattr(final_buff, "is_debuff", False):
-            for t in self.equipped_talents:
-                if hasattr(t, "on_debuff_applied"):
-                    t.on_debuff_applied(self, final_buff)
+            for hook in self.hooks("talents", "on_debuff_applied"):
+                hook(self, final_buff)
                     
     add_buff, add_debuff = add_status, add_status
 
-    def remove_buff(self, buff): self.buffs.remove(buff); buff.on_remove(self)
+    def remove_buff(self, buff):
+        self.timing_dirty = True
+        self.buffs.remove(buff); self.invalidate_hooks("buffs"); buff.on_remove(self)
+        if self.recorder: self.recorder.buff_removed(self, buff)
+        if buff in self.stat_ledger:  # modify_stats 或 Buff 自己登记的修正随 Buff 一起撤销
+            self.stat_ledger.remove(buff)
+            self._apply_stat_changes()
 
     def add_exp(self, amount):
         if self.hp <= 0: return []
@@ -559,6 +779,7 @@ class Character:
             if item_to_upgrade in items:
                 index = items.index(item_to_upgrade)
                 self.slots[slot_type][index] = upgraded_item # 直接在原槽位替换
+                self.invalidate_hooks("equipment", "items")
                 was_equipped = True
                 break
         
@@ -566,6 +787,7 @@ class Character:
         if not was_equipped and item_to_upgrade in self.backpack:
             self.backpack.remove(item_to_upgrade)
             self.backpack.append(upgraded_item) # 将新物品放入背包
+            self.invalidate_hooks("items")
             
         self.recalculate_stats() # 升级后重算属性
         return f"淬炼成功！「{upgraded_item.display_name}」已升级！消耗 {cost} 结晶。"
\ No newline at end of file
@@ -1,6 +1,8 @@
 import Buffs
 import Talents
 from damage import DamagePacket, DamageType
+from battle_logger import battle_logger, ITEM, INFO
+from ui import format_effect_log
 from abc import ABC
 import collections
 from collections import defaultdict
@@ -25,6 +27,7 @@ class Equipment:
     def before_take_damage(self, wearer, dmg): return dmg
     def on_critical(self, wearer, target, dmg): pass
     def on_non_critical(self, wearer, target, dmg): pass
+    def next_tick_in(self): return None  # 距离下一次 on_tick 计时效果的秒数，None 表示没有
 
 class WoodenShield(Equipment):
     """木盾：副手插槽；+2 防御；战斗开始时获得 10 护盾"""
@@ -99,7 +102,7 @@ class WoodenArmor(Equipment):
 
     def before_take_damage(self, wearer, packet: DamagePacket):
         # 效果现在只对物理伤害生效
-        if packet.damage_type == DamageType.PHYSICAL and random.random() < 0.3:
+        if packet.damage_type == DamageType.PHYSICAL and wearer.rng.random() < 0.3:
             packet.amount = max(0, packet.amount * 0.7)
 
 class WoodenArmor_Star(Equipment):
@@ -114,7 +117,7 @@ class WoodenArmor_Star(Equipment):
 
     def before_take_damage(self, wearer, packet: DamagePacket):
         # 效果现在只对物理伤害生效
-        if packet.damage_type == DamageType.PHYSICAL and random.random() < 0.5:
+        if packet.damage_type == DamageType.PHYSICAL and wearer.rng.random() < 0.5:
             packet.amount = max(0, packet.amount * 0.5)
 
 class IronSword(Equipment):
@@ -129,16 +132,19 @@ class IronSword(Equipment):
         self.max_stacks = 8
         self._stacks = 0
     def on_battle_start(self, wearer):
-        # 攻击和暴击都是永久属性
-        # 但暴击率需要在战斗中动态变化，所以我们需要在战前设置初始值
-        wearer.crit_chance += self.base_crit_bonus
+        # 暴击率在战斗中动态变化，登记在属性账本里：基础 +5%，每层再 +5%；每场战斗从 0 层开始
+        self._stacks = 0
+        self._apply_crit(wearer)
     def on_critical(self, wearer, target, dmg):
-        wearer.crit_chance -= self._stacks * self.base_crit_bonus
         self._stacks = 0
+        self._apply_crit(wearer)
     def on_non_critical(self, wearer, target, dmg):
         if self._stacks < self.max_stacks:
             self._stacks += 1
-            wearer.crit_chance += self.base_crit_bonus
+            self._apply_crit(wearer)
+    def _apply_crit(self, wearer):
+        wearer.add_modifier("crit_chance", self, flat=(1 + self._stacks) * self.base_crit_bonus)
+        wearer.recalculate_stats()
 
 class IronRing(Equipment):
     """铁戒指：饰品槽；+5% 暴击；+10% 爆伤；赠送两层“刚毅”Buff"""
@@ -169,7 +175,7 @@ class IronHammer(Equipment):
         # 攻击和暴击是永久属性
         pass
     def after_attack(self, wearer, target, dmg):
-        if random.random() < self.stun_chance:
+        if wearer.rng.random() < self.stun_chance:
             target.add_status(Buffs.StunDebuff(self.stun_duration), source=wearer)
 
 class NaturalNecklace(Equipment):
@@ -224,7 +230,7 @@ class SlimeSword(Equipment):
         # 攻击是永久属性
         pass
     def after_attack(self, wearer, target, dmg):
-        if random.random() < self.poison_chance:
+        if wearer.rng.random() < self.poison_chance:
             target.add_debuff(Buffs.PoisonDebuff(stacks=1), source=wearer)
 
 
@@ -255,8 +261,8 @@ class HourglassOfTime(Equipment):
         self.proc_chance = 0.4
 
     def on_critical(self, wearer, target, dmg):
-        if random.random() < self.proc_chance:
-            print("[时光沙漏] 效果触发！")
+        if wearer.rng.random() < self.proc_chance:
+            battle_logger.emit(ITEM, INFO, format_effect_log, "时光沙漏", "效果触发！")
             # 直接将攻击冷却充满
             wearer._cd = wearer.attack_interval
 
@@ -273,7 +279,7 @@ class Stormcaller(Equipment):
         self._attack_count += 1
         if self._attack_count >= 4:
             self._attack_count = 0
-            print("[风暴召唤者] 附加了风暴印记！")
+            battle_logger.emit(ITEM, INFO, format_effect_log, "风暴召唤者", "附加了风暴印记！")
             target.add_debuff(Buffs.StormDebuff(), source=wearer)
 # --- 白色 (Common) 品质新装备 ---
 
@@ -304,7 +310,7 @@ class BarbedAxe(Equipment):
         self.atk_bonus = 5
         self.bleed_chance = 0.3
     def after_attack(self, wearer, target, dmg):
-        if random.random() < self.bleed_chance:
+        if wearer.rng.random() < self.bleed_chance:
             target.add_debuff(Buffs.BleedDebuff(stacks=1), source=wearer)
 
 # 在 Equips.py 文件中，找到并替换 TowerShield 类
@@ -338,9 +344,9 @@ class AdventurersPouch(Equipment):
         gold = getattr(wearer, 'gold', 0)
         self.atk_bonus = gold // 20
         if self.atk_bonus > 0:
-            print(f"[冒险家的钱袋] 你获得了 {self.atk_bonus} 点额外攻击力！")
-            # 重新计算一次总属性，让这个新的atk_bonus生效
-            wearer.recalculate_stats()
+            battle_logger.emit(ITEM, INFO, format_effect_log, "冒险家的钱袋", "你获得了 {} 点额外攻击力！", self.atk_bonus)
+            # 重新登记钱袋的加成，让这个新的atk_bonus生效
+            wearer.refresh_item_modifiers(self)
 
 class ShadowCloak(Equipment):
     """暗影斗篷：护甲槽；+5防御；受到暴击伤害时，有30%概率免疫该次伤害。"""
@@ -352,8 +358,8 @@ class ShadowCloak(Equipment):
         self.crit_immunity_chance = 0.3
     def before_take_damage(self, wearer, packet: DamagePacket):
         if packet.damage_type == DamageType.PHYSICAL and packet.is_critical:
-            if random.random() < self.crit_immunity_chance:
-                print("[暗影斗篷] 免疫了暴击伤害！")
+            if wearer.rng.random() < self.crit_immunity_chance:
+                battle_logger.emit(ITEM, INFO, format_effect_log, "暗影斗篷", "免疫了暴击伤害！")
                 packet.amount = 0
 
 # 在 Equips.py 文件末尾添加
@@ -377,10 +383,10 @@ class Avalanche(Equipment):
         self.atk_bonus = 20
     def on_critical(self, wearer, target, actual_dmg):
         # 寻找目标身上的烙印
-        brand_debuff = next((b for b in target.buffs if isinstance(b, Buffs.SunstoneBrandDebuff)), None)
+        brand_debuff = target.buffs.get(Buffs.SunstoneBrandDebuff)
         if brand_debuff:
             stacks = brand_debuff.stacks
-            print(f"[山崩] 引爆了 {stacks} 层烙印！")
+            battle_logger.emit(ITEM, INFO, format_effect_log, "山崩", "引爆了 {} 层烙印！", stacks)
             # 造成额外伤害
             extra_dmg = stacks * 20
             packet = DamagePacket(amount=extra_dmg, damage_type=DamageType.TRUE, source=wearer)
@@ -398,6 +404,8 @@ class DragonBloodChalice(Equipment):
         self._timer = 0.0
     def on_battle_start(self, wearer):
         self._timer = 0.0 # 重置计时器
+    def next_tick_in(self):
+        return 1.0 - self._timer
     def on_tick(self, wearer, dt): # 需要在 Character.update 中调用 on_tick
         self._timer += dt
         if self._timer >= 1.0:
@@ -414,11 +422,11 @@ class DragonscaleWard(Equipment):
     def __init__(self):
         self.rarity, self.type = "rare", "armor"
     def on_battle_start(self, wearer):
-        soul_buff = next((b for b in wearer.buffs if isinstance(b, Buffs.DragonSoulBuff)), None)
+        soul_buff = wearer.buffs.get(Buffs.DragonSoulBuff)
         if soul_buff:
             stacks = soul_buff.stacks
             shield_gain = stacks * 15
-            print(f"[龙鳞盾] 消耗了 {stacks} 层龙魂，获得了 {shield_gain} 点护盾！")
+            battle_logger.emit(ITEM, INFO, format_effect_log, "龙鳞盾", "消耗了 {} 层龙魂，获得了 {} 点护盾！", stacks, shield_gain)
             wearer.shield += shield_gain
             wearer.remove_buff(soul_buff)
 
@@ -432,10 +440,10 @@ class Plaguebringer(Equipment):
         self.atk_bonus = 8
 
     def after_attack(self, wearer, target, actual_dmg):
-        poison_debuff = next((b for b in target.buffs if isinstance(b, Buffs.PoisonDebuff)), None)
+        poison_debuff = target.buffs.get(Buffs.PoisonDebuff)
         if poison_debuff:
             stacks = poison_debuff.stacks
-            print(f"[瘟疫使者] 引爆了 {stacks} 层毒！")
+            battle_logger.emit(ITEM, INFO, format_effect_log, "瘟疫使者", "引爆了 {} 层毒！", stacks)
             # 造成额外伤害
             packet = DamagePacket(amount=stacks, damage_type=DamageType.POISON, source=wearer)
             target.take_damage(packet)
@@ -465,8 +473,8 @@ class Windshear(Equipment):
 
     def after_attack(self, wearer, target, actual_dmg):
         split_chance = 0.5
-        while random.random() < split_chance:
-            print("[风切] 攻击分裂！")
+        while wearer.rng.random() < split_chance:
+            battle_logger.emit(ITEM, INFO, format_effect_log, "风切", "攻击分裂！")
             # 造成一次50%伤害的额外攻击
             packet = DamagePacket(amount=wearer.attack * 0.5, damage_type=DamageType.PHYSICAL, source=wearer)
             target.take_damage(packet)
@@ -481,8 +489,8 @@ class RingOfFlourishing(Equipment):
     def on_buff_applied(self, wearer, buff_applied):
         """这是一个新的自定义钩子，会在Character.add_status中被调用"""
         
-        if not buff_applied.is_debuff and not isinstance(buff_applied, Buffs.VitalityBloomBuff) and random.random() < 0.3:
-            print("[繁盛指环] 效果触发！")
+        if not buff_applied.is_debuff and not isinstance(buff_applied, Buffs.VitalityBloomBuff) and wearer.rng.random() < 0.3:
+            battle_logger.emit(ITEM, INFO, format_effect_log, "繁盛指环", "效果触发！")
             wearer.add_buff(Buffs.VitalityBloomBuff(stacks=1))
 
 
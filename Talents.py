@@ -18,15 +18,15 @@ import sys
 from rich.console import Console
 
 from damage import DamagePacket, DamageType
-from battle_logger import battle_logger
+from battle_logger import battle_logger, DAMAGE, TALENT, INFO
 from settings import TEXT_COLOR, DAMAGE_TYPE_COLORS
-from ui import format_damage_log
+from ui import format_damage_log, format_effect_log
 
 class Talent:
     """天赋基类，之后可扩展更多钩子"""
     display_name = None
     def on_init(self, wearer):
-        """角色创建/战前初始化时触发，用于修改槽位之类的属性"""
+        """装备天赋时和战前初始化时触发，用于修改槽位，或用 wearer.add_modifier 登记属性修正"""
         pass
     def on_attack(self, wearer, target, dmg):
         """攻击后触发"""
@@ -41,7 +41,7 @@ class PoisonousTalent(Talent):
         self.chance = chance
 
     def on_attack(self, wearer, target, dmg):
-        if random.random() < self.chance:
+        if wearer.rng.random() < self.chance:
             target.add_debuff(Buffs.PoisonDebuff(stacks=1), source=wearer)
 
 class DualWieldTalent(Talent):
@@ -73,7 +73,8 @@ class ThousandWorldTalent(Talent):
         """
         额外攻击现在会自己处理日志，所以这里不再需要返回任何东西。
         """
-        if random.random() < self.chance:
+        if wearer.rng.random() < self.chance:
+            battle_logger.emit(TALENT, INFO, format_effect_log, "三千世界", "{} 额外连续出手 2 次！", wearer.name)
             # 额外出手两次
             for _ in range(2):
                 wearer.perform_extra_attack(target)
@@ -87,7 +88,7 @@ class HeartOfHealingTalent(Talent):
         self.chance = chance
 
     def on_debuff_applied(self, wearer, buff):
-        if random.random() < self.chance:
+        if wearer.rng.random() < self.chance:
             # 驱散一层
             if hasattr(buff, "stacks"):
                 buff.stacks -= 1
@@ -103,55 +104,40 @@ class BambooLeafTalent(Talent):
 
     def __init__(self, chance: float = 1.0):
         self.chance = chance
-        self._bamboo_atk_bonus = 0  # 上一次总加成
-        self._bamboo_spd_bonus = 0
 
     def on_inflict_debuff(self, wearer, target, buff, added_stacks):
         # 只有是 PoisonDebuff 且概率命中才触发
-        if not isinstance(buff, Buffs.PoisonDebuff) or random.random() >= self.chance:
+        if not isinstance(buff, Buffs.PoisonDebuff) or wearer.rng.random() >= self.chance:
             return
 
         # ① 给自己加这次相同的层数
-        own = next((b for b in wearer.buffs if isinstance(b, Buffs.PoisonDebuff)), None)
+        own = wearer.buffs.get(Buffs.PoisonDebuff)
         if own:
             own.stacks = min(own.stacks + added_stacks, own.max_stacks)
         else:
             wearer.add_buff(Buffs.PoisonDebuff(stacks=added_stacks))
 
         # ② 统计当前毒总层数
-        total_stacks = next((b.stacks for b in wearer.buffs if isinstance(b, Buffs.PoisonDebuff)), 0)
+        total_stacks = wearer.buffs.stacks(Buffs.PoisonDebuff)
 
-        # ③ 撤销旧加成
-        wearer.attack -= self._bamboo_atk_bonus
-        current_as = 6.0 / wearer.attack_interval
-        base_as = current_as - self._bamboo_spd_bonus
-
-        # ④ 重新计算加成（基于总毒层数）
-        atk_bonus = total_stacks * 1
-        spd_bonus = total_stacks * 0.1
-
-        wearer.attack += atk_bonus
-        wearer.attack_interval = 6.0 / (base_as + spd_bonus)
-
-        # ⑤ 记录新的加成值
-        self._bamboo_atk_bonus = atk_bonus
-        self._bamboo_spd_bonus = spd_bonus
+        # ③ 按总毒层数登记加成：同一来源再次登记会覆盖上一次的值；下一场战斗开始时随天赋重新初始化一起清掉
+        wearer.add_modifier("attack", self, flat=total_stacks * 1)
+        wearer.add_modifier("attack_speed", self, flat=total_stacks * 0.1)
+        wearer.recalculate_stats()
 
 class GlassCannon(Talent):
     """【天赋】玻璃大炮：造成的伤害提升50%，受到的伤害也提升30%。"""
     display_name = "玻璃大炮"
     def on_init(self, wearer):
-        wearer.attack *= 1.5
-        wearer.damage_resistance -= 0.3
+        wearer.add_modifier("attack", self, mult=1.5)
+        wearer.add_modifier("damage_resistance", self, flat=-0.3)
 
 class Giant(Talent):
     """【天赋】巨人：最大生命值提升50%，但攻击速度降低20%。"""
     display_name = "巨人"
     def on_init(self, wearer):
-        wearer.max_hp *= 1.5
-        wearer.hp = wearer.max_hp
-        wearer.attack_speed *= 0.8
-        wearer.attack_interval = 6.0 / wearer.attack_speed
+        wearer.add_modifier("max_hp", self, mult=1.5)
+        wearer.add_modifier("attack_speed", self, mult=0.8)
 
 
 class Executioner(Talent):
@@ -161,7 +147,7 @@ class Executioner(Talent):
     def on_attack(self, wearer, target, dmg):
         # 这个效果在造成伤害后触发
         if target.hp > 0 and (target.hp / target.max_hp < 0.2):
-            print(f"[处决者] 斩杀了 {target.name}！")
+            battle_logger.emit(TALENT, INFO, format_effect_log, "处决者", "斩杀了 {}！", target.name)
             kill_damage = target.hp
             packet = DamagePacket(amount=kill_damage, damage_type=DamageType.TRUE, source=wearer)
             target.take_damage(packet)
@@ -175,7 +161,7 @@ class MagicShield(Talent):
     """【天赋】法力护盾：获得+20魔法抗性。"""
     display_name = "法力护盾"
     def on_init(self, wearer):
-        wearer.magic_resist += 20
+        wearer.add_modifier("magic_resist", self, flat=20)
 
 class FirstStrike(Talent):
     """【天赋】先发制人：进入战斗后的第一次攻击必定暴击。"""
@@ -205,10 +191,7 @@ class Brawler(Talent):
     def on_init(self, wearer):
         # 只是修改规则和基础值，不再调用recalculate_stats
         wearer.SLOT_CAPACITY["offhand"] = 0
-        wearer.base_attack *= 1.3 
-        # 移除下面这两行
-        # wearer.attack = wearer.base_attack
-        # wearer.recalculate_stats()
+        wearer.add_modifier("base_attack", self, mult=1.3)
 
 class Adventurer(Talent):
     """【天赋】冒险者：获得的经验值提升50%。"""
@@ -228,8 +211,7 @@ class SacredRetribution(Talent):
             
             # ### 核心修改：先获取伤害报告，再用工具格式化日志 ###
             damage_details = combat_target.take_damage(packet)
-            log_parts = format_damage_log(damage_details, action_name="神圣报偿")
-            battle_logger.log(log_parts)
+            battle_logger.emit(DAMAGE, INFO, format_damage_log, damage_details, "神圣报偿")
 
             # 不再需要返回任何东西
 
@@ -244,10 +226,11 @@ class Overwhelm(Talent):
             packet.amount *= 2
 
 class SunfireAura(Talent):
-    """【日炎光环】: 战斗开始时，对敌人施加【日炎灼烧】效果。"""
+    """【日炎光环】: 战斗开始时，对所有敌人施加【日炎灼烧】效果。"""
     display_name = "日炎光环"
 
     def on_battle_start(self, wearer, enemy):
         """这是一个新的自定义钩子，会在CombatScreen中被调用"""
-        print(f"[{wearer.name}的日炎光环] 对 {enemy.name} 施加了灼烧！")
-        enemy.add_debuff(Buffs.SunfireAuraDebuff(source_char=wearer))
\ No newline at end of file
+        for foe in [f for f in wearer.opponents if f.hp > 0] or [enemy]:
+            battle_logger.emit(TALENT, INFO, format_effect_log, "日炎光环", "{} 对 {} 施加了灼烧！", wearer.name, foe.name)
+            foe.add_debuff(Buffs.SunfireAuraDebuff(source_char=wearer))
\ No newline at end of file
@@ -1,36 +1,89 @@
 # 文件: battle_logger.py (新文件)
+"""
+战斗播报。
+
+战斗逻辑只提交结构化的记录：类别、级别、格式化函数和它的参数，不在出手的热路径上拼字符串。
+只有日志真正要显示某一行时才调用格式化函数生成富文本，并且只生成一次。
+
+- 战斗界面 register_renderer() 注册显示器，记录按级别和类别过滤后交给显示器 (add_record)
+- 没有注册显示器时（模拟、回放校验、地图界面……）记录直接丢弃：emit() 只做一次判断就返回
+- 调试时可以注册 ConsoleSink，把记录打印到控制台
+
+    battle_logger.emit(DAMAGE, INFO, format_damage_log, damage_details, "普攻")
+    battle_logger.emit(ITEM, INFO, format_effect_log, "山崩", "引爆了 {} 层烙印！", stacks)
+"""
+
+# 级别
+DEBUG, INFO, IMPORTANT = 10, 20, 30
+# 类别
+DAMAGE, ITEM, TALENT, BUFF, SYSTEM = "damage", "item", "talent", "buff", "system"
+
+
+class LogRecord:
+    """一条战斗记录。parts 第一次被读取时才格式化成富文本 [(文本, 颜色), ...]。"""
+    __slots__ = ("category", "level", "_formatter", "_args", "_parts")
+
+    def __init__(self, category, level, formatter, args):
+        self.category, self.level = category, level
+        self._formatter, self._args = formatter, args
+        self._parts = None
+
+    @property
+    def parts(self):
+        if self._parts is None:
+            self._parts = self._formatter(*self._args)
+            self._formatter = self._args = None  # 格式化后不再持有参数（里面可能有角色对象）
+        return self._parts
+
+    @property
+    def text(self):
+        return "".join(text for text, _ in self.parts)
+
+
+def _preformatted(parts):
+    return [(parts, (200, 200, 200))] if isinstance(parts, str) else parts
+
+
+class ConsoleSink:
+    """把记录打印到控制台的显示器，调试无界面战斗时使用。"""
+    def add_record(self, record):
+        print(record.text)
+
 
 class BattleLogger:
     def __init__(self):
         self._renderer = None
+        self.min_level = INFO
+        self.categories = None  # None 表示接受所有类别
 
-    def register_renderer(self, renderer_instance):
-        """战斗开始时，由战斗界面调用，用于注册日志显示器"""
-        print("[BattleLogger] 日志显示器已注册。")
+    def register_renderer(self, renderer_instance, min_level=INFO, categories=None):
+        """战斗开始时，由战斗界面调用，用于注册日志显示器（需要提供 add_record(record) 方法）"""
         self._renderer = renderer_instance
+        self.set_filter(min_level, categories)
 
     def unregister_renderer(self):
-        """战斗结束时调用，用于注销显示器"""
-        print("[BattleLogger] 日志显示器已注销。")
+        """战斗结束时调用，用于注销显示器；之后的记录都会被直接丢弃"""
         self._renderer = None
 
-    # battle_logger.py (修改后)
-
-    def log(self, parts): # <--- 改动 1：移除 color 参数
-        """
-        全局日志接口。
-        任何地方都可以调用这个函数来发送日志。
-        """
-        if self._renderer:
-            # 直接调用显示器的 add_message 方法
-            self._renderer.add_message(parts) # <--- 改动 2：移除 color 参数
-        else:
-            # 如果没有注册显示器（比如非战斗状态），则在控制台打印
-            if isinstance(parts, list):
-                # 如果是富文本列表，拼接后打印
-                print("".join([p[0] for p in parts]))
-            else:
-                print(parts)
+    def set_filter(self, min_level=INFO, categories=None):
+        """只接受级别不低于 min_level、且类别在 categories 中（None 为全部）的记录。"""
+        self.min_level = min_level
+        self.categories = frozenset(categories) if categories is not None else None
+
+    def enabled(self, category, level=INFO):
+        """这一类记录现在会不会被显示；格式化参数本身就很贵时，调用方可以先问一下。"""
+        return (self._renderer is not None and level >= self.min_level
+                and (self.categories is None or category in self.categories))
+
+    def emit(self, category, level, formatter, *args):
+        """提交一条记录；formatter(*args) 要到显示时才会被调用。"""
+        if self._renderer is None or level < self.min_level: return
+        if self.categories is not None and category not in self.categories: return
+        self._renderer.add_record(LogRecord(category, level, formatter, args))
+
+    def log(self, parts, category=SYSTEM, level=INFO):
+        """提交一条已经格式化好的富文本（或纯文本）消息。"""
+        self.emit(category, level, _preformatted, parts)
 
 # 创建一个全局唯一的播报员实例
-battle_logger = BattleLogger()
\ No newline at end of file
+battle_logger = BattleLogger()
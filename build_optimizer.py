@@ -0,0 +1,331 @@
+# 文件: build_optimizer.py (新文件)
+"""
+配装优化器：在角色现有的背包物品和已学天赋里，搜索对某一层地牢胜率最高的装备 + 天赋组合。
+
+合法配装：天赋数不超过 max_talent_slots；每个部位的装备数不超过该天赋组合下的 SLOT_CAPACITY
+（二刀流、三刀流、格斗家等天赋会在 on_init 里改变槽位数量）。
+
+几十件装备、二十多个天赋的组合数是天文数字，所以分两步搜索：
+1. 解析估算 (estimator.py)：从随机的合法配装出发做爬山搜索，每一步换掉一个天赋或增减 / 替换一件装备，
+   按估算的击杀余量 (存活时间 / 击杀耗时，上限 2) 打分；在估算预算内反复重启，留下得分最高的若干个。
+2. 逐次减半 (successive halving)：对留下的候选做真实的战斗模拟，每轮淘汰胜率较低的一半，
+   剩下的候选场数翻倍，模拟预算只花在有希望的配装上。
+
+目标 = 该层 普通怪池、精英池、Boss 三组胜率的平均值（组内每个敌人权重相同）。
+
+用法:
+    python build_optimizer.py build.json --dungeon sunstone_ruins --floor 1
+    python build_optimizer.py build.json --dungeon sunstone_ruins --floor 4 --budget 5000 --finalists 32
+build.json 格式同 simulator.py，其中 equipment / talents 是可供挑选的物品和已学天赋（不要求能同时装备），
+可选的 "max_talent_slots" 覆盖天赋槽数量。
+"""
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import contextlib
+import json
+import math
+import pickle
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import estimator
+import simulator
+from combat_engine import CombatEngine, create_enemy
+from rng import derive_seed, new_seed
+
+FLOOR_GROUPS = {"monster_pool": "普通", "elite_pool": "精英", "boss": "Boss"}
+MAX_MARGIN = 2.0  # 估算打分时击杀余量的上限：已经稳赢的对局不再继续加分
+MAX_DRY_RESTARTS = 10  # 连续这么多次重启都没有找到新配装，说明合法配装已经全部估算过了
+
+
+def load_dungeon_data(dungeon_id, path=None):
+    with open(path or os.path.join(simulator.ROOT_DIR, "dungeons", f"{dungeon_id}.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def floor_enemy_groups(dungeon_data, floor_number):
+    """某一层的敌人分组 {"monster_pool": [...], "elite_pool": [...], "boss": [...]}，空组不返回。"""
+    pool = next((p for p in dungeon_data.get("floor_pools", []) if floor_number in p["floors"]), None)
+    if pool is None: raise ValueError(f"{dungeon_data.get('name', '地牢')} 没有第 {floor_number} 层的配置")
+    groups = {"monster_pool": pool.get("monster_pool", []), "elite_pool": pool.get("elite_pool", []),
+              "boss": [pool["boss_id"]] if pool.get("boss_id") else []}
+    return {group: enemy_ids for group, enemy_ids in groups.items() if enemy_ids}
+
+
+@contextlib.contextmanager
+def _quiet():
+    # 装备 / 天赋的增删会打印提示，搜索时成千上万次，全部吞掉
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def strip_loadout(char):
+    """卸下角色的全部装备和天赋，装备按槽位顺序放回背包末尾。"""
+    with _quiet(), char.batch_loadout():
+        for eq in char.all_equipment:
+            char.unequip(eq)
+            char.backpack.append(eq)
+        for talent in [t for t in char.equipped_talents if t]: char.unequip_talent(talent)
+        char.invalidate_hooks("items")
+
+
+def apply_loadout(char, loadout):
+    """
+    在 strip_loadout 过的角色上换上配装。loadout = (天赋下标, 物品下标)，
+    下标分别指向 learned_talents 和 strip 之后的 backpack。
+    """
+    talent_indices, item_indices = loadout
+    with _quiet(), char.batch_loadout():
+        for i in talent_indices: char.equip_talent(char.learned_talents[i])
+        for i in item_indices: char.equip(char.backpack[i])
+        chosen = set(item_indices)
+        char.backpack = [eq for i, eq in enumerate(char.backpack) if i not in chosen]
+        char.invalidate_hooks("items")
+
+
+def _make_fighter(snapshot, loadout):
+    player = pickle.loads(snapshot)
+    apply_loadout(player, loadout)
+    player.hp = player.max_hp
+    return player
+
+
+def _simulate_loadout(snapshot, loadout, enemy_id, enemy_preset, fights, seed):
+    """工作进程：某个配装对同一个敌人打 fights 场，返回胜场数。"""
+    rng = random.Random(seed)
+    wins = 0
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        template = _make_fighter(snapshot, loadout)
+        for _ in range(fights):
+            player = template.clone()
+            enemy = create_enemy(enemy_id, enemy_preset, rng)
+            if CombatEngine(player, enemy, rng=rng).run().winner is player: wins += 1
+    return wins
+
+
+class BuildOptimizer:
+    """
+    对一个角色搜索配装。构造时就给角色拍下快照，之后的搜索都在副本上进行，不会改动原角色；
+    用 apply() 把结果换到原角色身上。
+    """
+    def __init__(self, char, enemy_groups, enemy_data=None, seed=None):
+        bare = pickle.loads(pickle.dumps(char))
+        strip_loadout(bare)
+        self.snapshot = pickle.dumps(bare)
+        self.talent_names = [t.display_name for t in bare.learned_talents]
+        self.item_names = [getattr(eq, "display_name", type(eq).__name__) for eq in bare.backpack]
+        self.max_talents = min(bare.max_talent_slots, len(bare.learned_talents))
+        self.items_by_slot, self._item_slots = {}, {}
+        for i, eq in enumerate(bare.backpack):
+            if getattr(eq, "slot", None) is None: continue
+            self.items_by_slot.setdefault(eq.slot, []).append(i)
+            self._item_slots[i] = eq.slot
+
+        self.enemy_groups = enemy_groups
+        self.enemy_data = enemy_data or simulator.load_enemy_data()
+        self.enemy_profiles = {enemy_id: estimator.enemy_profile(enemy_id, self.enemy_data[enemy_id])
+                               for enemy_ids in enemy_groups.values() for enemy_id in enemy_ids}
+        self.seed = seed if seed is not None else new_seed()
+        self.rng = random.Random(self.seed)
+        self._capacity_cache = {}
+        self._estimates = {}
+
+    # --- 配装的生成与变换 ---
+
+    def capacity(self, talent_indices):
+        """某个天赋组合下各部位的槽位数量（天赋的 on_init 决定，按组合缓存）。"""
+        capacity = self._capacity_cache.get(talent_indices)
+        if capacity is None:
+            char = pickle.loads(self.snapshot)
+            apply_loadout(char, (talent_indices, ()))
+            capacity = self._capacity_cache[talent_indices] = dict(char.SLOT_CAPACITY)
+        return capacity
+
+    def _fit(self, talent_indices, item_indices):
+        """按天赋组合的槽位数量裁掉放不下的装备，返回规范化 (排序后) 的配装。"""
+        capacity = self.capacity(talent_indices)
+        kept, used = [], {}
+        for i in item_indices:
+            slot = self._item_slots[i]
+            if used.get(slot, 0) < capacity.get(slot, 0):
+                used[slot] = used.get(slot, 0) + 1
+                kept.append(i)
+        return talent_indices, tuple(sorted(kept))
+
+    def random_loadout(self):
+        """随机生成一个合法配装：天赋槽填满，每个部位尽量装满。"""
+        talents = tuple(sorted(self.rng.sample(range(len(self.talent_names)), self.max_talents)))
+        capacity = self.capacity(talents)
+        items = []
+        for slot, indices in self.items_by_slot.items():
+            items.extend(self.rng.sample(indices, min(capacity.get(slot, 0), len(indices))))
+        return self._fit(talents, items)
+
+    def random_neighbor(self, loadout):
+        """随机做一次小改动：换一个天赋，或者替换 / 卸下 / 补上一件装备。"""
+        talents, items = loadout
+        moves = []
+        unused_talents = [i for i in range(len(self.talent_names)) if i not in talents]
+        if talents and unused_talents: moves.append("talent")
+        if items: moves += ["replace", "remove"]
+        capacity = self.capacity(talents)
+        free_slots = [slot for slot, indices in self.items_by_slot.items()
+                      if sum(1 for i in items if i in indices) < min(capacity.get(slot, 0), len(indices))]
+        if free_slots: moves.append("add")
+        if not moves: return loadout
+
+        move = self.rng.choice(moves)
+        if move == "talent":
+            new_talents = list(talents)
+            new_talents[self.rng.randrange(len(new_talents))] = self.rng.choice(unused_talents)
+            return self._fit(tuple(sorted(new_talents)), items)
+        new_items = list(items)
+        if move == "add":
+            slot = self.rng.choice(free_slots)
+            new_items.append(self.rng.choice([i for i in self.items_by_slot[slot] if i not in items]))
+        else:
+            old = new_items.pop(self.rng.randrange(len(new_items)))
+            if move == "replace":
+                alternatives = [i for i in self.items_by_slot[self._item_slots[old]] if i not in items]
+                if not alternatives: return loadout
+                new_items.append(self.rng.choice(alternatives))
+        return self._fit(talents, new_items)
+
+    # --- 第一步：解析估算 + 爬山搜索 ---
+
+    def estimate(self, loadout):
+        """估算分数：三组敌人的平均击杀余量 (每场上限 MAX_MARGIN)，按配装缓存。"""
+        score = self._estimates.get(loadout)
+        if score is None:
+            player = estimator.profile(_make_fighter(self.snapshot, loadout))
+            group_scores = []
+            for enemy_ids in self.enemy_groups.values():
+                margins = []
+                for enemy_id in enemy_ids:
+                    est = estimator.estimate_matchup(player, self.enemy_profiles[enemy_id])
+                    margin = 0.0 if est["ttk"] == math.inf else est["time_to_die"] / est["ttk"]
+                    margins.append(min(margin, MAX_MARGIN))
+                group_scores.append(sum(margins) / len(margins))
+            score = self._estimates[loadout] = sum(group_scores) / len(group_scores)
+        return score
+
+    def search(self, budget=2000, patience=60):
+        """
+        随机重启的爬山搜索，最多估算 budget 个不同的配装；返回 [(配装, 估算分数), ...]，高分在前。
+        合法配装总数比 budget 少时，连续 MAX_DRY_RESTARTS 次重启都没有估算到新配装就认为已经搜遍，提前结束。
+        """
+        dry_restarts = 0
+        while len(self._estimates) < budget and dry_restarts < MAX_DRY_RESTARTS:
+            seen = len(self._estimates)
+            current = self.random_loadout()
+            current_score = self.estimate(current)
+            stale = 0
+            while stale < patience and len(self._estimates) < budget:
+                candidate = self.random_neighbor(current)
+                score = self.estimate(candidate)
+                if score > current_score: current, current_score, stale = candidate, score, 0
+                else: stale += 1
+            dry_restarts = dry_restarts + 1 if len(self._estimates) == seen else 0
+        return sorted(self._estimates.items(), key=lambda kv: kv[1], reverse=True)
+
+    # --- 第二步：逐次减半的战斗模拟 ---
+
+    def successive_halving(self, candidates, fights=8, workers=None, progress=None):
+        """
+        对候选配装做逐次减半：每轮每个候选对每个敌人打 fights 场（累计之前的场次），
+        淘汰胜率低的一半，下一轮场数翻倍，直到只剩一个。返回所有候选的结果，胜率高的在前。
+        """
+        enemy_ids = [enemy_id for ids in self.enemy_groups.values() for enemy_id in ids]
+        record = {loadout: {enemy_id: [0, 0] for enemy_id in enemy_ids} for loadout in candidates}
+        survivors, round_index = list(candidates), 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while survivors:
+                futures = []
+                for loadout in survivors:
+                    for enemy_id in enemy_ids:
+                        seed = derive_seed(self.seed, "halving", loadout, enemy_id, round_index)
+                        futures.append((loadout, enemy_id, pool.submit(
+                            _simulate_loadout, self.snapshot, loadout, enemy_id, self.enemy_data[enemy_id], fights, seed)))
+                for loadout, enemy_id, future in futures:
+                    stats = record[loadout][enemy_id]
+                    stats[0] += future.result(); stats[1] += fights
+                survivors.sort(key=lambda loadout: self._win_rate(record[loadout]), reverse=True)
+                if progress: progress(round_index, len(survivors), fights)
+                if len(survivors) == 1: break
+                survivors = survivors[:(len(survivors) + 1) // 2]
+                fights *= 2
+                round_index += 1
+        results = [self.describe(loadout, record[loadout]) for loadout in candidates]
+        return sorted(results, key=lambda r: (r["fights"], r["win_rate"]), reverse=True)
+
+    def _group_win_rates(self, enemy_record):
+        return {group: sum(enemy_record[e][0] / enemy_record[e][1] for e in ids) / len(ids)
+                for group, ids in self.enemy_groups.items()}
+
+    def _win_rate(self, enemy_record):
+        rates = self._group_win_rates(enemy_record)
+        return sum(rates.values()) / len(rates)
+
+    def describe(self, loadout, enemy_record):
+        talents, items = loadout
+        return {"loadout": loadout, "talents": [self.talent_names[i] for i in talents],
+                "equipment": [self.item_names[i] for i in items], "win_rate": self._win_rate(enemy_record),
+                "group_win_rates": self._group_win_rates(enemy_record),
+                "fights": sum(stats[1] for stats in enemy_record.values())}
+
+    def run(self, budget=2000, finalists=16, fights=8, workers=None, progress=None):
+        """完整的两步搜索，返回进入模拟阶段的候选结果，最好的在最前。"""
+        ranked = self.search(budget)
+        return self.successive_halving([loadout for loadout, _ in ranked[:finalists]], fights, workers, progress)
+
+    def apply(self, char, loadout):
+        """把配装换到角色身上（角色须是构造优化器时的那个，且之后没有改动过背包和天赋）。"""
+        strip_loadout(char)
+        apply_loadout(char, loadout)
+
+
+def format_results(results, limit=5):
+    lines = []
+    for rank, result in enumerate(results[:limit], 1):
+        groups = "  ".join(f"{FLOOR_GROUPS[g]} {rate:.0%}" for g, rate in result["group_win_rates"].items())
+        lines.append(f"#{rank}  胜率 {result['win_rate']:.1%}  ({groups}, {result['fights']} 场)")
+        lines.append(f"    天赋: {', '.join(result['talents']) or '-'}")
+        lines.append(f"    装备: {', '.join(result['equipment']) or '-'}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="为一层地牢搜索胜率最高的装备和天赋组合")
+    parser.add_argument("build", help="角色配置 JSON 文件：equipment / talents 为可选的物品和已学天赋")
+    parser.add_argument("--dungeon", required=True, help="地牢 id (dungeons/<id>.json)")
+    parser.add_argument("--floor", type=int, default=1, help="层数")
+    parser.add_argument("--budget", type=int, default=2000, help="解析估算的配装数量上限")
+    parser.add_argument("--finalists", type=int, default=16, help="进入模拟阶段的候选数量")
+    parser.add_argument("--fights", type=int, default=8, help="逐次减半第一轮每个敌人的场数")
+    parser.add_argument("--workers", type=int, default=None, help="进程数 (默认等于 CPU 核心数)")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+
+    with open(args.build, "r", encoding="utf-8") as f:
+        build = json.load(f)
+    with _quiet():
+        player = simulator.build_player(build)
+    if "max_talent_slots" in build:
+        player.max_talent_slots = build["max_talent_slots"]
+        player.equipped_talents = (player.equipped_talents + [None] * player.max_talent_slots)[:player.max_talent_slots]
+    groups = floor_enemy_groups(load_dungeon_data(args.dungeon), args.floor)
+
+    optimizer = BuildOptimizer(player, groups, seed=args.seed)
+    progress = None if args.json else (lambda r, n, fights: print(f"第 {r + 1} 轮：{n} 个候选，每个敌人 {fights} 场"))
+    results = optimizer.run(args.budget, args.finalists, args.fights, args.workers, progress)
+    if args.json:
+        print(json.dumps([{k: v for k, v in r.items() if k != "loadout"} for r in results], ensure_ascii=False, indent=2))
+    else:
+        print(format_results(results))
+
+
+if __name__ == "__main__":
+    main()
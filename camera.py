@@ -13,6 +13,11 @@ class Camera:
         """将一个世界坐标的矩形(rect)转换为相对于摄像机的屏幕坐标。"""
         return entity_rect.move(self.camera_rect.topleft)
 
+    @property
+    def view_rect(self):
+        """镜头当前能看到的世界坐标区域。"""
+        return pygame.Rect(-self.camera_rect.x, -self.camera_rect.y, self.width, self.height)
+
     def update(self, target_entity):
         """让摄像机平滑地跟随目标（通常是玩家）。"""
         x = -target_entity.rect.centerx + int(DUNGEON_VIEW_WIDTH / 2)
@@ -0,0 +1,299 @@
+# 文件: combat_engine.py (新文件)
+"""
+无界面的战斗引擎。
+
+只通过 Character.update / Character.try_attack 推进战斗，不依赖 pygame 窗口、字体或显示器。
+CombatScreen 只负责把引擎产出的结果画出来；平衡模拟则直接调用 run() 在模拟时间里打完整场战斗。
+
+既可以打 1v1，也可以让玩家一次打完整个房间的怪物（遭遇战）：敌人传一个列表即可。
+每个角色的 current_opponent 是它当前的攻击目标，目标倒下后按 target_policy 换下一个；
+opponents 是对方的全部角色，群体效果（日炎光环……）从这里取目标。
+
+战斗按事件推进：CombatScheduler 知道每个角色的下一次普攻、每个 Buff 的下一次跳伤/到期、
+每件物品的下一次计时效果，引擎直接把模拟时间跳到最早的那个事件，而不是逐帧轮询。
+"""
+import heapq
+import itertools
+import random
+
+from Character import Character
+from content_registry import TALENTS
+
+DEFAULT_MAX_DURATION = 300.0   # 模拟战斗的时长上限（秒），防止双方都无法击杀对方时死循环
+EVENT_EPSILON = 1e-9           # 跳到事件时多走一点点，避免浮点误差让计时器差一丝没到点
+
+
+def roll_enemy_talent_names(enemy_preset, rng=None):
+    """按敌人配置掷出本场战斗的天赋类名：possible_talents 按概率获得，talents 必定获得；不存在的天赋忽略。"""
+    rng = rng or random
+    names = [info["talent_class_name"] for info in enemy_preset.get("possible_talents", []) if rng.random() < info["chance"]]
+    names += enemy_preset.get("talents", [])
+    return tuple(name for name in names if name in TALENTS)
+
+def roll_enemy_talents(enemy_preset, rng=None):
+    """按敌人配置掷出本场战斗的天赋（新的天赋实例）。"""
+    return [create_talent(name) for name in roll_enemy_talent_names(enemy_preset, rng)]
+
+def create_talent(talent_class_name):
+    return TALENTS.create(talent_class_name)
+
+class EnemyPrototypes:
+    """
+    敌人原型缓存：每种 (敌人, 掷出的天赋组合) 只完整构造一次（学习、装备天赋，重算属性），
+    之后每次生成都从原型 clone() 一份。原型本身从不上场，所以永远是刚构造好的干净状态。
+    """
+    def __init__(self):
+        self._prototypes = {}  # (敌人 id, 天赋类名元组) -> (构造时用的配置, 原型)
+
+    def create(self, enemy_id, enemy_preset, talent_names):
+        key = (enemy_id, talent_names)
+        cached = self._prototypes.get(key)
+        # 配置被换掉（例如沙盒里重新加载了 enemies.json）时按新配置重建
+        if cached is None or cached[0] is not enemy_preset:
+            prototype = Character(id=enemy_id, name=enemy_preset["name"], talents=[create_talent(name) for name in talent_names],
+                                  **enemy_preset["stats"])
+            cached = self._prototypes[key] = (enemy_preset, prototype)
+        return cached[1].clone()
+
+    def clear(self):
+        self._prototypes.clear()
+
+ENEMY_PROTOTYPES = EnemyPrototypes()
+
+def create_enemy(enemy_id, enemy_preset, rng=None):
+    """根据 enemies.json 中的一条配置生成一个新的敌人角色（天赋用 rng 随机掷出，默认全局 random）。"""
+    return ENEMY_PROTOTYPES.create(enemy_id, enemy_preset, roll_enemy_talent_names(enemy_preset, rng))
+
+def create_enemies(enemy_ids, enemy_data, rng=None):
+    """按出场顺序生成一组敌人（一个房间的怪物）。"""
+    return [create_enemy(enemy_id, enemy_data[enemy_id], rng) for enemy_id in enemy_ids]
+
+
+# --- 选目标策略：policy(攻击者, 对方还站着的角色列表) -> 目标 ---
+
+def first_alive(attacker, candidates):
+    """集火：按出场顺序打第一个还站着的。"""
+    return candidates[0]
+
+def lowest_hp(attacker, candidates):
+    """补刀：打当前生命值最低的。"""
+    return min(candidates, key=lambda c: c.hp)
+
+
+class CombatResult:
+    """一场战斗的结算报告"""
+    def __init__(self, winner, loser, duration, damage_reports, timed_out=False, winners=(), losers=()):
+        self.winner = winner                  # 获胜方 (超时则为 None)；遭遇战中是获胜一方的领头角色
+        self.loser = loser                    # 落败方 (超时则为 None)；遭遇战中是落败一方的领头角色
+        self.winners = list(winners)          # 获胜一方的全部角色
+        self.losers = list(losers)            # 落败一方的全部角色
+        self.duration = duration              # 模拟时长 (秒)
+        self.damage_reports = damage_reports  # 所有普攻的伤害报告 (take_damage 的返回值)
+        self.timed_out = timed_out            # 是否因超过时长上限而结束
+
+
+class CombatScheduler:
+    """
+    战斗事件的优先队列。
+
+    每个计时源（角色普攻、Buff 跳伤/到期、物品计时器）按绝对到期时间放进最小堆。模拟时间对所有计时源同速流逝，
+    没被碰过的计时源到期时间不变，所以 reschedule() 只重新询问两类角色的计时源：
+    刚到点的事件的主人，以及状态被改动过的角色（受伤、Buff 增减、属性重算……见 Character.timing_dirty）。
+    到期时间变了的计时源压入新条目，旧条目留在堆里，出队时发现已经作废就丢掉。
+    """
+    def __init__(self, fighters):
+        self.fighters = fighters
+        self._heap = []
+        self._seq = itertools.count()  # 同一时刻的事件按登记顺序出队，也避免比较角色对象
+        self._entries = {}  # (类型, 来源) -> 当前有效的堆条目
+        self._keys = {}     # 角色 -> 它名下计时源的键
+        for fighter in fighters: fighter.timing_dirty = True
+
+    def reschedule(self, now):
+        heap, entries = self._heap, self._entries
+        # 已经到点的条目：有效的说明主人刚在这一步里行动过，要重新询问
+        while heap and heap[0][0] <= now:
+            entry = heapq.heappop(heap)
+            if entries.get((entry[2], entry[3])) is entry:
+                del entries[(entry[2], entry[3])]
+                entry[4].timing_dirty = True
+        for fighter in self.fighters:
+            if fighter.timing_dirty: self._requery(fighter, now)
+
+    def _requery(self, fighter, now):
+        fighter.timing_dirty = False
+        keys = []
+        if fighter.hp > 0:  # 遭遇战里先倒下的角色不再行动，身上的 Buff 也不再计时
+            delay = fighter.next_attack_in()
+            if delay is not None: keys.append(self._put("attack", fighter, now + delay, fighter))
+            for kind, source in (("buff", "buffs"), ("item", "items")):
+                for next_tick_in in fighter.hooks(source, "next_tick_in"):
+                    delay = next_tick_in()
+                    if delay is not None: keys.append(self._put(kind, next_tick_in.__self__, now + delay, fighter))
+        for key in self._keys.get(fighter, ()):
+            if key not in keys: self._entries.pop(key, None)
+        self._keys[fighter] = keys
+
+    def _put(self, kind, source, due, owner):
+        key = (kind, source)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != due:
+            entry = self._entries[key] = (due, next(self._seq), kind, source, owner)
+            heapq.heappush(self._heap, entry)
+        return key
+
+    def peek(self):
+        """返回最早的事件 (时间, 序号, 类型, 来源, 主人)，没有任何计时源时返回 None。"""
+        heap, entries = self._heap, self._entries
+        while heap and entries.get((heap[0][2], heap[0][3])) is not heap[0]: heapq.heappop(heap)
+        return heap[0] if heap else None
+
+
+class CombatEngine:
+    """
+    驱动一场战斗：玩家对一个敌人 (1v1)，或对一组敌人（enemy 传列表，整个房间一场打完）。
+
+    - start():        进入战斗，重置状态并触发战斗开始效果
+    - step(dt):       推进 dt 秒的模拟时间
+    - advance(dt):    供实时界面使用，处理这段真实时间内的所有事件
+    - run():          无界面地逐事件打完整场战斗，返回 CombatResult
+
+    传入 rng 时，双方在这场战斗中的所有随机判定（暴击、装备/天赋触发）都从它取值，
+    同样的种子和同样的双方状态能精确重现整场战斗。
+    传入 recorder (replay.ReplayRecorder) 时把整场战斗录成回放。
+    传入 profiler (profiler.HookProfiler) 时统计双方每个钩子的调用次数和耗时。
+    target_policy 决定目标倒下后换谁打（见 first_alive / lowest_hp）。
+    """
+    def __init__(self, player, enemy, max_duration=DEFAULT_MAX_DURATION, rng=None, recorder=None, profiler=None,
+                 target_policy=first_alive):
+        self.player = player
+        self.allies = [player]
+        self.enemies = list(enemy) if isinstance(enemy, (list, tuple)) else [enemy]
+        self.enemy = self.enemies[0]  # 领头的敌人；1v1 时就是唯一的敌人
+        self.fighters = self.allies + self.enemies  # 出手顺序：玩家一方在前
+        self.target_policy = target_policy
+        self.max_duration = max_duration
+        self.rng = rng
+        self.recorder = recorder
+        if recorder is not None: recorder.attach(self)
+        self.profiler = profiler
+        self.elapsed = 0.0
+        self.clock = 0.0  # 实时界面已经走过的真实时间；elapsed 只会停在事件上，追着它走
+        self.damage_reports = []
+        self.started = False
+        self.is_over = False
+        self.scheduler = CombatScheduler(self.fighters)
+
+    @property
+    def is_group(self):
+        return len(self.fighters) > 2
+
+    def start(self):
+        """进入战斗：所有角色重置战斗状态、选好第一个目标，然后触发战斗开始效果。"""
+        for char in self.fighters:
+            if self.rng is not None: char.rng = self.rng
+            if self.recorder is not None: char.recorder = self.recorder
+            if self.profiler is not None: char.profiler = self.profiler  # on_enter_combat 会重建钩子表，届时包上计时
+        for char in self.fighters:
+            char.on_enter_combat()
+        for char in self.allies: char.opponents = self.enemies
+        for char in self.enemies: char.opponents = self.allies
+        for char in self.fighters: char.current_opponent = None
+        self._retarget()
+        self._trigger_battle_start_events()
+        self.started = True
+        self._check_battle_end()
+
+    def _retarget(self):
+        """目标已经倒下（或还没有目标）的角色，从对方还站着的角色里按 target_policy 重新选。"""
+        for char in self.fighters:
+            target = char.current_opponent
+            if target is not None and target.hp > 0: continue
+            candidates = [c for c in char.opponents if c.hp > 0]
+            if candidates: char.current_opponent = self.target_policy(char, candidates)
+
+    def _trigger_battle_start_events(self):
+        for char in self.fighters:
+            for hook in char.hooks("talents", "on_battle_start"): hook(char, char.current_opponent)
+            for hook in char.hooks("items", "on_battle_start"): hook(char)
+
+    def step(self, dt):
+        """推进 dt 秒的模拟时间，返回期间发生的普攻 [(攻击者, 伤害报告), ...]。"""
+        if self.is_over: return []
+        self.elapsed += dt
+        # 这一刻开始时还站着的角色都会行动：同一时刻的出手同时结算，先被打倒的一方也能完成这次出手
+        acting = [char for char in self.fighters if char.hp > 0]
+        for char in acting:
+            char.update(dt)
+
+        attacks = []
+        for attacker in acting:
+            report = attacker.try_attack(attacker.current_opponent, dt)
+            if report:
+                self.damage_reports.append(report)
+                attacks.append((attacker, report))
+        self._check_battle_end()
+        if not self.is_over and self.is_group: self._retarget()
+        if self.recorder is not None: self.recorder.tick()
+        return attacks
+
+    def next_event_delay(self):
+        """距离下一个战斗事件还有多少秒；双方都不会再有任何动作时返回 None。"""
+        self.scheduler.reschedule(self.elapsed)
+        event = self.scheduler.peek()
+        return None if event is None else max(0.0, event[0] - self.elapsed)
+
+    def advance(self, real_dt):
+        """
+        真实时间走过 real_dt 秒：结算在这之前到点的所有事件。
+        模拟时间只按 run() 完全相同的步子从一个事件跳到下一个事件，不会按帧切出零碎的步子，
+        所以界面帧率只影响多久调用一次，连浮点误差都和无界面重演一模一样（回放校验依赖这一点）。
+        """
+        self.clock = max(self.clock, self.elapsed) + real_dt
+        attacks = []
+        while not self.is_over:
+            delay = self.next_event_delay()
+            if delay is None or self.elapsed + delay > self.clock: break
+            attacks.extend(self.step(delay + EVENT_EPSILON))
+        return attacks
+
+    def run(self):
+        """无界面地逐事件打完整场战斗（或到达时长上限），返回 CombatResult。"""
+        if not self.started: self.start()
+        while not self.is_over and self.elapsed < self.max_duration:
+            delay = self.next_event_delay()
+            if delay is None: break  # 双方都不会再行动，只能判超时
+            self.step(min(delay + EVENT_EPSILON, self.max_duration - self.elapsed))
+        if not self.is_over and self.recorder is not None: self.recorder.end(None)  # 超时，无胜者
+        result = self.result()
+        self.finish()
+        return result
+
+    @staticmethod
+    def _defeated(side):
+        return all(char.hp <= 0 for char in side)
+
+    def _check_battle_end(self):
+        if self._defeated(self.enemies) or self._defeated(self.allies):
+            self.is_over = True
+            if self.recorder is not None: self.recorder.end(self.result().winner)
+
+    def result(self):
+        # 与界面逻辑一致：敌人全部倒下即算胜利（即使同归于尽）
+        if self._defeated(self.enemies): winners, losers = self.allies, self.enemies
+        elif self._defeated(self.allies): winners, losers = self.enemies, self.allies
+        else: winners, losers = (), ()
+        winner, loser = (winners[0], losers[0]) if winners else (None, None)
+        return CombatResult(winner, loser, self.elapsed, self.damage_reports, timed_out=not self.is_over,
+                            winners=winners, losers=losers)
+
+    def finish(self):
+        """战斗结束后解除所有角色的对手引用，并撤下注入的随机数流、录制器和分析器。"""
+        for char in self.fighters:
+            char.current_opponent = None
+            vars(char).pop("opponents", None)
+            if self.rng is not None: vars(char).pop("rng", None)
+            if self.recorder is not None: vars(char).pop("recorder", None)
+            if self.profiler is not None:
+                vars(char).pop("profiler", None)
+                char.invalidate_hooks()  # 丢掉带计时的钩子表
@@ -0,0 +1,107 @@
+# 文件: content_registry.py (新文件)
+"""
+装备与天赋的注册表。
+
+启动时把 Equips / Talents 里的每个子类各实例化一次，读出品质、槽位、类型，按这些字段建好索引；
+宝箱、商店、沙盒不用每次都遍历模块、逐个实例化类来找东西了。
+
+    ITEMS.select(rarity="rare", slot="weapon")     # 满足条件的类（元组，结果缓存）
+    ITEMS.choice(rng, exclude=("DragonHeart",))    # 从中等概率抽一个类
+    ITEMS.info(Equips.WoodenSword).upgrade         # WoodenSword_Star
+    TALENTS.create("DualWieldTalent")              # 按类名新建实例，不存在返回 None
+
+类按名字排序（与 inspect.getmembers 一致），同样的随机数流抽到的东西和以前遍历模块时一样。
+"""
+import inspect
+
+import Equips
+import Talents
+
+
+class ContentInfo:
+    """一个装备 / 天赋类的索引信息。tier 是升级次数（UPGRADE_MAP 里的基础版为 0，升级一次为 1）。"""
+    __slots__ = ("name", "cls", "display_name", "rarity", "slot", "type", "tier", "upgrade", "base")
+
+    def __init__(self, cls, probe):
+        self.name, self.cls = cls.__name__, cls
+        self.display_name = getattr(probe, "display_name", None) or cls.__name__
+        self.rarity = getattr(probe, "rarity", "common")
+        self.slot = getattr(probe, "slot", None)
+        self.type = getattr(probe, "type", None)
+        self.tier, self.upgrade, self.base = 0, None, None
+
+
+class ContentRegistry:
+    def __init__(self, module, base_class, upgrade_map=None):
+        classes = [cls for _, cls in inspect.getmembers(module, inspect.isclass)
+                   if issubclass(cls, base_class) and cls is not base_class]
+        self.classes = tuple(classes)
+        self._infos = {cls: ContentInfo(cls, cls()) for cls in classes}
+        self._by_name = {cls.__name__: cls for cls in classes}
+        self._selections = {}  # 筛选条件 -> 满足条件的类元组
+
+        for base, upgraded in (upgrade_map or {}).items():
+            self._infos[base].upgrade = upgraded
+            self._infos[upgraded].base = base
+        for info in self._infos.values():
+            base = info.base
+            while base is not None:
+                info.tier += 1
+                base = self._infos[base].base
+
+        self.by_rarity, self.by_slot, self.by_type, self.by_tier = {}, {}, {}, {}
+        for cls in classes:
+            info = self._infos[cls]
+            self.by_rarity.setdefault(info.rarity, []).append(cls)
+            self.by_slot.setdefault(info.slot, []).append(cls)
+            self.by_type.setdefault(info.type, []).append(cls)
+            self.by_tier.setdefault(info.tier, []).append(cls)
+        for index in (self.by_rarity, self.by_slot, self.by_type, self.by_tier):
+            for key in index: index[key] = tuple(index[key])
+
+    def __len__(self):
+        return len(self.classes)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def get(self, name):
+        """按类名取类，不存在返回 None。"""
+        return self._by_name.get(name)
+
+    def create(self, name):
+        """按类名新建一个实例，不存在返回 None。"""
+        cls = self._by_name.get(name)
+        return cls() if cls is not None else None
+
+    def info(self, cls_or_name):
+        if isinstance(cls_or_name, str): cls_or_name = self._by_name[cls_or_name]
+        return self._infos[cls_or_name]
+
+    def select(self, rarity=None, slot=None, type=None, tier=None, exclude=()):
+        """满足全部条件（None 表示不限）、且类名不在 exclude 中的类；同样的条件只筛选一次。"""
+        key = (rarity, slot, type, tier, tuple(exclude))
+        selection = self._selections.get(key)
+        if selection is None:
+            selection = self._selections[key] = tuple(
+                cls for cls in self.classes
+                if (rarity is None or self._infos[cls].rarity == rarity)
+                and (slot is None or self._infos[cls].slot == slot)
+                and (type is None or self._infos[cls].type == type)
+                and (tier is None or self._infos[cls].tier == tier)
+                and cls.__name__ not in exclude)
+        return selection
+
+    def choice(self, rng, **filters):
+        """从满足条件的类中等概率抽一个；没有满足条件的类时返回 None。"""
+        pool = self.select(**filters)
+        return rng.choice(pool) if pool else None
+
+    def sample(self, rng, k, **filters):
+        """从满足条件的类中不重复地抽至多 k 个。"""
+        pool = self.select(**filters)
+        return rng.sample(pool, min(k, len(pool)))
+
+
+ITEMS = ContentRegistry(Equips, Equips.Equipment, Equips.UPGRADE_MAP)
+TALENTS = ContentRegistry(Talents, Talents.Talent)
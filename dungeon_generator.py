@@ -1,119 +1,39 @@
 # dungeon_generator.py (完整替换)
 
-import random
 import pygame
 from settings import *
 from wall_sprite import Wall
 from door_sprite import Door
+from spatial_hash import SpatialGroup
+import layout_cache
+from rng import seeded_stream
 
-# 定义常量
-WALL_THICKNESS = 15
-TILE_SIZE = 50
-ROOM_GRID_WIDTH = 17
-ROOM_GRID_HEIGHT = 11
-ROOM_PIXEL_WIDTH = TILE_SIZE * ROOM_GRID_WIDTH
-ROOM_PIXEL_HEIGHT = TILE_SIZE * ROOM_GRID_HEIGHT
+# 定义常量（布局相关的常量和 Room 定义在 dungeon_layout 中，这里重新导出，旧代码照常使用）
+from dungeon_layout import (WALL_THICKNESS, TILE_SIZE, ROOM_GRID_WIDTH, ROOM_GRID_HEIGHT, ROOM_PIXEL_WIDTH, ROOM_PIXEL_HEIGHT,
+                            Room, FloorLayout, generate_layout)
 
-class Room:
-    """逻辑房间单元"""
-    def __init__(self, x, y, room_type="combat", is_corridor=False):
-        self.x, self.y, self.type = x, y, room_type
-        self.is_corridor = is_corridor
-        self.doors = {"N": False, "S": False, "E": False, "W": False}
-        self.is_cleared = False
-        self.monsters = []
-        self.world_rect = pygame.Rect(
-            x * ROOM_PIXEL_WIDTH, y * ROOM_PIXEL_HEIGHT,
-            ROOM_PIXEL_WIDTH, ROOM_PIXEL_HEIGHT
-        )
-
-def generate_new_dungeon_floor(num_rooms=8, floor_data=None, impassable_group_for_doors=None):
-    """一个完整的、带走廊的地牢生成函数。"""
-    # === 第1步: 生成房间和走廊的逻辑布局 ===
-    grid_width, grid_height = 42, 42
-    grid = [[None for _ in range(grid_width)] for _ in range(grid_height)]
-    logical_rooms = {}
-    sx, sy = grid_width // 2, grid_height // 2
-    if sx % 2 != 0: sx -=1
-    if sy % 2 != 0: sy -=1
-    start_room = Room(sx, sy, "start")
-    start_room.is_cleared = True
-    grid[sy][sx] = start_room
-    logical_rooms[(sx, sy)] = start_room
-    room_coords = [(sx, sy)]
-    while len(room_coords) < num_rooms and room_coords:
-        px, py = random.choice(room_coords)
-        directions = [(0, -2, "N", "S"), (0, 2, "S", "N"), (2, 0, "E", "W"), (-2, 0, "W", "E")]
-        random.shuffle(directions)
-        for dx, dy, door, opposite_door in directions:
-            nx, ny = px + dx, py + dy
-            if 0 <= nx < grid_width and 0 <= ny < grid_height and not grid[ny][nx]:
-                new_room = Room(nx, ny)
-                grid[ny][nx] = new_room
-                logical_rooms[(nx, ny)] = new_room
-                room_coords.append((nx, ny))
-                corridor_x, corridor_y = px + dx // 2, py + dy // 2
-                corridor = Room(corridor_x, corridor_y, "combat", is_corridor=True)
-                corridor.is_cleared = True
-                grid[corridor_y][corridor_x] = corridor
-                logical_rooms[(corridor_x, corridor_y)] = corridor
-                grid[py][px].doors[door] = True
-                corridor.doors[opposite_door] = True
-                corridor.doors[door] = True
-                new_room.doors[opposite_door] = True
-                break
-        else:
-            room_coords.remove((px, py))
-
-    # === 第2步: 为"真正的"房间分配类型 ===
-    main_rooms = [r for r in logical_rooms.values() if not r.is_corridor]
-    farthest_dist, boss_room = -1, start_room
-    for room in main_rooms:
-        dist = abs(room.x - sx) + abs(room.y - sy)
-        if dist > farthest_dist and room is not start_room:
-            farthest_dist, boss_room = dist, room
-    boss_room.type = "boss"
-    special_room_candidates = [r for r in main_rooms if r.type == "combat"]
-    room_types_to_assign = ["event", "treasure", "shop", "rest", "elite"]
-    for room_type in room_types_to_assign:
-        if special_room_candidates:
-            candidate = random.choice(special_room_candidates)
-            candidate.type = room_type
-            special_room_candidates.remove(candidate)
-    
-    ### --- 关键修复：恢复并集成怪物数据生成逻辑 --- ###
-    # === 第3步: 填充房间内容 (怪物等) ===
-    m_uid_counter = 0
-    for room in main_rooms:
-        if room.type in ["combat", "elite", "boss"]:
-            num, e_id = 1, "slime" # 默认生成1个史莱姆
-            
-            # 只有在 floor_data 存在时，才尝试读取更高级的怪物
-            if floor_data:
-                if room.type == "boss":
-                    num = 1
-                    e_id = floor_data.get("boss_id", "ruin_golem")
-                elif room.type == "elite":
-                    num = random.randint(2, 3)
-                    if floor_data.get("elite_pool"): e_id = random.choice(floor_data["elite_pool"])
-                else: # 普通战斗房间
-                    num = random.randint(1, 3)
-                    if floor_data.get("monster_pool"): e_id = random.choice(floor_data["monster_pool"])
-            
-            for _ in range(num):
-                px = random.randint(room.world_rect.left + TILE_SIZE*2, room.world_rect.right - TILE_SIZE*2)
-                py = random.randint(room.world_rect.top + TILE_SIZE*2, room.world_rect.bottom - TILE_SIZE*2)
-                room.monsters.append({'id': e_id, 'pos': (px, py), 'uid': f'm_{m_uid_counter}'})
-                m_uid_counter += 1
-    ### --- 修复结束 --- ###
+def generate_new_dungeon_floor(num_rooms=8, floor_data=None, impassable_group_for_doors=None, rng=None, seed=None,
+                               dungeon_id=None, floor_number=None):
+    """
+    一个完整的、带走廊的地牢生成函数。rng 为随机数流（默认全局 random），同一种子生成同一层地牢。
+    给出 seed 时用它生成；再给出 dungeon_id 和 floor_number 时布局走磁盘缓存（见 layout_cache.py）。
+    """
+    if seed is not None and dungeon_id is not None:
+        layout = layout_cache.load_layout(dungeon_id, floor_number, floor_data, seed, num_rooms)
+    else:
+        layout = generate_layout(num_rooms, floor_data, seeded_stream(seed) if seed is not None else rng)
+    all_sprites, wall_sprites, door_sprites = materialize_floor(layout, impassable_group_for_doors)
+    return all_sprites, wall_sprites, door_sprites, layout.rooms, layout.start_room
 
+def materialize_floor(layout, impassable_group_for_doors=None):
+    """把逻辑布局变成地板、墙壁和门的精灵，返回 (all_sprites, wall_sprites, door_sprites)。只在真正进入这一层时调用。"""
     # === 第4步: 根据所有布局创建实体精灵 ===
     all_sprites = pygame.sprite.Group()
-    wall_sprites = pygame.sprite.Group()
+    wall_sprites = SpatialGroup()  # 墙按网格索引，碰撞查询只看附近的墙
     door_sprites = pygame.sprite.Group()
     CORRIDOR_WIDTH = TILE_SIZE * 3
 
-    for room in logical_rooms.values():
+    for room in layout.rooms:
         if room.is_corridor:
             is_horizontal = room.doors["E"] and room.doors["W"]
             if is_horizontal:
@@ -163,4 +83,4 @@ def generate_new_dungeon_floor(num_rooms=8, floor_data=None, impassable_group_fo
                 wall_sprites.add(Wall(room.world_rect.right - WALL_THICKNESS, room.world_rect.centery + door_size/2, WALL_THICKNESS, room.world_rect.height/2 - door_size/2))
             
     all_sprites.add(wall_sprites, door_sprites)
-    return all_sprites, wall_sprites, door_sprites, list(logical_rooms.values()), start_room
\ No newline at end of file
+    return all_sprites, wall_sprites, door_sprites
\ No newline at end of file
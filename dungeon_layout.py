@@ -0,0 +1,270 @@
+# 文件: dungeon_layout.py (新文件)
+"""
+地牢楼层的逻辑布局：房间和走廊的位置、门、房间类型、怪物。纯数据，不依赖 pygame。
+
+generate_layout() 只掷骰子、摆房间，得到一个 FloorLayout；真正进入这一层时再由
+dungeon_generator.materialize_floor() 把它变成墙、门、地板精灵。布局可以在工作进程里成批生成和校验，
+也可以 pickle 下来，在需要之前一直只是很便宜的数据。
+
+    layout = generate_layout(num_rooms=10, floor_data=pool, rng=random.Random(seed))
+    layout.validate()          # [] 表示没有问题
+    FloorLayout.from_data(layout.to_data())   # 紧凑的 JSON 数据，用于磁盘缓存和存档（见 layout_cache.py）
+    python dungeon_layout.py --seeds 5000 --workers 8       # 批量校验一批种子
+"""
+import argparse
+import collections
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+# 定义常量
+WALL_THICKNESS = 15
+TILE_SIZE = 50
+ROOM_GRID_WIDTH = 17
+ROOM_GRID_HEIGHT = 11
+ROOM_PIXEL_WIDTH = TILE_SIZE * ROOM_GRID_WIDTH
+ROOM_PIXEL_HEIGHT = TILE_SIZE * ROOM_GRID_HEIGHT
+GRID_WIDTH, GRID_HEIGHT = 42, 42   # 布局网格；房间在偶数格，走廊在两个房间之间的奇数格
+SPECIAL_ROOM_TYPES = ("event", "treasure", "shop", "rest", "elite")
+DIRECTIONS = {"N": (0, -1), "S": (0, 1), "E": (1, 0), "W": (-1, 0)}
+GENERATOR_VERSION = 1   # generate_layout 对同一种子的输出有任何变化时加一，旧的缓存布局随之作废
+
+
+class Room:
+    """逻辑房间单元。world_bounds 是世界坐标下的 (x, y, 宽, 高)；world_rect 是对应的 pygame.Rect，第一次用到时才创建。"""
+    def __init__(self, x, y, room_type="combat", is_corridor=False):
+        self.x, self.y, self.type = x, y, room_type
+        self.is_corridor = is_corridor
+        self.doors = {"N": False, "S": False, "E": False, "W": False}
+        self.is_cleared = False
+        self.monsters = []
+        self.world_bounds = (x * ROOM_PIXEL_WIDTH, y * ROOM_PIXEL_HEIGHT, ROOM_PIXEL_WIDTH, ROOM_PIXEL_HEIGHT)
+        self._world_rect = None
+
+    @property
+    def world_rect(self):
+        if self._world_rect is None:
+            import pygame
+            self._world_rect = pygame.Rect(self.world_bounds)
+        return self._world_rect
+
+    def __getstate__(self):
+        # 布局存成纯数据，pygame.Rect 读回来后再按需创建
+        state = self.__dict__.copy()
+        state["_world_rect"] = None
+        return state
+
+
+class FloorLayout:
+    """一层地牢的逻辑布局。rooms 的顺序就是生成顺序（房间与走廊交错），后续的精灵、小地图都按这个顺序遍历。"""
+    def __init__(self, rooms, start_room):
+        self.rooms, self.start_room = rooms, start_room
+        self.cells = {(room.x, room.y): room for room in rooms}   # 网格坐标 -> 房间 / 走廊
+        self._order = {room: i for i, room in enumerate(rooms)}
+
+    def room_at(self, x, y):
+        """世界坐标 (x, y) 所在的房间或走廊格子，不在任何格子里返回 None。房间排成规则网格，直接换算。"""
+        return self.cells.get((x // ROOM_PIXEL_WIDTH, y // ROOM_PIXEL_HEIGHT))
+
+    def rooms_touching(self, rect):
+        """与世界坐标矩形 rect 相交的格子（最多四个），按 rooms 的顺序排列；只换算 rect 覆盖的网格，与楼层大小无关。"""
+        left, top, width, height = rect
+        found = [self.cells.get((cx, cy)) for cy in range(top // ROOM_PIXEL_HEIGHT, (top + height - 1) // ROOM_PIXEL_HEIGHT + 1)
+                 for cx in range(left // ROOM_PIXEL_WIDTH, (left + width - 1) // ROOM_PIXEL_WIDTH + 1)]
+        return self.in_order(room for room in found if room is not None)
+
+    def in_order(self, rooms):
+        """把一组房间按 rooms 的顺序排好，返回列表。"""
+        return sorted(rooms, key=self._order.__getitem__)
+
+    def neighbours(self, room):
+        """通过门与 room 直接相连的格子（房间连着走廊，走廊连着两头的房间）。"""
+        keys = [(room.x + dx, room.y + dy) for door, (dx, dy) in DIRECTIONS.items() if room.doors[door]]
+        return [self.cells[key] for key in keys if key in self.cells]
+
+    def to_data(self):
+        """
+        紧凑的、可以直接写成 JSON 的布局数据。每个格子一行：
+        [x, y, 类型, 是否走廊, 开着的门 (如 "NE"), 是否已清空, [[怪物 id, x, y, uid], ...]]。
+        清空状态和剩下的怪物也一并记下，所以同一份数据既是布局缓存，也是地牢存档。
+        """
+        rooms = [[room.x, room.y, room.type, int(room.is_corridor), "".join(d for d in "NSEW" if room.doors[d]), int(room.is_cleared),
+                  [[m['id'], m['pos'][0], m['pos'][1], m['uid']] for m in room.monsters]] for room in self.rooms]
+        return {"start": self._order[self.start_room], "rooms": rooms}
+
+    @classmethod
+    def from_data(cls, data):
+        """to_data() 的逆过程。"""
+        rooms = []
+        for x, y, room_type, is_corridor, doors, is_cleared, monsters in data["rooms"]:
+            room = Room(x, y, room_type, bool(is_corridor))
+            room.doors = {d: d in doors for d in "NSEW"}
+            room.is_cleared = bool(is_cleared)
+            room.monsters = [{'id': m_id, 'pos': (px, py), 'uid': uid} for m_id, px, py, uid in monsters]
+            rooms.append(room)
+        return cls(rooms, rooms[data["start"]])
+
+    @property
+    def main_rooms(self):
+        return [room for room in self.rooms if not room.is_corridor]
+
+    def room_counts(self):
+        """{房间类型: 数量}，不含走廊。"""
+        return collections.Counter(room.type for room in self.main_rooms)
+
+    def validate(self):
+        """检查布局是否合理，返回问题描述的列表（空列表表示没有问题）。"""
+        problems = []
+        cells = self.cells
+        counts = self.room_counts()
+        if counts["start"] != 1: problems.append(f"起始房间有 {counts['start']} 个")
+        if counts["boss"] != 1: problems.append(f"首领房间有 {counts['boss']} 个")
+        for room in self.rooms:
+            for door, (dx, dy) in DIRECTIONS.items():
+                if not room.doors[door]: continue
+                neighbour = cells.get((room.x + dx, room.y + dy))
+                opposite = {"N": "S", "S": "N", "E": "W", "W": "E"}[door]
+                if neighbour is None or not neighbour.doors[opposite]:
+                    problems.append(f"({room.x}, {room.y}) 的 {door} 门没有对应的门")
+            if room.monsters and room.type not in ("combat", "elite", "boss"):
+                problems.append(f"({room.x}, {room.y}) 是 {room.type} 房间却有怪物")
+            if room.type in ("combat", "elite", "boss") and not room.is_corridor and not room.monsters:
+                problems.append(f"({room.x}, {room.y}) 是 {room.type} 房间却没有怪物")
+        # 从起点沿着门走，所有房间都要能走到
+        seen, frontier = {(self.start_room.x, self.start_room.y)}, [self.start_room]
+        while frontier:
+            room = frontier.pop()
+            for door, (dx, dy) in DIRECTIONS.items():
+                key = (room.x + dx, room.y + dy)
+                if room.doors[door] and key in cells and key not in seen:
+                    seen.add(key); frontier.append(cells[key])
+        if len(seen) != len(self.rooms): problems.append(f"有 {len(self.rooms) - len(seen)} 个房间无法到达")
+        return problems
+
+
+def generate_layout(num_rooms=8, floor_data=None, rng=None):
+    """生成一层地牢的逻辑布局。rng 为随机数流（默认全局 random），同一种子生成同一层地牢。"""
+    rng = rng or random
+    # === 第1步: 生成房间和走廊的逻辑布局 ===
+    grid_width, grid_height = GRID_WIDTH, GRID_HEIGHT
+    grid = [[None for _ in range(grid_width)] for _ in range(grid_height)]
+    logical_rooms = {}
+    sx, sy = grid_width // 2, grid_height // 2
+    if sx % 2 != 0: sx -=1
+    if sy % 2 != 0: sy -=1
+    start_room = Room(sx, sy, "start")
+    start_room.is_cleared = True
+    grid[sy][sx] = start_room
+    logical_rooms[(sx, sy)] = start_room
+    room_coords = [(sx, sy)]
+    while len(room_coords) < num_rooms and room_coords:
+        px, py = rng.choice(room_coords)
+        directions = [(0, -2, "N", "S"), (0, 2, "S", "N"), (2, 0, "E", "W"), (-2, 0, "W", "E")]
+        rng.shuffle(directions)
+        for dx, dy, door, opposite_door in directions:
+            nx, ny = px + dx, py + dy
+            if 0 <= nx < grid_width and 0 <= ny < grid_height and not grid[ny][nx]:
+                new_room = Room(nx, ny)
+                grid[ny][nx] = new_room
+                logical_rooms[(nx, ny)] = new_room
+                room_coords.append((nx, ny))
+                corridor_x, corridor_y = px + dx // 2, py + dy // 2
+                corridor = Room(corridor_x, corridor_y, "combat", is_corridor=True)
+                corridor.is_cleared = True
+                grid[corridor_y][corridor_x] = corridor
+                logical_rooms[(corridor_x, corridor_y)] = corridor
+                grid[py][px].doors[door] = True
+                corridor.doors[opposite_door] = True
+                corridor.doors[door] = True
+                new_room.doors[opposite_door] = True
+                break
+        else:
+            room_coords.remove((px, py))
+
+    # === 第2步: 为"真正的"房间分配类型 ===
+    main_rooms = [r for r in logical_rooms.values() if not r.is_corridor]
+    farthest_dist, boss_room = -1, start_room
+    for room in main_rooms:
+        dist = abs(room.x - sx) + abs(room.y - sy)
+        if dist > farthest_dist and room is not start_room:
+            farthest_dist, boss_room = dist, room
+    boss_room.type = "boss"
+    special_room_candidates = [r for r in main_rooms if r.type == "combat"]
+    for room_type in SPECIAL_ROOM_TYPES:
+        if special_room_candidates:
+            candidate = rng.choice(special_room_candidates)
+            candidate.type = room_type
+            special_room_candidates.remove(candidate)
+
+    # === 第3步: 填充房间内容 (怪物等) ===
+    m_uid_counter = 0
+    for room in main_rooms:
+        if room.type in ["combat", "elite", "boss"]:
+            num, e_id = 1, "slime" # 默认生成1个史莱姆
+
+            # 只有在 floor_data 存在时，才尝试读取更高级的怪物
+            if floor_data:
+                if room.type == "boss":
+                    num = 1
+                    e_id = floor_data.get("boss_id", "ruin_golem")
+                elif room.type == "elite":
+                    num = rng.randint(2, 3)
+                    if floor_data.get("elite_pool"): e_id = rng.choice(floor_data["elite_pool"])
+                else: # 普通战斗房间
+                    num = rng.randint(1, 3)
+                    if floor_data.get("monster_pool"): e_id = rng.choice(floor_data["monster_pool"])
+
+            left, top, width, height = room.world_bounds
+            for _ in range(num):
+                px = rng.randint(left + TILE_SIZE*2, left + width - TILE_SIZE*2)
+                py = rng.randint(top + TILE_SIZE*2, top + height - TILE_SIZE*2)
+                room.monsters.append({'id': e_id, 'pos': (px, py), 'uid': f'm_{m_uid_counter}'})
+                m_uid_counter += 1
+
+    return FloorLayout(list(logical_rooms.values()), start_room)
+
+
+def _validate_seeds(floor_data, num_rooms, seeds):
+    """工作进程：生成并校验一批种子的布局，返回 [(种子, 问题列表), ...]（只含有问题的种子）和房间类型计数。"""
+    failures, counts = [], collections.Counter()
+    for seed in seeds:
+        layout = generate_layout(num_rooms, floor_data, random.Random(seed))
+        counts.update(layout.room_counts())
+        problems = layout.validate()
+        if problems: failures.append((seed, problems))
+    return failures, counts
+
+
+def validate_seeds(floor_data, seeds, num_rooms=10, workers=None, chunk=500):
+    """在多个进程里批量生成并校验布局，返回 ([(种子, 问题列表), ...], 房间类型总数)。"""
+    seeds = list(seeds)
+    failures, counts = [], collections.Counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_validate_seeds, floor_data, num_rooms, seeds[i:i + chunk]) for i in range(0, len(seeds), chunk)]
+        for future in futures:
+            chunk_failures, chunk_counts = future.result()
+            failures.extend(chunk_failures); counts.update(chunk_counts)
+    return failures, counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量生成并校验地牢布局")
+    parser.add_argument("--dungeon", default="sunstone_ruins", help="地牢 id")
+    parser.add_argument("--floor", type=int, default=1, help="用哪一层的配置")
+    parser.add_argument("--seeds", type=int, default=1000, help="校验多少个种子 (0 ~ N-1)")
+    parser.add_argument("--workers", type=int, default=None, help="进程数 (默认等于 CPU 核心数)")
+    args = parser.parse_args(argv)
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "dungeons", f"{args.dungeon}.json"), "r", encoding="utf-8") as f:
+        dungeon = json.load(f)
+    floor_data = next((pool for pool in dungeon.get("floor_pools", []) if args.floor in pool["floors"]), None)
+    if floor_data is None: parser.error(f"{dungeon.get('name', args.dungeon)} 没有第 {args.floor} 层的配置")
+    failures, counts = validate_seeds(floor_data, range(args.seeds), workers=args.workers)
+    for seed, problems in failures[:20]: print(f"种子 {seed}: {'；'.join(problems)}")
+    print(f"{args.seeds} 个种子，{len(failures)} 个有问题；平均每层房间：" +
+          "，".join(f"{room_type} {count / args.seeds:.2f}" for room_type, count in sorted(counts.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+# 文件: economy.py (新文件)
+"""
+掉落经济模拟器：不打战斗、不开界面，用随机模型把一局里的每一层地牢走很多遍，
+统计每层获得的金币、淬炼结晶、新装备、新天赋和能做的淬炼次数的分布，改掉落配置之前先看看经济会怎么变。
+
+模型（与游戏现状一致）：
+    房间      每层的房间类型数量从若干份 generate_layout 真实生成的布局里抽
+    怪物      普通房间 1~3 只、精英房间 2~3 只同种怪物（从本层怪物池里抽），首领房间 1 只；假定全部击败
+    战斗掉落  loot_tables.json 的掉落表；胜利界面和随后的战利品界面各结算一次
+    天赋      敌人按 possible_talents 的概率持有天赋，每次结算每个天赋 15% 被领悟
+    宝箱      按本层 treasure_loot 抽 item_count 件，挑一件：优先没有的，其次品质最高的
+    重复物品  与 Character.pickup_item 相同：已有同名物品或它的升级版时转化成金币和淬炼结晶
+    淬炼      每层结束时按花费从低到高，把结晶花在能升级的装备上
+商店、事件和休息不产出资源，不计入。
+
+所有随机结果按层为全部对局批量抽取（别名表的 draw_many），再逐局结算，一百万局量级的掷骰只要几秒。
+
+用法:
+    python economy.py -n 100000
+    python economy.py --dungeon sunstone_ruins --floors 1 2 3 -n 20000 --seed 7 --json
+    python economy.py --start-items WoodenSword IronRing -n 50000
+"""
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import collections
+import json
+import math
+import random
+
+from Character import RARITY_GOLD_VALUE
+from content_registry import ITEMS, TALENTS
+from dungeon_layout import generate_layout
+from Equips import UPGRADE_MAP
+from loot_sampler import AliasTable, DropTable, LootSamplers
+from rng import derive_seed, new_seed
+from settings import CRYSTALS_PER_RARITY, UPGRADE_COST_PER_RARITY
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STARTING_ITEMS = ("WoodenSword", "DragonHeart")   # 与 Game.start_new_game 的初始装备一致
+LOOT_SETTLEMENTS_PER_FIGHT = 2                   # CombatVictoryScreen 结算一次，点继续后 LootScreen 再结算一次
+TALENT_DROP_CHANCE = 0.15                        # 与 _generate_loot 一致
+MONSTERS_PER_ROOM = {"combat": (1, 3), "elite": (2, 3), "boss": (1, 1)}  # 与 dungeon_layout.generate_layout 一致
+DEFAULT_MONSTER = "slime"                        # 怪物池为空时生成器放的怪
+LAYOUT_SAMPLES = 32                              # 每层生成多少份真实布局来统计房间类型
+METRICS = ("gold", "crystals", "new_items", "new_talents", "upgrades")
+RARITY_ORDER = tuple(CRYSTALS_PER_RARITY)         # 品质从低到高
+
+
+def _load_json(path):
+    with open(os.path.join(ROOT_DIR, path), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_content():
+    """(enemy_data, loot_data, {地牢 id: 地牢数据})"""
+    dungeon_dir = os.path.join(ROOT_DIR, "dungeons")
+    dungeons = {name[:-5]: _load_json(os.path.join("dungeons", name)) for name in sorted(os.listdir(dungeon_dir)) if name.endswith(".json")}
+    return _load_json("enemies.json"), _load_json("loot_tables.json"), dungeons
+
+
+def sample_layouts(floor_data, seed, samples=LAYOUT_SAMPLES):
+    """生成 samples 份真实布局，返回每份的 (普通房间数, 精英房间数, 首领房间数, 宝箱房间数)。"""
+    layouts = []
+    for i in range(samples):
+        counts = generate_layout(num_rooms=10, floor_data=floor_data, rng=random.Random(derive_seed(seed, i))).room_counts()
+        layouts.append((counts["combat"], counts["elite"], counts["boss"], counts["treasure"]))
+    return layouts
+
+
+def _uniform(outcomes):
+    outcomes = list(outcomes)
+    return AliasTable(outcomes, [1] * len(outcomes))
+
+
+class EnemyModel:
+    """一种敌人的掉落表和天赋持有表。"""
+    def __init__(self, enemy_id, preset, drop_table):
+        self.enemy_id, self.drop_table = enemy_id, drop_table
+        talents = [{"item_class_name": info["talent_class_name"], "chance": info["chance"]} for info in preset.get("possible_talents", [])]
+        talents += [{"item_class_name": name, "chance": 1.0} for name in preset.get("talents", [])]
+        self.talent_table = DropTable([t for t in talents if t["item_class_name"] in TALENTS])
+
+
+class FloorModel:
+    """一层地牢的随机模型：房间类型数量、怪物池和宝箱装备池。"""
+    def __init__(self, dungeon_id, floor, floor_data, samplers, seed):
+        self.label = f"{dungeon_id}:{floor}"
+        self.layouts = _uniform(sample_layouts(floor_data, derive_seed(seed, "layout", dungeon_id, floor)))
+        self.rooms = {"combat": _uniform(floor_data.get("monster_pool") or [DEFAULT_MONSTER]),
+                      "elite": _uniform(floor_data.get("elite_pool") or [DEFAULT_MONSTER]),
+                      "boss": _uniform([floor_data.get("boss_id", "ruin_golem")])}
+        self.headcounts = {kind: _uniform(range(low, high + 1)) for kind, (low, high) in MONSTERS_PER_ROOM.items()}
+        self.treasure = samplers.treasure(dungeon_id, floor)
+
+    def roll_kills(self, rng, runs):
+        """为 runs 局批量抽出本层击败的敌人，返回 (每局的敌人 id 列表, 每局开出的宝箱候选列表, 掷骰次数)。"""
+        layouts = self.layouts.draw_many(rng, runs)
+        rolls = runs
+        kills = [[] for _ in range(runs)]
+        for slot, kind in enumerate(("combat", "elite", "boss")):
+            owners = [run for run, layout in enumerate(layouts) for _ in range(layout[slot])]
+            enemy_ids = self.rooms[kind].draw_many(rng, len(owners))
+            headcounts = self.headcounts[kind].draw_many(rng, len(owners))
+            for run, enemy_id, count in zip(owners, enemy_ids, headcounts): kills[run].extend([enemy_id] * count)
+            rolls += 2 * len(owners)
+        chests = [[] for _ in range(runs)]
+        if self.treasure.table:
+            owners = [run for run, layout in enumerate(layouts) for _ in range(layout[3])]
+            offers = iter(self.treasure.draw_many(rng, len(owners) * self.treasure.item_count))
+            for run in owners: chests[run].append([next(offers) for _ in range(self.treasure.item_count)])
+            rolls += len(owners) * self.treasure.item_count
+        return kills, chests, rolls
+
+
+class RunState:
+    """一局的背包：拥有的装备类、领悟的天赋、结晶余额，以及本层的收益计数。"""
+    __slots__ = ("owned", "talents", "crystals", "floor")
+
+    def __init__(self, start_items):
+        self.owned = {ITEMS.get(name) for name in start_items}
+        self.talents, self.crystals = set(), 0
+        self.floor = dict.fromkeys(METRICS, 0)
+
+    def pickup(self, cls):
+        """与 Character.pickup_item 相同的重复判定：已有同名物品或它的升级版时转化成金币和结晶。"""
+        if cls in self.owned or UPGRADE_MAP.get(cls) in self.owned:
+            rarity = ITEMS.info(cls).rarity
+            self.floor["gold"] += RARITY_GOLD_VALUE.get(rarity, 5)
+            crystals = CRYSTALS_PER_RARITY.get(rarity, 0)
+            self.floor["crystals"] += crystals; self.crystals += crystals
+        else:
+            self.owned.add(cls)
+            self.floor["new_items"] += 1
+
+    def pick_from_chest(self, offers):
+        fresh = [cls for cls in offers if cls not in self.owned and UPGRADE_MAP.get(cls) not in self.owned]
+        rank = lambda cls: RARITY_ORDER.index(ITEMS.info(cls).rarity) if ITEMS.info(cls).rarity in RARITY_ORDER else -1
+        self.pickup(max(fresh or offers, key=rank))
+
+    def learn(self, talent_name):
+        if talent_name not in self.talents:
+            self.talents.add(talent_name)
+            self.floor["new_talents"] += 1
+
+    def spend_crystals(self):
+        for cls in sorted((cls for cls in self.owned if cls in UPGRADE_MAP), key=lambda cls: (UPGRADE_COST_PER_RARITY.get(ITEMS.info(cls).rarity, 9999), cls.__name__)):
+            cost = UPGRADE_COST_PER_RARITY.get(ITEMS.info(cls).rarity, 9999)
+            if self.crystals < cost: break
+            self.crystals -= cost
+            self.owned.discard(cls); self.owned.add(UPGRADE_MAP[cls])
+            self.floor["upgrades"] += 1
+
+    def close_floor(self):
+        self.spend_crystals()
+        result, self.floor = self.floor, dict.fromkeys(METRICS, 0)
+        return result
+
+
+def simulate_economy(runs=10000, dungeon_id="sunstone_ruins", floors=None, seed=None, start_items=STARTING_ITEMS, content=None):
+    """
+    把 runs 局依次走过 floors 中的每一层（默认该地牢配置的全部楼层），
+    返回 ({层标签: {指标: [每局的数值]}}, 掷骰次数)。
+    """
+    enemy_data, loot_data, dungeons = content or load_content()
+    dungeon = dungeons[dungeon_id]
+    seed = seed if seed is not None else new_seed()
+    samplers = LootSamplers(loot_data, dungeons)
+    pools = {floor: pool for pool in dungeon.get("floor_pools", []) for floor in pool.get("floors", [])}
+    floors = floors or sorted(pools)
+    for floor in floors:
+        if floor not in pools: raise ValueError(f"{dungeon.get('name', dungeon_id)} 没有第 {floor} 层的配置")
+    enemies = {enemy_id: EnemyModel(enemy_id, preset, samplers.drop_tables.get(enemy_id)) for enemy_id, preset in enemy_data.items()}
+    learn_tables = {}  # 敌人持有的天赋组合 -> 每个天赋 15% 被领悟的掉落表
+
+    rng = random.Random(derive_seed(seed, "economy", dungeon_id))
+    states = [RunState(start_items) for _ in range(runs)]
+    results, rolls = {}, 0
+    for floor in floors:
+        model = FloorModel(dungeon_id, floor, pools[floor], samplers, seed)
+        kills, chests, floor_rolls = model.roll_kills(rng, runs)
+        rolls += floor_rolls
+
+        # 每种敌人的掉落和持有的天赋一次抽完，再按对局顺序取用
+        kill_counts = collections.Counter(enemy_id for run_kills in kills for enemy_id in run_kills)
+        drops, possessed = {}, {}
+        for enemy_id, count in kill_counts.items():
+            enemy = enemies[enemy_id]
+            drops[enemy_id] = iter(enemy.drop_table.draw_many(rng, count * LOOT_SETTLEMENTS_PER_FIGHT) if enemy.drop_table else [()] * (count * LOOT_SETTLEMENTS_PER_FIGHT))
+            possessed[enemy_id] = iter(enemy.talent_table.draw_many(rng, count))
+            rolls += count * (LOOT_SETTLEMENTS_PER_FIGHT + 1)
+
+        for state, run_kills, run_chests in zip(states, kills, chests):
+            for enemy_id in run_kills:
+                talents = next(possessed[enemy_id])
+                for _ in range(LOOT_SETTLEMENTS_PER_FIGHT):
+                    for name in next(drops[enemy_id]):
+                        cls = ITEMS.get(name)
+                        if cls is not None: state.pickup(cls)
+                    if talents:
+                        table = learn_tables.get(talents)
+                        if table is None:
+                            table = learn_tables[talents] = DropTable([{"item_class_name": t, "chance": TALENT_DROP_CHANCE} for t in talents])
+                        for name in table.draw(rng): state.learn(name)
+                        rolls += 1
+            for offers in run_chests: state.pick_from_chest(offers)
+        floor_results = {metric: [] for metric in METRICS}
+        for state in states:
+            for metric, value in state.close_floor().items(): floor_results[metric].append(value)
+        results[model.label] = floor_results
+    return results, rolls
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values: return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(values):
+    ordered = sorted(values)
+    return {"mean": sum(ordered) / len(ordered) if ordered else 0.0,
+            "p5": _percentile(ordered, 5), "p50": _percentile(ordered, 50), "p95": _percentile(ordered, 95)}
+
+
+def build_report(results):
+    """{层标签: {指标: 分布统计}}，另加 "total" 为所有层的合计。"""
+    report = {label: {metric: summarize(values) for metric, values in metrics.items()} for label, metrics in results.items()}
+    if results:
+        totals = {metric: [sum(per_run) for per_run in zip(*(metrics[metric] for metrics in results.values()))] for metric in METRICS}
+        report["total"] = {metric: summarize(values) for metric, values in totals.items()}
+    return report
+
+
+def format_report(report):
+    names = {"gold": "金币", "crystals": "结晶", "new_items": "新装备", "new_talents": "新天赋", "upgrades": "淬炼"}
+    lines = [f"{'楼层':<20}{'指标':<8}{'平均':>10}{'p5':>8}{'p50':>8}{'p95':>8}"]
+    for label, metrics in report.items():
+        for metric, stats in metrics.items():
+            lines.append(f"{label:<20}{names[metric]:<8}{stats['mean']:>10.2f}{stats['p5']:>8}{stats['p50']:>8}{stats['p95']:>8}")
+            label = ""
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="模拟大量对局的掉落经济：每层的金币、淬炼结晶、新装备、新天赋和淬炼次数")
+    parser.add_argument("-n", "--runs", type=int, default=10000, help="模拟的对局数")
+    parser.add_argument("--dungeon", default="sunstone_ruins", help="地牢 id")
+    parser.add_argument("--floors", type=int, nargs="*", help="依次走过的楼层 (默认该地牢配置的全部楼层)")
+    parser.add_argument("--start-items", nargs="*", default=list(STARTING_ITEMS), help="开局就有的装备类名")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.start_items if name not in ITEMS]
+    if unknown: parser.error(f"未知装备：{' '.join(unknown)}")
+    results, rolls = simulate_economy(args.runs, args.dungeon, args.floors, args.seed, args.start_items)
+    report = build_report(results)
+    if args.json:
+        print(json.dumps({"runs": args.runs, "rolls": rolls, "floors": report}, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report))
+        print(f"\n{args.runs} 局，共 {rolls} 次掷骰")
+
+
+if __name__ == "__main__":
+    main()
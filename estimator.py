@@ -0,0 +1,164 @@
+# 文件: estimator.py (新文件)
+"""
+解析式对战估算：不打模拟战斗，直接由双方的派生属性算出期望 DPS 和击杀耗时 (TTK)。
+
+和 Character.try_attack / take_damage 的结算规则一致：
+    每次普攻伤害 = 攻击 × (1 - 暴击率 + 暴击率 × 暴击倍率)
+    先扣护盾，剩余部分按 防御/(防御+100)（魔法伤害按魔抗）减免后扣血
+    第 k 次普攻发生在 k × 攻击间隔 秒
+已知的装备触发效果按期望值折算进来（见 ITEM_MODELS），其余效果（吸血、持续伤害、天赋触发……）忽略。
+普攻只触发装备的 before_attack；after_attack / on_critical 这些只在额外攻击 (perform_extra_attack) 里触发，
+所以靠它们计数的效果（如木剑的第 4 击双倍）对普攻不生效，这里也不计入。结果只是近似值：适合给构筑优化器大批量剪枝，再把有希望的候选交给 simulator.py 精确模拟。
+
+    player_profile = profile(player)                 # 每个角色只需算一次
+    estimate = estimate_matchup(player_profile, profile(enemy))
+    estimate["win"], estimate["ttk"]
+
+用法:
+    python estimator.py build.json
+    python estimator.py build.json --enemies slime goblin --json
+"""
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import contextlib
+import json
+import math
+
+import Equips
+from Character import Character
+from combat_engine import create_talent
+from damage import DamageType
+
+
+class CombatProfile:
+    """估算所需的全部数值，从角色上一次性取出，之后的估算不再访问角色对象。"""
+    __slots__ = ("hp", "shield", "blocks", "defense", "magic_resist", "attack", "attack_interval",
+                 "crit_chance", "crit_multiplier", "damage_type", "hit_mult", "physical_taken", "crit_taken")
+
+    def __init__(self, char):
+        self.hp = char.hp
+        self.shield = 0              # 战斗开始时获得的护盾（进入战斗时原有护盾会被清空）
+        self.blocks = 0              # 战斗开始时获得的格挡层数，每层完全抵挡一次伤害
+        self.defense = char.defense
+        self.magic_resist = char.magic_resist
+        self.attack = char.attack
+        self.attack_interval = char.attack_interval
+        self.crit_chance = min(1.0, max(0.0, char.crit_chance))
+        self.crit_multiplier = char.crit_multiplier
+        self.damage_type = DamageType.PHYSICAL
+        self.hit_mult = 1.0          # 装备触发折算出的普攻伤害期望倍率
+        self.physical_taken = 1.0    # 受到物理伤害的期望倍率
+        self.crit_taken = 1.0        # 受到暴击伤害的期望倍率
+
+
+# --- 装备触发效果的期望值模型：装备类 -> model(profile, 装备实例) ---
+
+def _physical_reduction(chance, reduction):
+    """chance 概率再减免 reduction 的物理伤害：平均倍率 1 - chance × reduction。"""
+    def model(p, eq): p.physical_taken *= 1 - chance * reduction
+    return model
+
+def _battle_start_shield(p, eq): p.shield += eq.shield_bonus
+def _battle_start_blocks(p, eq): p.blocks += eq.block_stacks
+def _crit_immunity(p, eq): p.crit_taken *= 1 - eq.crit_immunity_chance
+def _magic_attacks(p, eq): p.damage_type = DamageType.MAGIC
+
+ITEM_MODELS = {
+    Equips.WoodenArmor: _physical_reduction(0.3, 0.3),
+    Equips.WoodenArmor_Star: _physical_reduction(0.5, 0.5),
+    Equips.WoodenShield: _battle_start_shield,
+    Equips.TowerShield: _battle_start_blocks,
+    Equips.ShadowCloak: _crit_immunity,
+    Equips.RuneBlade: _magic_attacks,
+}
+
+
+def profile(char):
+    """把角色当前的派生属性和已装备物品折算成 CombatProfile。"""
+    p = CombatProfile(char)
+    for eq in char.all_equipment:
+        model = ITEM_MODELS.get(type(eq))
+        if model: model(p, eq)
+    return p
+
+
+def time_to_kill(attacker, defender):
+    """attacker 打 defender 的 (期望 DPS, 击杀耗时)；打不动时耗时为 math.inf。"""
+    cc = attacker.crit_chance
+    raw = attacker.attack * attacker.hit_mult * (1 - cc + cc * attacker.crit_multiplier * defender.crit_taken)
+    if attacker.damage_type == DamageType.PHYSICAL:
+        raw *= defender.physical_taken
+        reduction = defender.defense / (defender.defense + 100)
+    else:
+        reduction = defender.magic_resist / (defender.magic_resist + 100)
+    dps = raw * (1 - reduction) / attacker.attack_interval
+    if raw <= 0: return dps, math.inf
+    # 护盾吸收的是减免前的伤害，所以按 "护盾 + 生命/(1-减免)" 计算需要打出的原始伤害
+    hits = defender.blocks + max(1, math.ceil((defender.shield + defender.hp / (1 - reduction)) / raw))
+    return dps, hits * attacker.attack_interval
+
+
+def estimate_matchup(player, enemy):
+    """
+    估算一场对局。player / enemy 是 CombatProfile。
+    返回 {"dps", "ttk", "enemy_dps", "time_to_die", "win"}；同时倒下算玩家获胜（与战斗引擎一致）。
+    """
+    dps, ttk = time_to_kill(player, enemy)
+    enemy_dps, time_to_die = time_to_kill(enemy, player)
+    return {"dps": dps, "ttk": ttk, "enemy_dps": enemy_dps, "time_to_die": time_to_die,
+            "win": ttk <= time_to_die and ttk != math.inf}
+
+
+def enemy_profile(enemy_id, enemy_preset):
+    """敌人配置的估算画像：只计入必定获得的天赋，按概率获得的天赋不掷骰。"""
+    talents = [t for t in (create_talent(name) for name in enemy_preset.get("talents", [])) if t]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        enemy = Character(id=enemy_id, name=enemy_preset["name"], talents=talents, **enemy_preset["stats"])
+    return profile(enemy)
+
+
+def estimate_build(build, enemy_ids=None, enemy_data=None):
+    """对每个敌人估算一次，返回 {enemy_id: estimate_matchup 的结果}。"""
+    import simulator
+    enemy_data = enemy_data or simulator.load_enemy_data()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        player = profile(simulator.build_player(build))
+    return {enemy_id: estimate_matchup(player, enemy_profile(enemy_id, enemy_data[enemy_id]))
+            for enemy_id in enemy_ids or enemy_data}
+
+
+def format_report(report, enemy_data):
+    def fmt(value, width, spec):
+        return "-".rjust(width) if value == math.inf else format(value, f">{width}{spec}")
+    lines = [f"{'敌人':<20}{'预计':>6}{'DPS':>10}{'TTK':>10}{'敌方DPS':>10}{'存活时间':>10}"]
+    for enemy_id, est in report.items():
+        name = f"{enemy_data[enemy_id]['name']}({enemy_id})"
+        lines.append(f"{name:<20}{'胜' if est['win'] else '负':>6}{est['dps']:>10.2f}{fmt(est['ttk'], 10, '.2f')}"
+                     f"{est['enemy_dps']:>10.2f}{fmt(est['time_to_die'], 10, '.2f')}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import simulator
+    parser = argparse.ArgumentParser(description="解析估算一套玩家配置对各个敌人的 DPS 和击杀耗时")
+    parser.add_argument("build", help="玩家配置 JSON 文件 (格式同 simulator.py)")
+    parser.add_argument("--enemies", nargs="*", help="只估算这些敌人 id (默认全部)")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+
+    with open(args.build, "r", encoding="utf-8") as f:
+        build = json.load(f)
+    enemy_data = simulator.load_enemy_data()
+    report = estimate_build(build, args.enemies, enemy_data)
+    if args.json:
+        # JSON 没有无穷大，打不动的对局输出 null
+        report = {k: {f: (None if v == math.inf else v) for f, v in est.items()} for k, est in report.items()}
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report, enemy_data))
+
+
+if __name__ == "__main__":
+    main()
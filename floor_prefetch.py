@@ -0,0 +1,81 @@
+# 文件: floor_prefetch.py (新文件)
+"""
+地牢楼层的准备和后台预生成。
+
+进入一层时最慢的是把布局变成墙壁 / 地板 / 门的精灵并烘焙静态图层（大量 Surface.fill / blit）。
+这些只和楼层本身有关，不碰窗口和事件，可以放在后台线程里做（pygame 画普通 Surface 时会释放 GIL）。
+玩家走进首领房间时就开始准备下一层，走进传送门时主线程只需要放上玩家、怪物、宝箱这些便宜的东西。
+
+    prefetcher = FloorPrefetcher()
+    prefetcher.prefetch(game.rng, "sunstone_ruins", 2, floor_data)       # 进入首领房间时
+    floor = prefetcher.take(game.rng, "sunstone_ruins", 2, floor_data)   # 真正进入第 2 层时；没预生成过就当场生成
+
+同一局、同一层的布局只由 run seed 决定，预生成和当场生成得到的楼层完全一样；布局本身还会缓存在磁盘上（layout_cache.py）。
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import dungeon_generator
+import layout_cache
+from rng import DUNGEON, derive_seed
+from spatial_hash import SpatialGroup
+from static_layer import StaticLayer
+
+ROOMS_PER_FLOOR = 10
+
+
+class PreparedFloor:
+    """一层地牢中与主循环无关的部分：布局、墙壁和门的精灵、不可通行组、烘焙好的静态图层、每个房间的门。"""
+    def __init__(self, layout, all_sprites, wall_sprites, door_sprites, impassable_sprites, static_layer, room_doors):
+        self.layout = layout
+        self.all_sprites, self.wall_sprites, self.door_sprites = all_sprites, wall_sprites, door_sprites
+        self.impassable_sprites = impassable_sprites
+        self.static_layer = static_layer
+        self.room_doors = room_doors
+
+
+def floor_seed(run_rng, dungeon_id, floor_number):
+    """这一局里某一层地牢的种子，只由 run seed 决定。"""
+    return derive_seed(run_rng.seed, DUNGEON, dungeon_id, floor_number)
+
+
+def prepare_floor(dungeon_id, floor_number, floor_data, seed, num_rooms=ROOMS_PER_FLOOR, layout=None):
+    """
+    取得布局并做好所有不依赖窗口的精灵工作；可以在后台线程里调用。
+    layout 为读档恢复出来的布局（带着清空状态），不给就从缓存读或用 seed 生成。
+    """
+    impassable_sprites = SpatialGroup()  # 墙和关着的门；门开关时自己加入 / 移出
+    # 先取得逻辑布局（纯数据），再把它变成墙壁、地板、门的精灵
+    if layout is None: layout = layout_cache.load_layout(dungeon_id, floor_number, floor_data, seed, num_rooms)
+    all_sprites, wall_sprites, door_sprites = dungeon_generator.materialize_floor(layout, impassable_sprites)
+    impassable_sprites.add(wall_sprites)
+    # 地板和墙壁烘焙成分块的静态图层；地板精灵只用来烘焙，之后不再保留
+    static_sprites = [sprite for sprite in all_sprites if sprite not in door_sprites]
+    static_layer = StaticLayer(static_sprites)
+    all_sprites.remove(*[sprite for sprite in static_sprites if sprite not in wall_sprites])
+    # 每个房间的门：门在房间边上，门的中心落在哪个格子里就属于哪个房间
+    room_doors = {}
+    for door in door_sprites: room_doors.setdefault(layout.room_at(*door.rect.center), []).append(door)
+    return PreparedFloor(layout, all_sprites, wall_sprites, door_sprites, impassable_sprites, static_layer, room_doors)
+
+
+class FloorPrefetcher:
+    """在一个后台线程里提前准备好下一层；同一时间只留一层，换了目标就丢掉旧的。"""
+    def __init__(self):
+        self._executor = None
+        self._key, self._future = None, None
+
+    def prefetch(self, run_rng, dungeon_id, floor_number, floor_data):
+        key = (run_rng.seed, dungeon_id, floor_number)
+        if key == self._key: return
+        if self._executor is None: self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="floor-prefetch")
+        if self._future is not None: self._future.cancel()
+        self._key = key
+        self._future = self._executor.submit(prepare_floor, dungeon_id, floor_number, floor_data, floor_seed(run_rng, dungeon_id, floor_number))
+
+    def take(self, run_rng, dungeon_id, floor_number, floor_data):
+        """取出这一层：预生成过就用它（还没做完就等它做完），否则在当前线程里生成。"""
+        key = (run_rng.seed, dungeon_id, floor_number)
+        if key == self._key:
+            future, self._key, self._future = self._future, None, None
+            if not future.cancelled(): return future.result()
+        return prepare_floor(dungeon_id, floor_number, floor_data, floor_seed(run_rng, dungeon_id, floor_number))
@@ -9,6 +9,9 @@ from settings import *
 # <-- 导入 ui 模块，而不仅仅是 init_fonts
 import ui
 from Character import Character
+from rng import RunRNG
+from loot_sampler import LootSamplers
+from floor_prefetch import FloorPrefetcher
 import Equips
 import Talents
 
@@ -27,8 +30,10 @@ class Game:
         #ui.load_buff_icons()
 
         self.player = None
+        self.rng = RunRNG()  # 本局的随机数源；新游戏换新种子，存档时一起保存
         self.current_stage = "1"
         self.loaded_dialogue_index = 0
+        self.loaded_dungeon = None  # 读档时存档里的地牢进度，由 resume_dungeon() 取走
 
         self.story_data = self._load_json("story.json")
         self.enemy_data = self._load_json("enemies.json")
@@ -41,6 +46,9 @@ class Game:
             if filename.endswith('.json'):
                 dungeon_id = filename.split('.')[0]
                 self.dungeon_data[dungeon_id] = self._load_json(os.path.join(dungeon_folder, filename))
+        # 各楼层的商店 / 宝箱装备池和敌人掉落表，读完内容后一次编译好
+        self.loot_samplers = LootSamplers(self.loot_data, self.dungeon_data)
+        self.floor_prefetcher = FloorPrefetcher()  # 在后台准备下一层地牢
 
     def run(self):
         from states.title import TitleScreen
@@ -111,13 +119,19 @@ class Game:
         filename = self.get_save_filename(slot_number)
         try:
             dialogue_index = 0
+            dungeon_state = None
             from states.story import StoryScreen
+            from states.dungeon_screen import DungeonScreen
             for state in reversed(self.state_stack):
                 if isinstance(state, StoryScreen):
                     dialogue_index = state.dialogue_index; break
+            for state in reversed(self.state_stack):
+                if isinstance(state, DungeonScreen):
+                    dungeon_state = state.save_state(); break
             data_to_save = {
                 "player": self.player, "current_stage": self.current_stage,
-                "dialogue_index": dialogue_index, "timestamp": time.time()
+                "dialogue_index": dialogue_index, "timestamp": time.time(), "rng": self.rng,
+                "dungeon": dungeon_state
             }
             with open(filename, "wb") as f: pickle.dump(data_to_save, f)
             print(f"Game saved to slot {slot_number}")
@@ -129,10 +143,19 @@ class Game:
         data = self.peek_save_slot(slot_number)
         if data:
             self.player = data["player"]
+            self.rng = data.get("rng") or RunRNG()  # 旧存档没有随机数种子，换一个新的
             self.current_stage = data["current_stage"]
             self.loaded_dialogue_index = data.get("dialogue_index", 0)
+            self.loaded_dungeon = data.get("dungeon")  # 旧存档没有这一项
             return True
         return False
+
+    def resume_dungeon(self):
+        """读档并压入剧情界面之后调用：存档时人在地牢里，就把那一层按存档恢复出来压到栈顶。"""
+        saved, self.loaded_dungeon = self.loaded_dungeon, None
+        if saved:
+            from states.dungeon_screen import DungeonScreen
+            self.state_stack.append(DungeonScreen(self, saved["dungeon_id"], saved["floor_number"], saved_state=saved))
    
     # 文件: game.py (替换这个函数)
 
@@ -152,5 +175,7 @@ class Game:
             equipment=player_eq,
             talents=player_talents
         )
+        self.rng = RunRNG()
         self.current_stage = "1"
-        self.loaded_dialogue_index = 0
\ No newline at end of file
+        self.loaded_dialogue_index = 0
+        self.loaded_dungeon = None
\ No newline at end of file
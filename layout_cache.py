@@ -0,0 +1,45 @@
+# 文件: layout_cache.py (新文件)
+"""
+地牢布局的磁盘缓存。
+
+同一个地牢、同一层、同一个种子、同一版生成器得到的布局总是一样的，第一次生成后写成 JSON 存在
+layout_cache/ 下，以后重新进入这一层时直接读出来，不再重跑一遍网格上的随机游走。
+（读档回到地牢用的是存档里那份带着清空进度的布局，见 DungeonScreen.save_state。）
+
+    layout = load_layout("sunstone_ruins", 2, floor_data, seed)    # 有缓存就读，没有就生成并写入
+
+文件名里除了 (地牢 id, 层号, 种子, GENERATOR_VERSION) 之外还带着这一层配置和房间数的摘要：
+改了地牢 json 里的怪物池，旧缓存自然不会再被命中。缓存目录可以随时整个删掉。
+"""
+import hashlib
+import json
+import os
+
+from dungeon_layout import GENERATOR_VERSION, FloorLayout, generate_layout
+from rng import seeded_stream
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "layout_cache")
+
+
+def cache_path(dungeon_id, floor_number, seed, floor_data, num_rooms, cache_dir=CACHE_DIR):
+    digest = hashlib.sha1(json.dumps([floor_data, num_rooms], sort_keys=True).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{dungeon_id}_{floor_number}_{seed:016x}_v{GENERATOR_VERSION}_{digest}.json")
+
+
+def load_layout(dungeon_id, floor_number, floor_data, seed, num_rooms=10, cache_dir=CACHE_DIR):
+    """取得这一层的布局：缓存里有就读出来，否则用 seed 生成并写进缓存。缓存读写失败时照常生成，不影响游戏。"""
+    path = cache_path(dungeon_id, floor_number, seed, floor_data, num_rooms, cache_dir)
+    try:
+        with open(path, "r", encoding="utf-8") as f: return FloorLayout.from_data(json.load(f))
+    except (OSError, ValueError, KeyError, IndexError, TypeError):
+        pass
+    layout = generate_layout(num_rooms, floor_data, seeded_stream(seed))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # 先写临时文件再改名，后台线程或多个进程同时写同一层时不会读到半个文件
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f: json.dump(layout.to_data(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"布局缓存写入失败: {e}")
+    return layout
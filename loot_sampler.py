@@ -0,0 +1,152 @@
+# 文件: loot_sampler.py (新文件)
+"""
+掉落与商店的抽样器。
+
+读入内容时把地牢每个楼层配置的 rarity_weights（shop_items / treasure_loot）和 loot_tables.json 里每个敌人的
+掉落概率编译成别名表 (alias method)，之后每抽一次只要一次 rng.random()，与候选数量无关。
+
+- ItemSampler   一个楼层配置的装备池：每个类的权重 = 它的品质权重 / 该品质的装备数，一次抽出具体的类
+- DropTable     一个敌人的掉落表：各条目独立判定，把所有"掉了哪些"的组合编译成一张表，一次抽出整组掉落
+- LootSamplers  游戏读完内容后编译全部楼层和敌人，宝箱、商店、战斗掉落都从这里取
+
+每种抽样器都有 draw_many(rng, n)，模拟大量对局时一次调用抽 n 次。
+
+    samplers = LootSamplers(loot_data, dungeon_data)
+    samplers.treasure("sunstone_ruins", 1).draw(rng)          # 一个装备类
+    samplers.shop("sunstone_ruins", 1).draw_distinct(rng, 3)  # 三个不重复的装备类
+    samplers.roll_drops(["goblin", "slime"], rng)             # 这一战掉落的物品类名
+"""
+import collections
+
+from content_registry import ITEMS
+
+MAX_JOINT_DROPS = 10  # 掉落条目不超过这么多时编译成组合表（2^n 种结果），再多就逐条判定
+
+
+class AliasTable:
+    """按权重抽取 outcomes 中的一项，每次 O(1)（Vose 别名法）。权重为 0 的项永远不会被抽到。"""
+    __slots__ = ("outcomes", "_prob", "_alias", "_size")
+
+    def __init__(self, outcomes, weights):
+        pairs = [(outcome, float(weight)) for outcome, weight in zip(outcomes, weights) if weight > 0]
+        if not pairs: raise ValueError("别名表至少需要一个权重为正的结果")
+        self.outcomes = tuple(outcome for outcome, _ in pairs)
+        n = self._size = len(pairs)
+        total = sum(weight for _, weight in pairs)
+        scaled = [weight * n / total for _, weight in pairs]
+        prob, alias = [1.0] * n, list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s], alias[s] = scaled[s], l
+            scaled[l] += scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # 剩下的都是浮点误差下约等于 1 的项
+        self._prob, self._alias = tuple(prob), tuple(alias)
+
+    def __len__(self):
+        return self._size
+
+    def draw(self, rng):
+        u = rng.random() * self._size
+        i = int(u)
+        return self.outcomes[i] if u - i < self._prob[i] else self.outcomes[self._alias[i]]
+
+    def draw_many(self, rng, n):
+        """连抽 n 次，返回列表；与调用 n 次 draw() 的结果相同。"""
+        outcomes, prob, alias, size, rand = self.outcomes, self._prob, self._alias, self._size, rng.random
+        return [outcomes[i] if u - i < prob[i] else outcomes[alias[i]]
+                for u in (rand() * size for _ in range(n)) for i in (int(u),)]
+
+
+class ItemSampler:
+    """
+    一个楼层配置（{"item_count": 3, "rarity_weights": {"common": 70, ...}}）的装备池。
+    没有配置 rarity_weights 时所有装备等概率；配置里没出现的品质不会被抽到。
+    """
+    def __init__(self, config=None, default_count=2, exclude=()):
+        config = config or {}
+        self.item_count = config.get("item_count", default_count)
+        rarity_weights = config.get("rarity_weights")
+        classes = ITEMS.select(exclude=tuple(exclude))
+        if rarity_weights:
+            rarities = [ITEMS.info(cls).rarity for cls in classes]
+            counts = collections.Counter(rarities)
+            weights = [rarity_weights.get(rarity, 0) / counts[rarity] for rarity in rarities]
+        else:
+            weights = [1] * len(classes)
+        self.table = AliasTable(classes, weights) if any(w > 0 for w in weights) else None
+
+    def draw(self, rng):
+        return self.table.draw(rng) if self.table else None
+
+    def draw_many(self, rng, n):
+        return self.table.draw_many(rng, n) if self.table else []
+
+    def draw_distinct(self, rng, k=None):
+        """抽 k 个（默认 item_count 个）不重复的类，顺序即抽中的顺序；能抽到的类不够时全部返回。"""
+        if not self.table: return []
+        k = min(self.item_count if k is None else k, len(self.table))
+        chosen = []
+        while len(chosen) < k:
+            cls = self.table.draw(rng)
+            if cls not in chosen: chosen.append(cls)
+        return chosen
+
+
+class DropTable:
+    """
+    一个敌人的掉落表 [{"item_class_name": ..., "chance": ...}, ...]，每个条目独立按 chance 判定。
+    条目不多时把 2^n 种"掉了哪些"的组合连同概率编译成别名表，一次抽出整组掉落。
+    """
+    def __init__(self, drops):
+        self.entries = tuple((drop["item_class_name"], min(1.0, max(0.0, drop.get("chance", 1.0)))) for drop in drops)
+        self.table = None
+        if len(self.entries) <= MAX_JOINT_DROPS:
+            combos, weights = [], []
+            for mask in range(1 << len(self.entries)):
+                weight = 1.0
+                for bit, (_, chance) in enumerate(self.entries):
+                    weight *= chance if mask >> bit & 1 else 1.0 - chance
+                combos.append(tuple(name for bit, (name, _) in enumerate(self.entries) if mask >> bit & 1))
+                weights.append(weight)
+            self.table = AliasTable(combos, weights)
+
+    def draw(self, rng):
+        """这一次掉落的物品类名元组，按掉落表中的顺序。"""
+        if self.table is not None: return self.table.draw(rng)
+        return tuple(name for name, chance in self.entries if rng.random() < chance)
+
+    def draw_many(self, rng, n):
+        if self.table is not None: return self.table.draw_many(rng, n)
+        return [self.draw(rng) for _ in range(n)]
+
+
+class LootSamplers:
+    """游戏全部掉落抽样器：按 (地牢 id, 层数) 取商店 / 宝箱装备池，按敌人 id 取掉落表。"""
+    TREASURE_EXCLUDE = ("DragonHeart",)  # 只由首领掉落，不会出现在宝箱里
+
+    def __init__(self, loot_data, dungeon_data):
+        self.drop_tables = {enemy_id: DropTable(drops) for enemy_id, drops in (loot_data or {}).items() if drops}
+        self._floor_pools = {}  # (地牢 id, 层数) -> (商店装备池, 宝箱装备池)
+        for dungeon_id, dungeon in (dungeon_data or {}).items():
+            for pool in (dungeon or {}).get("floor_pools", []):
+                samplers = (ItemSampler(pool.get("shop_items"), default_count=4),
+                            ItemSampler(pool.get("treasure_loot"), default_count=2, exclude=self.TREASURE_EXCLUDE))
+                for floor in pool.get("floors", []): self._floor_pools[(dungeon_id, floor)] = samplers
+        self._default_pools = (ItemSampler(default_count=4), ItemSampler(default_count=2, exclude=self.TREASURE_EXCLUDE))
+
+    def shop(self, dungeon_id=None, floor=None):
+        return self._floor_pools.get((dungeon_id, floor), self._default_pools)[0]
+
+    def treasure(self, dungeon_id=None, floor=None):
+        return self._floor_pools.get((dungeon_id, floor), self._default_pools)[1]
+
+    def roll_drops(self, enemy_ids, rng):
+        """依次为每个被击败的敌人抽掉落，返回物品类名列表；没有掉落表的敌人不掉东西。"""
+        names = []
+        for enemy_id in enemy_ids:
+            table = self.drop_tables.get(enemy_id)
+            if table is not None: names.extend(table.draw(rng))
+        return names
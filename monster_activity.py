@@ -0,0 +1,48 @@
+# 文件: monster_activity.py (新文件)
+"""
+地牢怪物的活动范围（模拟的细节层次）：只有玩家附近的怪物每帧跑完整的 AI 和墙壁碰撞，其余的睡着不动。
+
+活跃的房间 = 玩家所在的格子 + 通过门相连的格子（走廊另一头的房间也算）+ 镜头里能看到的格子。
+看得见的怪物总是醒着，画面和以前一样；每帧的开销只和这几个房间有关，与整层有多少战斗房间无关。
+房间睡着时记下时间，醒来时用 Monster.fast_forward() 粗略补上睡过去的那段。
+
+    activity = MonsterActivity(layout, room_monsters)
+    activity.focus(current_room, camera.view_rect)    # 每帧调用，活跃房间没变时几乎没有开销
+    activity.update(walls, dt)
+    for monster in activity.active: ...
+"""
+import pygame
+
+
+class MonsterActivity:
+    def __init__(self, layout, room_monsters):
+        """room_monsters 为 {房间: 该房间怪物的 Group}；怪物被 kill() 后会自动从 active 里消失。"""
+        self.layout, self.room_monsters = layout, room_monsters
+        self.active_rooms = frozenset()
+        self.active = pygame.sprite.Group()
+        self.clock = 0.0        # 这一层已经过去的游戏时间（秒），只在 update 里走
+        self._slept_at = {}     # 房间 -> 开始睡的时间；一开始所有房间都从 0 秒开始睡
+
+    def rooms_near(self, room, view_rect):
+        rooms = {room}
+        for neighbour in self.layout.neighbours(room):
+            rooms.add(neighbour)
+            if neighbour.is_corridor: rooms.update(self.layout.neighbours(neighbour))
+        rooms.update(self.layout.rooms_touching(view_rect))
+        return frozenset(r for r in rooms if r in self.room_monsters)
+
+    def focus(self, room, view_rect):
+        """以玩家所在的 room 和镜头的 view_rect 为中心，唤醒附近的房间、让离开的房间睡下。"""
+        rooms = self.rooms_near(room, view_rect)
+        if rooms == self.active_rooms: return
+        for r in self.active_rooms - rooms: self._slept_at[r] = self.clock
+        for r in rooms - self.active_rooms:
+            slept = self.clock - self._slept_at.pop(r, 0.0)
+            for monster in self.room_monsters[r]: monster.fast_forward(slept)
+        self.active_rooms = rooms
+        # 按房间的生成顺序排，和以前遍历全部怪物时的先后（也就是叠放顺序）一致
+        self.active = pygame.sprite.Group(*[m for r in self.layout.in_order(rooms) for m in self.room_monsters[r]])
+
+    def update(self, walls, dt):
+        self.clock += dt
+        self.active.update(walls, dt)
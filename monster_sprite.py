@@ -5,9 +5,16 @@ import math
 from dungeon_generator import TILE_SIZE
 from settings import *
 
+FRAMES_PER_SECOND = 60   # speed 是每帧的像素数，游戏按 60 帧运行
+MAX_CATCH_UP = 10.0      # 唤醒时最多补算的秒数
+
 class Monster(pygame.sprite.Sprite):
-    def __init__(self, monster_data, room_rect): # <-- 构造函数现在需要知道它属于哪个房间
+    # 游荡 AI 的随机数来源；地牢界面注入这一层的怪物流（由 run seed 派生），未注入时退回全局 random 模块
+    rng = random
+
+    def __init__(self, monster_data, room_rect, rng=None): # <-- 构造函数现在需要知道它属于哪个房间
         super().__init__()
+        if rng is not None: self.rng = rng
         self.enemy_id = monster_data['id']
         self.uid = monster_data['uid']
         
@@ -28,30 +35,51 @@ class Monster(pygame.sprite.Sprite):
         # --- 全新的 AI 状态机 ---
         self.speed = 0.8 # <-- 降低移动速度
         self.ai_state = "idle" # 初始状态为“站立”
-        self.ai_timer = random.uniform(1, 3) # 站立1-3秒
+        self.ai_timer = self.rng.uniform(1, 3) # 站立1-3秒
         self.target_pos = None # 移动的目标点
 
+    def _next_ai_state(self):
+        if self.ai_state == "idle":
+            # 从站立切换到徘徊
+            self.ai_state = "wandering"
+            self.ai_timer = self.rng.uniform(2, 4) # 徘徊2-4秒
+            # 在房间活动范围内随机选择一个目标点
+            # 我们在房间边界内留出一些边距，防止怪物紧贴墙壁
+            margin = TILE_SIZE 
+            self.target_pos = (
+                self.rng.randint(self.home_room_rect.left + margin, self.home_room_rect.right - margin),
+                self.rng.randint(self.home_room_rect.top + margin, self.home_room_rect.bottom - margin)
+            )
+        elif self.ai_state == "wandering":
+            # 从徘徊切换到站立
+            self.ai_state = "idle"
+            self.ai_timer = self.rng.uniform(1, 3)
+            self.target_pos = None
+
+    def fast_forward(self, seconds):
+        """
+        休眠的怪物被唤醒时，粗略补上睡过去的 seconds 秒：照常推进状态机，但徘徊时不做碰撞，直接沿直线走
+        （目标点在房间内且留了边距，房间里除了四周的墙没有别的障碍）。最多补 MAX_CATCH_UP 秒，再久也看不出区别。
+        """
+        seconds = min(seconds, MAX_CATCH_UP)
+        while seconds > 0:
+            step = min(seconds, max(self.ai_timer, 0.0))
+            if self.ai_state == "wandering" and self.target_pos:
+                dx = self.target_pos[0] - self.rect.centerx
+                dy = self.target_pos[1] - self.rect.centery
+                dist = math.hypot(dx, dy)
+                reach = self.speed * FRAMES_PER_SECOND * step
+                if dist > 0: self.rect.center = (self.rect.centerx + dx * min(1, reach / dist), self.rect.centery + dy * min(1, reach / dist))
+            self.ai_timer -= step
+            seconds -= step
+            if self.ai_timer <= 0: self._next_ai_state()
+        self.rect.clamp_ip(self.home_room_rect)
+
     def update(self, walls, dt): # <-- update 函数现在接收墙壁和时间增量 dt
         self.ai_timer -= dt
 
         # 1. 状态切换逻辑
-        if self.ai_timer <= 0:
-            if self.ai_state == "idle":
-                # 从站立切换到徘徊
-                self.ai_state = "wandering"
-                self.ai_timer = random.uniform(2, 4) # 徘徊2-4秒
-                # 在房间活动范围内随机选择一个目标点
-                # 我们在房间边界内留出一些边距，防止怪物紧贴墙壁
-                margin = TILE_SIZE 
-                self.target_pos = (
-                    random.randint(self.home_room_rect.left + margin, self.home_room_rect.right - margin),
-                    random.randint(self.home_room_rect.top + margin, self.home_room_rect.bottom - margin)
-                )
-            elif self.ai_state == "wandering":
-                # 从徘徊切换到站立
-                self.ai_state = "idle"
-                self.ai_timer = random.uniform(1, 3)
-                self.target_pos = None
+        if self.ai_timer <= 0: self._next_ai_state()
 
         # 2. 根据当前状态执行动作
         if self.ai_state == "wandering" and self.target_pos:
@@ -68,12 +96,12 @@ class Monster(pygame.sprite.Sprite):
                 # 使用与玩家完全相同的碰撞逻辑
                 # 水平移动和碰撞
                 self.rect.x += vx
-                for wall in pygame.sprite.spritecollide(self, walls, False):
+                for wall in walls.collide(self.rect):
                     if vx > 0: self.rect.right = wall.rect.left
                     if vx < 0: self.rect.left = wall.rect.right
                 # 垂直移动和碰撞
                 self.rect.y += vy
-                for wall in pygame.sprite.spritecollide(self, walls, False):
+                for wall in walls.collide(self.rect):
                     if vy > 0: self.rect.bottom = wall.rect.top
                     if vy < 0: self.rect.top = wall.rect.bottom
         
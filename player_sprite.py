@@ -22,8 +22,8 @@ class Player(pygame.sprite.Sprite):
         if keys[pygame.K_RIGHT] or keys[pygame.K_d]: vx = self.speed
         if vx != 0:
             self.rect.x += vx
-            # 用新的参数名 impassable_sprites 进行碰撞检测
-            for sprite in pygame.sprite.spritecollide(self, impassable_sprites, False):
+            # impassable_sprites 是按网格索引的 SpatialGroup，只检查附近的墙和门
+            for sprite in impassable_sprites.collide(self.rect):
                 if vx > 0: self.rect.right = sprite.rect.left
                 if vx < 0: self.rect.left = sprite.rect.right
         
@@ -33,7 +33,7 @@ class Player(pygame.sprite.Sprite):
         if keys[pygame.K_DOWN] or keys[pygame.K_s]: vy = self.speed
         if vy != 0:
             self.rect.y += vy
-            # 用新的参数名 impassable_sprites 进行碰撞检测
-            for sprite in pygame.sprite.spritecollide(self, impassable_sprites, False):
+            # impassable_sprites 是按网格索引的 SpatialGroup，只检查附近的墙和门
+            for sprite in impassable_sprites.collide(self.rect):
                 if vy > 0: self.rect.bottom = sprite.rect.top
                 if vy < 0: self.rect.top = sprite.rect.bottom
\ No newline at end of file
@@ -0,0 +1,344 @@
+# 文件: replay.py (新文件)
+"""
+战斗回放：把一场战斗记录成紧凑的二进制事件流，并能据此确定性地重演。
+
+战斗引擎是确定性的：同样的开战前状态 + 同样的随机数种子 = 同样的战斗。
+所以回放文件只需要保存种子和重建双方所需的数据（见 fighter_data），事件流则用来展示、统计和校验重演是否一致。
+
+文件格式（小端）：
+    b"CRPL" + u16 版本号
+    之后是若干条记录，每条 = u32 负载长度 + 负载；负载的第一个字节是记录类型：
+        HEADER       JSON {"seed", "enemy_id", "max_duration", "fighters"}，fighters 是每个角色的 fighter_data()，
+                     玩家在前；遭遇战里 enemy_id 是列表
+        ATTACK       f64 时间, u8 攻击方
+        DAMAGE       f64 时间, u8 受击方, u8 来源方, u32 最终伤害, u32 护盾吸收, u8 伤害类型, u8 标记位
+        BUFF_ADD     f64 时间, u8 角色, u16 层数, 类名 (施加或叠层)
+        BUFF_REMOVE  f64 时间, u8 角色, u16 层数, 类名
+        TICK         f64 时间, 每个角色一对 f32 生命/护盾 (每次推进结束时)
+        END          f64 时间, u8 胜者 (遭遇战里是获胜一方的领头角色)
+    角色编号：0 = 玩家，1.. = 敌人（按出场顺序），255 = 无 (无来源伤害 / 超时无胜者)。
+    只读取版本 3（JSON 文件头）：回放文件会在人与人之间传来传去，读取时不执行任何 pickle。
+
+命令行查看回放内容：
+    python replay.py replays/xxx.crpl
+    python replay.py replays/xxx.crpl --profile   # 重演一遍，统计每个钩子的调用次数和耗时
+"""
+import json
+import os
+import struct
+import time
+
+from Character import Character
+from combat_engine import CombatEngine, DEFAULT_MAX_DURATION
+from content_registry import ITEMS, TALENTS
+from damage import DamageType
+from rng import seeded_stream
+
+MAGIC, VERSION = b"CRPL", 3
+REPLAY_DIR = "replays"
+MAX_SAVED_REPLAYS = 20  # replays 目录里最多保留多少场，旧的自动删除
+
+HEADER, ATTACK, DAMAGE, BUFF_ADD, BUFF_REMOVE, TICK, END = range(7)
+PLAYER, ENEMY, NOBODY = 0, 1, 255
+FLAG_CRIT, FLAG_DOT, FLAG_FATAL = 1, 2, 4
+DAMAGE_TYPES = list(DamageType)
+
+_LENGTH = struct.Struct("<I")
+_ATTACK = struct.Struct("<BdB")
+_DAMAGE = struct.Struct("<BdBBIIBB")
+_BUFF = struct.Struct("<BdBH")
+_TICK = struct.Struct("<Bd")
+_VITALS = struct.Struct("<ff")
+_END = struct.Struct("<BdB")
+
+INNATE_STATS = ("max_hp", "defense", "magic_resist", "attack", "attack_speed")  # 与 Character 构造参数的顺序一致
+ATTRIBUTES = ("strength", "vitality", "dexterity", "toughness")
+_MISSING = object()
+
+
+def fighter_data(char):
+    """
+    重建一个开战前角色所需的数据（可以 JSON 序列化）：id、名字、固有属性、等级和属性点、金币、当前生命、
+    各槽位的装备和背包里的珍贵物品、装备的天赋类名，以及事件留下的属性修正（武器强化、诅咒等）。
+    装备和天赋上和新实例不同的数值字段（木剑的 _count、风暴使者的 _attack_count 这类跨战斗保留的计数）一并记下，
+    见 content_data()。Buff 开战时会清掉，不用记。
+    """
+    known = set(char.all_active_items) | set(char.equipped_talents) | set(char.buffs)
+    return {
+        "id": char.id, "name": char.name, "level": char.level, "gold": char.gold, "hp": char.hp,
+        "innate": [getattr(char, "_innate_" + stat) for stat in INNATE_STATS],
+        "attributes": {attr: getattr(char, attr) for attr in ATTRIBUTES},
+        "equipment": {slot: [content_data(eq) if eq else None for eq in items] for slot, items in char.slots.items()},
+        "precious": [content_data(eq) for eq in char.all_active_items if eq not in char.all_equipment],
+        "talents": [content_data(talent) if talent else None for talent in char.equipped_talents],
+        "modifiers": [[stat, label, flat, mult] for stat, key, label, flat, mult in char.stat_ledger.sources()
+                      if not isinstance(key, str) and key not in known],
+    }
+
+
+def content_data(obj):
+    """一件装备或一个天赋：没有偏离新实例的字段时只是类名，否则是 [类名, {字段: 值}]（只记可以 JSON 序列化的标量）。"""
+    fresh = vars(type(obj)())
+    state = {field: value for field, value in vars(obj).items()
+             if isinstance(value, (bool, int, float, str)) and fresh.get(field, _MISSING) != value}
+    return [type(obj).__name__, state] if state else type(obj).__name__
+
+
+def build_content(registry, data):
+    """content_data() 的逆过程；registry 为 content_registry.ITEMS 或 TALENTS。"""
+    name, state = (data, {}) if isinstance(data, str) else data
+    obj = registry.create(name)
+    for field, value in state.items(): setattr(obj, field, value)
+    return obj
+
+
+def build_fighter(data):
+    """按 fighter_data() 的结果重新构造出角色。"""
+    char = Character(data["name"], *data["innate"], id=data["id"])
+    char.level, char.gold = data["level"], data["gold"]
+    for attr, value in data["attributes"].items(): setattr(char, attr, value)
+    char.max_talent_slots = len(data["talents"])
+    char.equipped_talents = [None] * char.max_talent_slots
+    with char.batch_loadout():
+        # 先装天赋：它们决定各槽位的容量
+        for index, talent in enumerate(data["talents"]):
+            if talent is None: continue
+            talent = build_content(TALENTS, talent)
+            char.learn_talent(talent)
+            char.equip_talent(talent, index)
+        for slot, items in data["equipment"].items():
+            for index, eq in enumerate(items):
+                if eq is not None: char.equip(build_content(ITEMS, eq), index)
+        char.backpack.extend(build_content(ITEMS, eq) for eq in data["precious"])
+        char.invalidate_hooks("items")
+        for stat, label, flat, mult in data["modifiers"]: char.add_modifier(stat, object(), flat, mult, label)
+        char.recalculate_stats()
+    char.hp = data["hp"]
+    return char
+
+
+class ReplayRecorder:
+    """
+    挂到 CombatEngine 上记录一场战斗。引擎在开战时把它注入双方角色 (char.recorder)，
+    Character 在出手、受伤、获得/失去 Buff 时回调这里。
+    """
+    def __init__(self, seed, enemy_id, player, enemy, max_duration=DEFAULT_MAX_DURATION):
+        self.seed = seed
+        self.enemy_id = enemy_id  # 遭遇战为敌人 id 列表
+        self.max_duration = max_duration
+        self.fighters = [player] + (list(enemy) if isinstance(enemy, (list, tuple)) else [enemy])
+        self.fighter_data = [fighter_data(char) for char in self.fighters]  # 必须在 engine.start() 之前记下
+        self.engine = None
+        self.events = bytearray()
+
+    def attach(self, engine):
+        self.engine = engine
+
+    def _side(self, char):
+        for index, fighter in enumerate(self.fighters):
+            if fighter is char: return index
+        return NOBODY
+
+    def _write(self, payload):
+        self.events += _LENGTH.pack(len(payload)) + payload
+
+    @property
+    def now(self):
+        return self.engine.elapsed if self.engine else 0.0
+
+    def attack(self, attacker):
+        self._write(_ATTACK.pack(ATTACK, self.now, self._side(attacker)))
+
+    def damage(self, target, details):
+        flags = ((FLAG_CRIT if details["is_critical"] else 0) | (FLAG_DOT if details["is_dot"] else 0)
+                 | (FLAG_FATAL if details["is_fatal"] else 0))
+        self._write(_DAMAGE.pack(DAMAGE, self.now, self._side(target), self._side(details["source"]),
+                                 details["final_amount"], details["shield_absorbed"],
+                                 DAMAGE_TYPES.index(details["damage_type"]), flags))
+
+    def buff_added(self, char, buff):
+        self._buff(BUFF_ADD, char, buff)
+
+    def buff_removed(self, char, buff):
+        self._buff(BUFF_REMOVE, char, buff)
+
+    def _buff(self, kind, char, buff):
+        name = type(buff).__name__.encode("utf-8")
+        self._write(_BUFF.pack(kind, self.now, self._side(char), min(buff.stacks, 0xFFFF)) + name)
+
+    def tick(self):
+        self._write(_TICK.pack(TICK, self.now) + b"".join(_VITALS.pack(c.hp, c.shield) for c in self.fighters))
+
+    def end(self, winner):
+        self._write(_END.pack(END, self.now, self._side(winner)))
+
+    def header_bytes(self):
+        return json.dumps({"seed": self.seed, "enemy_id": self.enemy_id, "max_duration": self.max_duration,
+                           "fighters": self.fighter_data}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def to_bytes(self):
+        header = bytes([HEADER]) + self.header_bytes()
+        return MAGIC + struct.pack("<H", VERSION) + _LENGTH.pack(len(header)) + header + bytes(self.events)
+
+    @property
+    def label(self):
+        return "+".join(self.enemy_id) if isinstance(self.enemy_id, (list, tuple)) else self.enemy_id
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f: f.write(self.to_bytes())
+        return path
+
+
+def save_recent(recorder, directory=REPLAY_DIR, keep=MAX_SAVED_REPLAYS):
+    """把录像存进 replays 目录（按时间命名），只保留最近 keep 场。"""
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}_{recorder.label}.crpl")
+    recorder.save(path)
+    for old in list_replays(directory)[keep:]:
+        os.remove(old)
+    return path
+
+
+def list_replays(directory=REPLAY_DIR):
+    """replays 目录里的录像，最新的在前。"""
+    if not os.path.isdir(directory): return []
+    paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".crpl")]
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+
+class Replay:
+    """读取出来的一场录像。"""
+    def __init__(self, header, events):
+        self.seed = header["seed"]
+        self.enemy_id = header["enemy_id"]
+        self.max_duration = header["max_duration"]
+        self.fighters = header["fighters"]  # 每个角色的 fighter_data()，玩家在前
+        self.events = events  # 原始事件字节（不含文件头和 HEADER 记录）
+
+    def load_fighters(self):
+        """还原开战前的 (玩家, 敌人)，遭遇战里敌人是列表。每次调用都得到一组新的对象。"""
+        player, *enemies = [build_fighter(data) for data in self.fighters]
+        return player, (enemies if isinstance(self.enemy_id, (list, tuple)) else enemies[0])
+
+    def build_engine(self, recorder=True):
+        """
+        按录像重建一场战斗：还原双方、用原种子创建随机数流。
+        recorder 为 True 时会重新录制，可用 matches() 校验重演结果与原录像一致。
+        """
+        player, enemy = self.load_fighters()
+        rec = None
+        if recorder:
+            rec = ReplayRecorder(self.seed, self.enemy_id, player, enemy, self.max_duration)
+        engine = CombatEngine(player, enemy, self.max_duration, rng=seeded_stream(self.seed), recorder=rec)
+        return engine
+
+    def matches(self, recorder):
+        """
+        重演结果是否与录像一致：比较出手、伤害、Buff 和结局的先后顺序与数值。
+        实时界面按帧推进，TICK 记录的疏密和时间戳的浮点尾数会随帧率变化，不参与比较。
+        """
+        return _outcome(self.events) == _outcome(recorder.events)
+
+    def iter_events(self):
+        """逐条解码事件，产出 (类型, 时间, 字段字典)。"""
+        return iter_events(self.events)
+
+
+def iter_events(events):
+    view = memoryview(events)
+    offset = 0
+    while offset < len(view):
+        (length,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        payload = bytes(view[offset:offset + length])
+        offset += length
+        yield _decode(payload)
+
+
+def _outcome(events):
+    return [(kind, fields) for kind, _, fields in iter_events(events) if kind != TICK]
+
+
+def _decode(payload):
+    kind = payload[0]
+    if kind == ATTACK:
+        _, t, attacker = _ATTACK.unpack(payload)
+        return kind, t, {"attacker": attacker}
+    if kind == DAMAGE:
+        _, t, target, source, amount, absorbed, dtype, flags = _DAMAGE.unpack(payload)
+        return kind, t, {"target": target, "source": source, "final_amount": amount, "shield_absorbed": absorbed,
+                         "damage_type": DAMAGE_TYPES[dtype], "is_critical": bool(flags & FLAG_CRIT),
+                         "is_dot": bool(flags & FLAG_DOT), "is_fatal": bool(flags & FLAG_FATAL)}
+    if kind in (BUFF_ADD, BUFF_REMOVE):
+        _, t, char, stacks = _BUFF.unpack_from(payload)
+        return kind, t, {"char": char, "stacks": stacks, "buff": payload[_BUFF.size:].decode("utf-8")}
+    if kind == TICK:
+        _, t = _TICK.unpack_from(payload)
+        vitals = [_VITALS.unpack_from(payload, offset) for offset in range(_TICK.size, len(payload), _VITALS.size)]
+        return kind, t, {"hp": [hp for hp, _ in vitals], "shield": [shield for _, shield in vitals]}
+    if kind == END:
+        _, t, winner = _END.unpack(payload)
+        return kind, t, {"winner": winner}
+    raise ValueError(f"未知的回放记录类型: {kind}")
+
+
+def load_replay(path):
+    with open(path, "rb") as f: data = f.read()
+    if data[:4] != MAGIC: raise ValueError(f"{path} 不是战斗回放文件")
+    (version,) = struct.unpack_from("<H", data, 4)
+    if version != VERSION: raise ValueError(f"不支持的回放版本: {version}")
+    offset = 6
+    (length,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    if data[offset] != HEADER: raise ValueError("回放文件缺少文件头记录")
+    header = json.loads(data[offset + 1:offset + length].decode("utf-8"))
+    return Replay(header, data[offset + length:])
+
+
+def _fighter_name(index):
+    if index == PLAYER: return "玩家"
+    if index == NOBODY: return "-"
+    return "敌人" if index == ENEMY else f"敌人{index}"
+
+
+def format_event(kind, t, fields):
+    if kind == ATTACK: return f"[{t:7.2f}] {_fighter_name(fields['attacker'])} 普攻"
+    if kind == DAMAGE:
+        tags = "".join(tag for flag, tag in (("is_critical", " 暴击"), ("is_dot", " 持续"), ("is_fatal", " 致命")) if fields[flag])
+        return (f"[{t:7.2f}] {_fighter_name(fields['source'])} -> {_fighter_name(fields['target'])} {fields['final_amount']} "
+                f"{fields['damage_type'].name}{tags}" + (f" (护盾吸收 {fields['shield_absorbed']})" if fields["shield_absorbed"] else ""))
+    if kind == BUFF_ADD: return f"[{t:7.2f}] {_fighter_name(fields['char'])} +{fields['buff']} ({fields['stacks']})"
+    if kind == BUFF_REMOVE: return f"[{t:7.2f}] {_fighter_name(fields['char'])} -{fields['buff']}"
+    if kind == TICK:
+        return f"[{t:7.2f}] " + " | ".join(f"{_fighter_name(i)} {hp:.0f}+{shield:.0f}"
+                                            for i, (hp, shield) in enumerate(zip(fields["hp"], fields["shield"])))
+    return f"[{t:7.2f}] 战斗结束，胜者: {_fighter_name(fields['winner'])}"
+
+
+def main(argv=None):
+    import argparse
+    import contextlib
+    parser = argparse.ArgumentParser(description="查看或校验战斗回放文件")
+    parser.add_argument("path", help="回放文件 (.crpl)")
+    parser.add_argument("--ticks", action="store_true", help="同时列出每次推进后的血量")
+    parser.add_argument("--verify", action="store_true", help="重演一遍并检查结果与录像一致")
+    parser.add_argument("--profile", action="store_true", help="重演一遍并输出每个钩子的调用次数和耗时")
+    args = parser.parse_args(argv)
+
+    replay = load_replay(args.path)
+    print(f"敌人: {replay.enemy_id}  种子: {replay.seed}  事件字节: {len(replay.events)}")
+    for kind, t, fields in replay.iter_events():
+        if kind != TICK or args.ticks: print(format_event(kind, t, fields))
+    if args.verify or args.profile:
+        engine = replay.build_engine()
+        if args.profile:
+            from profiler import HookProfiler
+            engine.profiler = HookProfiler()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            engine.run()
+        if args.verify: print("重演结果与录像一致" if replay.matches(engine.recorder) else "重演结果与录像不一致！")
+        if args.profile: print("\n" + engine.profiler.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# 文件: rng.py (新文件)
+"""
+可复现的随机数流。
+
+一局游戏只有一个 run seed，各子系统（战斗、掉落、地牢生成、事件、商店……）从它派生出互相独立的
+random.Random 流：同样的种子加同样的操作顺序，就能精确重现一场战斗或一层地牢；
+某个子系统多掷一次骰子也不会改变其他子系统的结果。
+
+    run_rng = RunRNG(seed)
+    run_rng.stream("loot").random()         # 掉落用的流
+    fight_rng = run_rng.fork("combat")      # 为一场战斗派生独立的流，种子可记下来用于重放
+    floor_rng = run_rng.derive("dungeon", "forest", 3)   # 只由 run seed 和层号决定的流
+"""
+import hashlib
+import random
+
+# 约定的子系统名
+COMBAT, LOOT, DUNGEON, EVENTS, SHOP = "combat", "loot", "dungeon", "events", "shop"
+
+
+def derive_seed(seed, *names):
+    """由父种子和若干名字确定性地派生出一个 64 位子种子（与进程、PYTHONHASHSEED 无关）。"""
+    digest = hashlib.sha256(repr((seed,) + names).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def new_seed():
+    """生成一个新的随机种子（不消耗任何流）。"""
+    return random.SystemRandom().getrandbits(64)
+
+
+class RunRNG:
+    """一局游戏的随机数源：按子系统名懒创建独立的随机数流。"""
+    def __init__(self, seed=None):
+        self.seed = seed if seed is not None else new_seed()
+        self._streams = {}
+
+    def stream(self, name):
+        """返回子系统 name 的随机数流；同一局内多次调用得到的是同一个流。"""
+        stream = self._streams.get(name)
+        if stream is None:
+            stream = self._streams[name] = random.Random(derive_seed(self.seed, name))
+        return stream
+
+    def fork(self, name):
+        """
+        从子系统 name 的流里取一个新种子，派生出一个独立的 random.Random（例如每场战斗一个）。
+        返回的流带有 .seed_value 属性，记下它就能单独重现这一段随机过程。
+        """
+        return seeded_stream(self.stream(name).getrandbits(64))
+
+    def derive(self, name, *keys):
+        """
+        按 (子系统名, keys...) 直接从 run seed 派生一个随机数流，不消耗任何已有的流。
+        例如 derive(DUNGEON, "forest", 3) 总是得到同一层地牢的流，与之前发生过什么无关。
+        """
+        return seeded_stream(derive_seed(self.seed, name, *keys))
+
+
+def seeded_stream(seed):
+    """用给定种子创建随机数流，并把种子记在 .seed_value 上，方便写进回放或日志。"""
+    stream = random.Random(seed)
+    stream.seed_value = seed
+    return stream
@@ -132,4 +132,7 @@ UPGRADE_COST_PER_RARITY = {
     "epic":      100,
     "legendary": 200,
     # 神话(mythic)品质通常是最高级，所以默认无法再升级
-}
\ No newline at end of file
+}
+
+# --- 战斗回放 ---
+RECORD_REPLAYS = True        # 录下每一场战斗（replays 目录，见 replay.py），复现玩家反馈的平衡问题用
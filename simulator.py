@@ -0,0 +1,177 @@
+# 文件: simulator.py (新文件)
+"""
+蒙特卡洛对战模拟器：用一套玩家配置，对 enemies.json 中的每个敌人各打 N 场无界面战斗，
+统计胜率、击杀耗时 (平均 / p95) 和剩余生命，用多进程吃满所有 CPU 核心。
+
+用法:
+    python simulator.py build.json -n 500
+    python simulator.py build.json -n 2000 --enemies slime goblin --workers 8 --json
+    python simulator.py build.json -n 200 --profile        # 额外输出每个钩子的调用次数和耗时
+    python simulator.py build.json --enemies goblin goblin slime --group   # 三个敌人同一房间，一场打完
+
+build.json 示例:
+    {
+        "level": 5,
+        "equipment": ["IronSword", "WoodenArmor", "IronRing"],
+        "talents": ["DualWieldTalent"],
+        "attributes": {"strength": 6, "dexterity": 6}
+    }
+可选的 "base_stats" 字段会覆盖 settings.PLAYER_BASE_STATS 中的同名属性。
+"""
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # 工作进程不需要打印 pygame 欢迎语
+
+import argparse
+import contextlib
+import json
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import Equips
+import Talents
+from Character import Character
+from combat_engine import CombatEngine, create_enemies
+from profiler import HookProfiler
+from rng import derive_seed, new_seed
+from settings import PLAYER_BASE_STATS
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+ATTRIBUTE_NAMES = ("strength", "vitality", "dexterity", "toughness")
+FIGHTS_PER_TASK = 250  # 每个进程任务打多少场；把单个敌人的 N 场拆开，敌人少时也能用满所有核心
+
+
+def load_enemy_data(path=None):
+    with open(path or os.path.join(ROOT_DIR, "enemies.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_player(build):
+    """根据配置字典生成一个新的玩家角色。"""
+    stats = dict(PLAYER_BASE_STATS, **build.get("base_stats", {}))
+    equipment = [getattr(Equips, name)() for name in build.get("equipment", [])]
+    talents = [getattr(Talents, name)() for name in build.get("talents", [])]
+    player = Character("模拟玩家", **stats, equipment=equipment, talents=talents)
+
+    level = build.get("level", 1)
+    if level > 1: player.gain_level(level - 1)
+    for attr, points in build.get("attributes", {}).items():
+        if attr not in ATTRIBUTE_NAMES: raise ValueError(f"未知属性：{attr}")
+        setattr(player, attr, getattr(player, attr) + points)
+    player.recalculate_stats()
+    player.hp = player.max_hp
+    return player
+
+
+def encounter_label(enemy_ids):
+    """对局的名字：单个敌人就是它的 id，遭遇战用 + 连起来。"""
+    return "+".join(enemy_ids)
+
+
+def _simulate_chunk(build, enemy_ids, enemy_data, fights, seed, profile=False):
+    """
+    工作进程：对同一组敌人（通常只有一个）打 fights 场，返回每场的 (是否获胜, 耗时, 剩余生命, 最大生命)，
+    以及 profile 为真时这些战斗的钩子统计 (HookProfiler.as_dict())。
+    """
+    rng = random.Random(seed)  # 每个任务一条独立的随机数流，进程之间既不相关也不共享状态
+    profiler = HookProfiler() if profile else None
+    outcomes = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        template = build_player(build)  # 只构造一次，每场战斗复制一份（敌人也由原型缓存复制）
+        for _ in range(fights):
+            player = template.clone()
+            enemies = create_enemies(enemy_ids, enemy_data, rng)
+            result = CombatEngine(player, enemies, rng=rng, profiler=profiler).run()
+            outcomes.append((result.winner is player, result.duration, player.hp, player.max_hp))
+    return encounter_label(enemy_ids), outcomes, profiler.as_dict() if profiler else None
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values: return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(outcomes):
+    """把若干场战斗的结果汇总成统计数据。击杀耗时和剩余生命只统计获胜的场次。"""
+    wins = [o for o in outcomes if o[0]]
+    kill_times = sorted(o[1] for o in wins)
+    return {
+        "fights": len(outcomes),
+        "win_rate": len(wins) / len(outcomes) if outcomes else 0.0,
+        "ttk_mean": sum(kill_times) / len(kill_times) if kill_times else None,
+        "ttk_p95": _percentile(kill_times, 95),
+        "hp_left_mean": sum(o[2] for o in wins) / len(wins) if wins else None,
+        "hp_left_pct_mean": sum(o[2] / o[3] for o in wins) / len(wins) if wins else None,
+    }
+
+
+def run_matchups(build, fights=500, enemy_ids=None, enemy_data=None, workers=None, seed=None, profiler=None,
+                 encounters=None):
+    """
+    对每个敌人各模拟 fights 场，返回 {enemy_id: 统计数据}。传入 profiler 时把所有战斗的钩子统计累加进去。
+    encounters 是敌人 id 元组的列表时，每组敌人作为一个房间一起上，结果按 encounter_label() 索引。
+    """
+    enemy_data = enemy_data or load_enemy_data()
+    encounters = encounters or [(enemy_id,) for enemy_id in enemy_ids or enemy_data]
+    seed = seed if seed is not None else new_seed()
+
+    outcomes = {encounter_label(group): [] for group in encounters}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for group in encounters:
+            presets = {enemy_id: enemy_data[enemy_id] for enemy_id in group}
+            for start in range(0, fights, FIGHTS_PER_TASK):
+                chunk = min(FIGHTS_PER_TASK, fights - start)
+                # 任务种子只由 (总种子, 敌人, 起始场次) 决定，同一个 --seed 的结果与进程数、调度顺序无关
+                chunk_seed = derive_seed(seed, encounter_label(group), start)
+                futures.append(pool.submit(_simulate_chunk, build, group, presets, chunk, chunk_seed, profiler is not None))
+        for future in futures:
+            label, chunk_outcomes, hook_stats = future.result()
+            outcomes[label].extend(chunk_outcomes)
+            if hook_stats: profiler.merge(hook_stats)
+    return {label: summarize(results) for label, results in outcomes.items()}
+
+
+def format_report(report, enemy_data):
+    def fmt(value, width, spec):
+        return "-".rjust(width) if value is None else format(value, f">{width}{spec}")
+    lines = [f"{'敌人':<20}{'胜率':>8}{'平均TTK':>10}{'p95 TTK':>10}{'剩余HP':>10}{'剩余%':>8}"]
+    for label, stats in report.items():
+        name = "+".join(enemy_data[enemy_id]["name"] for enemy_id in label.split("+")) + f"({label})"
+        lines.append(f"{name:<20}{stats['win_rate']:>8.1%}{fmt(stats['ttk_mean'], 10, '.2f')}{fmt(stats['ttk_p95'], 10, '.2f')}"
+                     f"{fmt(stats['hp_left_mean'], 10, '.1f')}{fmt(stats['hp_left_pct_mean'], 8, '.1%')}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="对 enemies.json 中的敌人批量模拟战斗")
+    parser.add_argument("build", help="玩家配置 JSON 文件")
+    parser.add_argument("-n", "--fights", type=int, default=500, help="每个敌人模拟的场数")
+    parser.add_argument("--enemies", nargs="*", help="只模拟这些敌人 id (默认全部)")
+    parser.add_argument("--workers", type=int, default=None, help="进程数 (默认等于 CPU 核心数)")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    parser.add_argument("--group", action="store_true", help="把 --enemies 列出的敌人放进同一个房间，一场打完")
+    parser.add_argument("--profile", action="store_true", help="统计每个装备/Buff/天赋钩子的调用次数和耗时")
+    args = parser.parse_args(argv)
+
+    with open(args.build, "r", encoding="utf-8") as f:
+        build = json.load(f)
+    enemy_data = load_enemy_data()
+    if args.group and not args.enemies: parser.error("--group 需要用 --enemies 指定房间里的敌人")
+    unknown = [enemy_id for enemy_id in args.enemies or () if enemy_id not in enemy_data]
+    if unknown: parser.error(f"未知敌人：{' '.join(unknown)}")
+    profiler = HookProfiler() if args.profile else None
+    encounters = [tuple(args.enemies)] if args.group else None
+    report = run_matchups(build, args.fights, args.enemies, enemy_data, args.workers, args.seed, profiler, encounters)
+    if args.json:
+        if profiler: report = {"matchups": report, "hooks": profiler.as_dict()}
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report, enemy_data))
+        if profiler: print("\n" + profiler.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# 文件: spatial_hash.py (新文件)
+"""
+按均匀网格索引的精灵组，用于墙、门这类位置不变的碰撞体。
+
+SpatialGroup 就是一个 pygame.sprite.Group：加入 / 移出时顺便把精灵登记到它的 rect 覆盖的网格里。
+碰撞查询只检查查询矩形所在网格里的精灵，与整层有多少面墙无关。门关上时加入不可通行组、打开时移出
+（Door.close / Door.open），索引随之更新。
+
+    walls = SpatialGroup()
+    for wall in wall_list: walls.add(wall)
+    for wall in walls.collide(player.rect): ...      # 与 spritecollide 的结果和顺序相同
+
+精灵加入组之后不应再移动；要移动就先移出、改好位置再加入。
+"""
+import pygame
+
+from dungeon_layout import TILE_SIZE
+
+
+class SpatialGroup(pygame.sprite.Group):
+    def __init__(self, *sprites, cell_size=TILE_SIZE):
+        self.cell_size = cell_size
+        self._cells = {}   # (格 x, 格 y) -> {精灵: 加入顺序}
+        self._order = {}   # 精灵 -> 加入顺序；查询结果按它排序，和遍历 Group 的顺序一致
+        self._counter = 0
+        super().__init__(*sprites)
+
+    def _cell_keys(self, rect):
+        size = self.cell_size
+        return [(cx, cy) for cy in range(rect.top // size, (rect.bottom - 1) // size + 1)
+                for cx in range(rect.left // size, (rect.right - 1) // size + 1)]
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self._counter += 1
+        self._order[sprite] = self._counter
+        for key in self._cell_keys(sprite.rect):
+            self._cells.setdefault(key, {})[sprite] = self._counter
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self._order.pop(sprite, None)
+        for key in self._cell_keys(sprite.rect):
+            cell = self._cells.get(key)
+            if cell is not None:
+                cell.pop(sprite, None)
+                if not cell: del self._cells[key]
+
+    def collide(self, rect):
+        """与 rect 相交的精灵列表，顺序与 pygame.sprite.spritecollide(…, self, False) 相同。"""
+        found = {}
+        cells = self._cells
+        for key in self._cell_keys(rect):
+            cell = cells.get(key)
+            if cell:
+                for sprite, order in cell.items():
+                    if sprite not in found and rect.colliderect(sprite.rect): found[sprite] = order
+        if len(found) < 2: return list(found)
+        return sorted(found, key=found.__getitem__)
@@ -0,0 +1,91 @@
+# 文件: stat_ledger.py (新文件)
+"""
+属性账本：按来源记录每项属性的加算 / 乘算贡献。
+
+每个来源（固有属性、属性点、装备、天赋、Buff……）用一个 key 登记自己对某项属性的贡献，
+合计值 = (所有加算之和) × (所有乘算之积)。登记、修改或撤销贡献只会把受影响的属性标脏，
+取值时才重新合计；没变化的属性不会重算。breakdown() 给界面展示每项属性的来源明细。
+
+一项属性也可以作为另一项属性的加算来源（link），例如装备合计的 base_attack 计入 attack，
+这样格斗家只放大装备攻击，而不影响固有攻击和属性点。
+"""
+
+
+class StatLedger:
+    def __init__(self):
+        self._entries = {}   # 属性名 -> {来源 key: (标签, 加算, 乘算, 链接的属性名或 None)}
+        self._totals = {}    # 属性名 -> 缓存的合计值
+        self._links = {}     # 属性名 -> [链接了它的属性名, ...]
+        self._sources = {}   # 来源 key -> {它登记过的属性名}，撤销一个来源时不用扫描所有属性
+        self.dirty = set()   # 自上次 pop_dirty() 以来合计值可能变化的属性
+
+    def set(self, stat, key, flat=0, mult=1, label=None):
+        """登记（或更新）来源 key 对 stat 的贡献；数值没变时什么也不做。"""
+        entries = self._entries.setdefault(stat, {})
+        old = entries.get(key)
+        if old is not None and old[1] == flat and old[2] == mult: return
+        entries[key] = (label if label is not None else str(key), flat, mult, None)
+        self._sources.setdefault(key, set()).add(stat)
+        self._mark(stat)
+
+    def link(self, stat, target, label):
+        """把 stat 的合计值作为 target 的一条加算来源。"""
+        self._entries.setdefault(target, {})[("link", stat)] = (label, 0, 1, stat)
+        self._links.setdefault(stat, []).append(target)
+        self._mark(stat)
+
+    def remove(self, key, stats=None):
+        """撤销来源 key 的贡献；stats 为 None 时撤销它登记过的全部属性。"""
+        registered = self._sources.get(key)
+        if not registered: return
+        for stat in (list(registered) if stats is None else [stat for stat in stats if stat in registered]):
+            self._entries[stat].pop(key)
+            registered.discard(stat)
+            self._mark(stat)
+        if not registered: del self._sources[key]
+
+    def __contains__(self, key):
+        """来源 key 目前是否登记着任何贡献。"""
+        return key in self._sources
+
+    def _mark(self, stat):
+        self._totals.pop(stat, None)
+        self.dirty.add(stat)
+        for target in self._links.get(stat, ()): self._mark(target)
+
+    def get(self, stat):
+        total = self._totals.get(stat)
+        if total is None:
+            flat, mult = 0, 1
+            for _, f, m, linked in self._entries.get(stat, {}).values():
+                flat += self.get(linked) if linked is not None else f
+                if m != 1: mult *= m
+            total = self._totals[stat] = flat * mult if mult != 1 else flat
+        return total
+
+    def pop_dirty(self):
+        """取出并清空脏属性集合。"""
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def copy(self, rekey=None):
+        """复制一份账本（缓存的合计值一并复制）；rekey(key) 把来源 key 换成对应的新对象，复制角色时用。"""
+        twin = StatLedger.__new__(StatLedger)
+        twin._entries = {stat: {(rekey(key) if rekey else key): entry for key, entry in entries.items()}
+                         for stat, entries in self._entries.items()}
+        twin._totals = dict(self._totals)
+        twin._links = {stat: list(targets) for stat, targets in self._links.items()}
+        twin._sources = {(rekey(key) if rekey else key): set(stats) for key, stats in self._sources.items()}
+        twin.dirty = set(self.dirty)
+        return twin
+
+    def sources(self):
+        """逐条列出 (属性, 来源 key, 标签, 加算, 乘算)，不含链接来源。"""
+        for stat, entries in self._entries.items():
+            for key, (label, f, m, linked) in entries.items():
+                if linked is None: yield stat, key, label, f, m
+
+    def breakdown(self, stat):
+        """返回 stat 的来源明细 [(标签, 加算, 乘算), ...]，链接来源的加算为其当前合计值。"""
+        return [(label, self.get(linked) if linked is not None else f, m)
+                for label, f, m, linked in self._entries.get(stat, {}).values()]
@@ -6,6 +6,11 @@ from .base import BaseState
 from ui import Button, draw_text, get_display_name
 from settings import *
 
+# 属性明细里展示的派生属性及其显示格式
+STAT_BREAKDOWN_ROWS = [("max_hp", "生命", "{:.0f}"), ("attack", "攻击", "{:.0f}"), ("defense", "防御", "{:.0f}"),
+                       ("magic_resist", "魔抗", "{:.0f}"), ("attack_speed", "攻速", "{:.2f}"),
+                       ("crit_chance", "暴击率", "{:.0%}"), ("crit_multiplier", "暴击伤害", "{:.0%}")]
+
 class AttributesScreen(BaseState):
     def __init__(self, game):
         super().__init__(game)
@@ -25,7 +30,7 @@ class AttributesScreen(BaseState):
         self._setup_layout()
 
     def _setup_layout(self):
-        panel_w, panel_h = 700, 550
+        panel_w, panel_h = 1000, 550
         self.panel_rect = pygame.Rect((SCREEN_WIDTH - panel_w) / 2, (SCREEN_HEIGHT - panel_h) / 2, panel_w, panel_h)
         
         self.attribute_buttons = {}
@@ -34,7 +39,7 @@ class AttributesScreen(BaseState):
         
         for i, attr in enumerate(attributes):
             y = y_start + i * y_gap
-            btn_rect = pygame.Rect(self.panel_rect.right - 100, y, 40, 40)
+            btn_rect = pygame.Rect(self.panel_rect.x + 360, y, 40, 40)
             self.attribute_buttons[attr] = Button(btn_rect, "+", self.font_main)
             
         self.confirm_button = Button((self.panel_rect.centerx - 160, self.panel_rect.bottom - 80, 150, 50), "确认", self.font_main)
@@ -116,6 +121,25 @@ class AttributesScreen(BaseState):
             if self.player.attribute_points > self.get_pending_total():
                 self.attribute_buttons[attr].draw(surface)
 
+        self._draw_stat_breakdown(surface)
+
         self.confirm_button.draw(surface)
         self.reset_button.draw(surface)
-        self.close_button.draw(surface)
\ No newline at end of file
+        self.close_button.draw(surface)
+
+    def _draw_stat_breakdown(self, surface):
+        """右侧栏：每项属性的最终值和来源明细（直接读角色的属性账本）"""
+        x, y = self.panel_rect.x + 460, self.panel_rect.y + 110
+        width = self.panel_rect.right - 30 - x
+        line_height = self.font_small.get_height()
+        for stat, label, value_fmt in STAT_BREAKDOWN_ROWS:
+            fmt = value_fmt.format
+            parts = []
+            for source, flat, mult in self.player.stat_breakdown(stat):
+                if flat: parts.append(f"{source} {'+' if flat > 0 else '-'}{fmt(abs(flat))}")
+                if mult != 1: parts.append(f"{source} ×{mult:g}")
+            header = f"{label} {fmt(getattr(self.player, stat))}"
+            surface.blit(self.font_main.render(header, True, TEXT_COLOR), (x, y))
+            detail_rect = pygame.Rect(x + 150, y + 4, width - 150, line_height * 2)
+            draw_text(surface, " · ".join(parts), self.font_small, (170, 170, 170), detail_rect)
+            y += 48
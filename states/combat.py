@@ -11,7 +11,10 @@ from ui import TooltipManager, Button, draw_text_with_outline, get_display_name,
 from settings import *
 from Character import Character
 import Talents
-from battle_logger import battle_logger
+from battle_logger import battle_logger, DAMAGE, SYSTEM
+from combat_engine import CombatEngine, create_enemies
+from rng import COMBAT
+from replay import ReplayRecorder, save_recent
 
 class ModernButton(Button):
     def __init__(self, rect, text, font, accent_color=(100, 150, 200)):
@@ -42,13 +45,12 @@ class ModernScrollableLog:
         self.rect = rect
         self.font = font
         self.line_height = line_height
-        self.messages = []
+        self.messages = []  # battle_logger.LogRecord，绘制到哪一行才格式化哪一行
         self.scroll_offset = 0
         self.max_lines = (self.rect.height - 45) // self.line_height
         
-    def add_message(self, parts):
-        if isinstance(parts, str): parts = [(parts, (200, 200, 200))]
-        self.messages.append(parts)
+    def add_record(self, record):
+        self.messages.append(record)
         if len(self.messages) > 100: self.messages.pop(0)
         if len(self.messages) > self.max_lines:
             self.scroll_offset = len(self.messages) - self.max_lines
@@ -83,7 +85,7 @@ class ModernScrollableLog:
         for i in range(self.scroll_offset, min(len(self.messages), self.scroll_offset + self.max_lines)):
             x_pos = content_rect.x
             # 绘制一行中的每一个富文本片段
-            for text, color in self.messages[i]:
+            for text, color in self.messages[i].parts:
                 text_surface = self.font.render(text, True, color)
                 surface.blit(text_surface, (x_pos, y_pos))
                 x_pos += text_surface.get_width() # 水平移动光标
@@ -99,10 +101,22 @@ class ModernScrollableLog:
 class CombatScreen(BaseState):
     # ... (CombatScreen 类的其余部分保持不变，因为 ModernButton 和 ModernScrollableLog 的修复已在上面完成)
     # 此处省略，请使用您当前文件中的版本
-    def __init__(self, game, enemy_id, origin_identifier=None):
+    # 回放速度档位：(倍速, 按钮文字)；倍速为 None 表示直接跳到结局
+    PLAYBACK_SPEEDS = [(1, "1x"), (8, "8x"), (None, "即时")]
+    # 战斗日志过滤档位（按 L 切换）：(名称, 显示的类别，None 为全部)
+    LOG_FILTERS = [("全部", None), ("仅伤害", (DAMAGE, SYSTEM))]
+
+    def __init__(self, game, enemy_id, origin_identifier=None, replay=None):
+        """
+        enemy_id 是一个敌人 id，或一个房间里所有敌人的 id 列表（遭遇战，一场打完）；
+        origin_identifier 对应地牢里怪物的 uid（遭遇战时同样是列表），胜利后据此把它们从房间里移除。
+        """
         super().__init__(game)
         self.enemy_id = enemy_id
         self.origin_id = origin_identifier
+        self.replay = replay  # 传入 replay.Replay 时为回放模式：不影响当前存档，结束后直接返回
+        self.recorder = None
+        self.speed_index = 0
         self.battle_ended = False
         self.is_paused = False
         self.shake_intensity = 0
@@ -110,10 +124,11 @@ class CombatScreen(BaseState):
         self.damage_numbers = []
         self.battle_particles = []
         self.glow_animation = 0
+        self.log_filter_index = 0
         self._initialize_combat()
         self._init_ui()
-        self._set_opponents()
         self._init_battle_log()
+        self.engine.start()  # 先注册日志显示器，战斗开始时触发的效果才会显示在日志里
         self._init_visual_effects()
     def _get_font(self, font_name, default_size=20):
         try:
@@ -127,54 +142,55 @@ class CombatScreen(BaseState):
         self.player_ui_elements = {}; self.enemy_ui_elements = {}
         pause_button_rect = pygame.Rect(SCREEN_WIDTH - 80, 20, 60, 50)
         self.pause_button = ModernButton(pause_button_rect, "⏸️", self._get_font('normal'), (100, 150, 200))
+        self.speed_button = ModernButton(pygame.Rect(SCREEN_WIDTH - 170, 20, 80, 50), self.PLAYBACK_SPEEDS[0][1], self._get_font('normal'), (150, 110, 200))
         self.end_timer = 0.0; self.END_DELAY = 2.0
     def _initialize_combat(self):
-        try:
-            enemy_preset = self.game.enemy_data[self.enemy_id]
-        except KeyError:
-            raise ValueError(f"未找到敌人数据: {self.enemy_id}")
-        rolled_talents = self._generate_enemy_talents(enemy_preset)
-        self.enemy = Character(id=self.enemy_id, name=enemy_preset["name"], talents=rolled_talents, **enemy_preset["stats"])
-        self.displayed_hp = {'player': self.game.player.hp, 'enemy': self.enemy.hp}
-        self.displayed_shield = {'player': self.game.player.shield, 'enemy': self.enemy.shield}
-        self.game.player.on_enter_combat()
-        self.enemy.on_enter_combat()
+        if self.replay is not None:
+            # 回放：从录像还原开战前的双方，用录下的种子重演整场战斗
+            self.engine = self.replay.build_engine()
+            self.player, self.enemies = self.engine.player, self.engine.enemies
+        else:
+            is_group = isinstance(self.enemy_id, (list, tuple))
+            enemy_ids = list(self.enemy_id) if is_group else [self.enemy_id]
+            missing = [enemy_id for enemy_id in enemy_ids if enemy_id not in self.game.enemy_data]
+            if missing: raise ValueError(f"未找到敌人数据: {', '.join(missing)}")
+            self.player = self.game.player
+            self.enemies = create_enemies(enemy_ids, self.game.enemy_data, self.game.rng.stream(COMBAT))
+            opponents = self.enemies if is_group else self.enemies[0]
+            # 每场战斗从本局的战斗流派生一个独立的随机数流；开战前的双方 + 这个种子就能重现整场战斗
+            self.rng = self.game.rng.fork(COMBAT)
+            # 录像存进 replays 目录，只保留最近 MAX_SAVED_REPLAYS 场；settings.RECORD_REPLAYS 可以关掉
+            if RECORD_REPLAYS: self.recorder = ReplayRecorder(self.rng.seed_value, self.enemy_id, self.player, opponents)
+            # 战斗逻辑全部交给无界面的引擎，界面只负责渲染
+            self.engine = CombatEngine(self.player, opponents, rng=self.rng, recorder=self.recorder)
+        self.enemy = self.enemies[0]  # 敌方面板显示的敌人：玩家当前的攻击目标
+        self.displayed_hp = {'player': self.player.hp, 'enemy': self.enemy.hp}
+        self.displayed_shield = {'player': self.player.shield, 'enemy': self.enemy.shield}
         self.last_update_time = time.time()
-        self._trigger_battle_start_events()
-    def _generate_enemy_talents(self, enemy_preset):
-        rolled_talents = []
-        for talent_info in enemy_preset.get("possible_talents", []):
-            if random.random() < talent_info["chance"]:
-                talent = self._create_talent(talent_info["talent_class_name"])
-                if talent: rolled_talents.append(talent)
-        for talent_class_name in enemy_preset.get("talents", []):
-            talent = self._create_talent(talent_class_name)
-            if talent: rolled_talents.append(talent)
-        return rolled_talents
-    def _create_talent(self, talent_class_name):
-        if hasattr(Talents, talent_class_name):
-            return getattr(Talents, talent_class_name)()
-        return None
-    def _set_opponents(self):
-        self.game.player.current_opponent = self.enemy; self.enemy.current_opponent = self.game.player
-    def _trigger_battle_start_events(self):
-        for char in [self.game.player, self.enemy]:
-            for talent in char.equipped_talents:
-                if talent and hasattr(talent, 'on_battle_start'): talent.on_battle_start(char, char.current_opponent)
-            for eq in char.all_active_items:
-                if hasattr(eq, 'on_battle_start'): eq.on_battle_start(char)
     def _init_battle_log(self):
         log_rect = pygame.Rect(40, SCREEN_HEIGHT - 220, SCREEN_WIDTH - 80, 180)
         self.log_renderer = ModernScrollableLog(log_rect, self._get_font('small'), line_height=22)
-        battle_logger.register_renderer(self.log_renderer)
-        battle_logger.log([(f"⚔️ 战斗开始！遭遇了 ", (200,200,200)), (f"{self.enemy.name}", (255,100,100)), ("！", (200,200,200))])
+        battle_logger.register_renderer(self.log_renderer, categories=self.LOG_FILTERS[self.log_filter_index][1])
+        if self.replay is not None: battle_logger.log([("📼 战斗回放", (150, 110, 200))])
+        names = "、".join(enemy.name for enemy in self.enemies)
+        battle_logger.log([(f"⚔️ 战斗开始！遭遇了 ", (200,200,200)), (names, (255,100,100)), ("！", (200,200,200))])
     def _init_visual_effects(self):
         for _ in range(30):
             self.battle_particles.append({'pos': [random.uniform(0, SCREEN_WIDTH), random.uniform(0, SCREEN_HEIGHT)],
                 'size': random.uniform(1, 2.5), 'speed': random.uniform(0.1, 0.4), 'alpha': random.uniform(10, 40), 'direction': random.uniform(0, 2 * math.pi)})
     def handle_event(self, event):
         if self._handle_pause_event(event) or self.is_paused: return
+        if self.replay is not None and self.speed_button.handle_event(event):
+            self.speed_index = (self.speed_index + 1) % len(self.PLAYBACK_SPEEDS)
+            self.speed_button.text = self.PLAYBACK_SPEEDS[self.speed_index][1]
+            return
         self.log_renderer.handle_event(event)
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_l:
+            self.log_filter_index = (self.log_filter_index + 1) % len(self.LOG_FILTERS)
+            name, categories = self.LOG_FILTERS[self.log_filter_index]
+            battle_logger.set_filter(categories=categories)
+            battle_logger.log([(f"📋 日志过滤：{name}", (150, 150, 150))])
+            return
         self._handle_escape_event(event)
     def _handle_pause_event(self, event):
         pause_triggered = (self.pause_button.handle_event(event) or (event.type == pygame.KEYDOWN and event.key == pygame.K_p))
@@ -186,6 +202,8 @@ class CombatScreen(BaseState):
         return False
     def _handle_escape_event(self, event):
         if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            if self.replay is not None:
+                self._leave_replay(); return True
             from .confirm_dialog import ConfirmDialog; from .title import TitleScreen
             def on_confirm_action(): self.game.state_stack = [TitleScreen(self.game)]
             self.game.state_stack.append(ConfirmDialog(self.game, "⚠️ 所有战斗进度都将丢失，确定要返回主菜单吗？", on_confirm_action, title="退出战斗", confirm_text="确认退出", cancel_text="继续战斗"))
@@ -203,15 +221,18 @@ class CombatScreen(BaseState):
         self.last_update_time = time.time()
         if self.battle_ended:
             self._handle_battle_end(dt); return
-        self._update_characters(dt)
+        if self.replay is not None:
+            speed = self.PLAYBACK_SPEEDS[self.speed_index][0]
+            dt = dt * speed if speed is not None else self.engine.max_duration
         self._handle_attacks(dt)
+        self._follow_player_target()
         self._check_battle_end()
     def _update_animations(self, dt):
         self.glow_animation = (self.glow_animation + dt * 2) % (2 * math.pi)
         if self.shake_intensity > 0: self.shake_intensity = max(0, self.shake_intensity - dt * 200)
         if self.screen_flash > 0: self.screen_flash = max(0, self.screen_flash - dt * 800)
         for char_type in ['player', 'enemy']:
-            char = self.game.player if char_type == 'player' else self.enemy
+            char = self.player if char_type == 'player' else self.enemy
             for val_type, disp_val in [('hp', self.displayed_hp), ('shield', self.displayed_shield)]:
                 target = getattr(char, val_type); current = disp_val[char_type]
                 if abs(target - current) > 0.1: disp_val[char_type] += (target - current) * dt * 8
@@ -225,18 +246,16 @@ class CombatScreen(BaseState):
             elif p['pos'][0] > SCREEN_WIDTH: p['pos'][0] = 0
             if p['pos'][1] < 0: p['pos'][1] = SCREEN_HEIGHT
             elif p['pos'][1] > SCREEN_HEIGHT: p['pos'][1] = 0
-    def _update_characters(self, dt):
-        self.game.player.update(dt); self.enemy.update(dt)
     def _handle_attacks(self, dt):
-        for attacker, target, type_str in [(self.game.player, self.enemy, 'player'), (self.enemy, self.game.player, 'enemy')]:
-            result = attacker.try_attack(target, dt)
-            if result:
-                self._log_attack_result(result)
-                self._create_attack_effects(type_str, result[2])
-    def _log_attack_result(self, attack_result):
-        log_parts, extra_logs, _ = attack_result
-        battle_logger.log(log_parts)
-        for extra_log in extra_logs: battle_logger.log([("  └ ", (150,150,150)), (extra_log, (150,150,150))])
+        # 普攻和各种触发效果的日志由战斗逻辑自己提交给 battle_logger，这里只负责画面特效
+        for attacker, damage_details in self.engine.advance(dt):
+            self._create_attack_effects('player' if attacker is self.player else 'enemy', damage_details)
+    def _follow_player_target(self):
+        """遭遇战里玩家换了目标，敌方面板跟着切到新目标（血条直接从新目标的当前值开始）。"""
+        target = self.player.current_opponent
+        if target is None or target is self.enemy: return
+        self.enemy = target
+        self.displayed_hp['enemy'], self.displayed_shield['enemy'] = target.hp, target.shield
     def _create_attack_effects(self, attacker_type, damage_details):
         self.shake_intensity = 10
         damage_amount = damage_details.get("final_amount", 0)
@@ -245,30 +264,44 @@ class CombatScreen(BaseState):
         pos = (SCREEN_WIDTH * 0.75, SCREEN_HEIGHT * 0.25) if attacker_type == 'player' else (SCREEN_WIDTH * 0.25, SCREEN_HEIGHT * 0.25)
         self.damage_numbers.append({'pos': [pos[0] + random.uniform(-20, 20), pos[1]], 'alpha': 255, 'text': str(damage_amount), 'is_crit': is_crit})
     def _check_battle_end(self):
-        if not self.battle_ended and (self.enemy.hp <= 0 or self.game.player.hp <= 0):
+        if not self.battle_ended and self.engine.is_over:
             self.battle_ended = True; self.end_timer = 0.0
+            if self.replay is not None: self._report_replay_check()
+            elif self.recorder is not None: self._save_replay()
+    def _save_replay(self):
+        try: save_recent(self.recorder)
+        except OSError as e: print(f"保存战斗回放失败: {e}")
+    def _report_replay_check(self):
+        if self.replay.matches(self.engine.recorder): battle_logger.log([("📼 回放结束，重演结果与录像一致", (150, 220, 150))])
+        else: battle_logger.log([("📼 回放结束，但重演结果与录像不一致（游戏数据可能已变化）", (255, 150, 100))])
     def _handle_battle_end(self, dt):
         self.end_timer += dt
         if self.end_timer >= self.END_DELAY:
-            if self.enemy.hp <= 0: self._on_victory()
+            if self.replay is not None: self._leave_replay()
+            elif self.engine.result().winner is self.player: self._on_victory()
             else: self._on_defeat()
+    def _leave_replay(self):
+        self._clear_opponents(); battle_logger.unregister_renderer()
+        self.game.state_stack.pop()
     def _on_victory(self):
         self._clear_opponents(); battle_logger.unregister_renderer()
         from .dungeon_screen import DungeonScreen
         next_story_stage_id = None
         if len(self.game.state_stack) > 1 and isinstance(self.game.state_stack[-2], DungeonScreen):
-            if self.origin_id: self.game.state_stack[-2].on_monster_defeated(self.origin_id)
+            origin_ids = self.origin_id if isinstance(self.origin_id, (list, tuple)) else [self.origin_id]
+            for origin_id in origin_ids:
+                if origin_id: self.game.state_stack[-2].on_monster_defeated(origin_id)
         else:
             next_story_stage_id = self.game.story_data.get(self.game.current_stage, {}).get("next_win")
         self.game.state_stack.pop()
-        self.game.state_stack.append(CombatVictoryScreen(self.game, self.enemy, next_story_stage=next_story_stage_id))
+        self.game.state_stack.append(CombatVictoryScreen(self.game, self.enemy, next_story_stage=next_story_stage_id,
+                                                         defeated_enemies=self.enemies))
     def _on_defeat(self):
         from .title import TitleScreen
         self._clear_opponents(); battle_logger.unregister_renderer()
         self.game.state_stack = [TitleScreen(self.game)]
     def _clear_opponents(self):
-        self.game.player.current_opponent = None
-        if hasattr(self, 'enemy'): self.enemy.current_opponent = None
+        if hasattr(self, 'engine'): self.engine.finish()
     def _update_hovers(self):
         mouse_pos = pygame.mouse.get_pos(); hovered_object = None
         all_elements = (self.player_ui_elements.get('talents', []) + self.player_ui_elements.get('buffs', []) + self.enemy_ui_elements.get('talents', []) + self.enemy_ui_elements.get('buffs', []))
@@ -322,6 +355,7 @@ class CombatScreen(BaseState):
         # 7. 最后，在所有东西都画完之后，再画我们的暂停按钮。
         #    这样无论是否暂停，它都会显示在最顶层！
         self.pause_button.draw(surface)
+        if self.replay is not None: self.speed_button.draw(surface)
 
     def _draw_battle_background(self, surface):
         surface.fill(BG_COLOR)
@@ -331,9 +365,23 @@ class CombatScreen(BaseState):
             pygame.draw.circle(p_surf, (100, 150, 200, alpha), (p['size'], p['size']), p['size'])
             surface.blit(p_surf, (p['pos'][0] - p['size'], p['pos'][1] - p['size']))
     def _draw_enhanced_character_panels(self, surface, player_rect, enemy_rect):
-        self.player_ui_elements = self._draw_base_character_panel(surface, self.game.player, player_rect)
+        self.player_ui_elements = self._draw_base_character_panel(surface, self.player, player_rect)
         self.enemy_ui_elements = self._draw_base_character_panel(surface, self.enemy, enemy_rect)
         self._draw_animated_hp_bars(surface, player_rect, enemy_rect)
+        if len(self.enemies) > 1: self._draw_enemy_roster(surface, enemy_rect)
+    def _draw_enemy_roster(self, surface, enemy_rect):
+        """遭遇战：敌方面板下方列出房间里的所有敌人，当前目标高亮，倒下的变灰。"""
+        font = self._get_font('small', 14)
+        left = enemy_rect.left + 40; width = (enemy_rect.right - left) // len(self.enemies)
+        for i, enemy in enumerate(self.enemies):
+            x = left + i * width; y = enemy_rect.bottom + 6
+            color = (120, 120, 120) if enemy.hp <= 0 else (255, 215, 0) if enemy is self.enemy else TEXT_COLOR
+            surface.blit(font.render(enemy.name, True, color), (x, y))
+            bar_rect = pygame.Rect(x, y + font.get_height() + 2, width - 12, 6)
+            pygame.draw.rect(surface, (10, 20, 30), bar_rect, border_radius=3)
+            hp_percent = max(0, enemy.hp) / enemy.max_hp if enemy.max_hp > 0 else 0
+            if hp_percent > 0:
+                pygame.draw.rect(surface, (255, 100, 100), (bar_rect.x, bar_rect.y, int(bar_rect.width * hp_percent), bar_rect.height), border_radius=3)
     def _draw_base_character_panel(self, surface, char, rect):
         ui_elements = {'talents': [], 'buffs': []}
         pygame.draw.rect(surface, (25, 30, 50, 220), rect, border_radius=15)
@@ -363,7 +411,7 @@ class CombatScreen(BaseState):
                     surface.blit(sep_surf, (x, rect.top + y_offset)); x += sep_surf.get_width()
         return ui_elements
     def _draw_animated_hp_bars(self, surface, player_rect, enemy_rect):
-        for panel_rect, char, char_type in [(player_rect, self.game.player, 'player'), (enemy_rect, self.enemy, 'enemy')]:
+        for panel_rect, char, char_type in [(player_rect, self.player, 'player'), (enemy_rect, self.enemy, 'enemy')]:
             hp_rect = pygame.Rect(panel_rect.x + 20, panel_rect.y + 80, panel_rect.width - 40, 30)
             pygame.draw.rect(surface, (10, 20, 30), hp_rect, border_radius=8)
             max_hp = char.max_hp if char.max_hp > 0 else 1
@@ -407,7 +455,8 @@ class CombatScreen(BaseState):
         line_y = estimated_rect.bottom + 10
         pygame.draw.line(surface, (70, 80, 100), (action_rect.x + 20, line_y), (action_rect.right - 20, line_y), 2)
         content_rect = pygame.Rect(action_rect.x + 15, line_y + 15, action_rect.width - 30, action_rect.height - 80) 
-        content_text = "🎯 自动战斗中...\n\n⏸️ 按P键暂停\n\n💡 技能系统开发中"
+        if self.replay is not None: content_text = "📼 战斗回放中...\n\n⏸️ 按P键暂停\n\n⏩ 右上角切换速度，ESC退出"
+        else: content_text = "🎯 自动战斗中...\n\n⏸️ 按P键暂停\n\n📋 按L键过滤日志"
         self._draw_wrapped_text(surface, content_text, self._get_font('small', 14), (200, 200, 200), content_rect)
     def _draw_wrapped_text(self, surface, text, font, color, rect):
         lines = text.split('\n'); line_height = font.get_height() + 3; y_offset = rect.y
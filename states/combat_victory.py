@@ -8,15 +8,18 @@ import Equips
 from .base import BaseState
 from ui import draw_character_panel, Button, draw_text_with_outline
 from settings import *
+from rng import LOOT
 
 class CombatVictoryScreen(BaseState):
     """现代化战斗胜利界面 - 具备庆祝动画和视觉特效"""
     
 # states/combat_victory.py (替换 __init__ 函数)
 
-    def __init__(self, game, final_enemy, next_story_stage=None):
+    def __init__(self, game, final_enemy, next_story_stage=None, defeated_enemies=None):
         super().__init__(game)
         self.final_enemy = final_enemy
+        # 遭遇战一次击败的所有敌人，奖励逐个结算；1v1 时只有 final_enemy
+        self.defeated_enemies = list(defeated_enemies) if defeated_enemies else [final_enemy]
         self.next_story_stage = next_story_stage # <-- 传递剧情信息
 
         # --- 动画与状态变量 ---
@@ -83,8 +86,7 @@ class CombatVictoryScreen(BaseState):
         self.level_up_events = [] # <-- 新增：用来存储升级信息的列表
 
         # --- 经验值结算 ---
-        enemy_preset = self.game.enemy_data.get(self.final_enemy.id, {})
-        exp_gain = enemy_preset.get("exp_reward", 0)
+        exp_gain = sum(self.game.enemy_data.get(enemy.id, {}).get("exp_reward", 0) for enemy in self.defeated_enemies)
 
         # 在这里，我们先记录旧的等级和经验信息，用于动画
         self.exp_start_percent = self.game.player.exp / self.game.player.exp_to_next_level
@@ -113,39 +115,39 @@ class CombatVictoryScreen(BaseState):
 
     def _generate_loot(self):
         # 这个函数几乎可以原封不动地从 loot.py 复制过来
+        rng = self.game.rng.stream(LOOT)  # 掉落只用本局的掉落流，动画粒子仍用全局 random
         messages = []
         found_any_loot = False
 
         # Part 1: 装备掉落
-        equipment_drops = self.game.loot_data.get(self.final_enemy.id, [])
-        if equipment_drops:
+        dropped_names = self.game.loot_samplers.roll_drops([enemy.id for enemy in self.defeated_enemies], rng)
+        if dropped_names:
             equipment_header_added = False
-            for drop_info in equipment_drops:
-                if random.random() < drop_info.get("chance", 1.0):
-                    if not equipment_header_added:
-                        messages.append("--- 战利品 ---")
-                        equipment_header_added = True
-                    found_any_loot = True
-                    item_class_name = drop_info["item_class_name"]
-                    try:
-                        item_class = getattr(Equips, item_class_name)
-                        new_item = item_class()
-                        display_name = getattr(new_item, 'display_name', item_class_name)
-                        # 我们不再直接打印 feedback，而是格式化后加入列表
-                        feedback = self.game.player.pickup_item(new_item)
-                        if "放入你的背包" in feedback:
-                            messages.append(f"获得了装备：{display_name}！")
-                        else:
-                            messages.append(feedback) # 处理转化为金币的情况
-                    except AttributeError:
-                        messages.append(f"错误：未找到物品 {item_class_name}。")
+            for item_class_name in dropped_names:
+                if not equipment_header_added:
+                    messages.append("--- 战利品 ---")
+                    equipment_header_added = True
+                found_any_loot = True
+                try:
+                    item_class = getattr(Equips, item_class_name)
+                    new_item = item_class()
+                    display_name = getattr(new_item, 'display_name', item_class_name)
+                    # 我们不再直接打印 feedback，而是格式化后加入列表
+                    feedback = self.game.player.pickup_item(new_item)
+                    if "放入你的背包" in feedback:
+                        messages.append(f"获得了装备：{display_name}！")
+                    else:
+                        messages.append(feedback) # 处理转化为金币的情况
+                except AttributeError:
+                    messages.append(f"错误：未找到物品 {item_class_name}。")
 
         # Part 2: 天赋掉落
         import Talents
-        if self.final_enemy.equipped_talents:
+        enemy_talents = [t for enemy in self.defeated_enemies for t in enemy.equipped_talents]
+        if enemy_talents:
             talent_header_added = False
-            for possessed_talent in self.final_enemy.equipped_talents:
-                if possessed_talent and random.random() < 0.15: # 15% 掉落率
+            for possessed_talent in enemy_talents:
+                if possessed_talent and rng.random() < 0.15: # 15% 掉落率
                     was_new = self.game.player.learn_talent(possessed_talent)
                     if was_new:
                         if not talent_header_added:
@@ -205,7 +207,7 @@ class CombatVictoryScreen(BaseState):
         """进入战利品界面"""
         from .loot import LootScreen
         self.game.state_stack.pop()
-        self.game.state_stack.append(LootScreen(self.game, self.final_enemy))
+        self.game.state_stack.append(LootScreen(self.game, self.final_enemy, defeated_enemies=self.defeated_enemies))
 
     def update(self, dt=0):
         """更新所有动画"""
@@ -549,7 +551,7 @@ class CombatVictoryScreen(BaseState):
         """绘制胜利统计"""
         font = self._get_font('normal', 18)
         stats = [
-            f"🎯 击败了强敌：{self.final_enemy.name}",
+            f"🎯 击败了强敌：{'、'.join(enemy.name for enemy in self.defeated_enemies)}",
             f"⚔️ 剩余生命值：{int(self.game.player.hp)}/{int(self.game.player.max_hp)}",
             f"💰 即将获得丰厚奖励！",
             f"🌟 经验值和装备等你收集"
@@ -3,18 +3,19 @@
 import pygame
 import math
 import random
-import inspect
 from .base import BaseState
-import dungeon_generator
 from player_sprite import Player
 from monster_sprite import Monster
+from monster_activity import MonsterActivity
 from treasure_sprite import TreasureChest
 from portal_sprite import PortalSprite
 from camera import Camera
-import Equips
 from settings import *
 from ui import ModernStoryButton, draw_text
 from door_sprite import Door
+from dungeon_layout import FloorLayout
+from floor_prefetch import prepare_floor
+from rng import DUNGEON, EVENTS, LOOT
 
 NODE_STYLE = {
     "start": {"color": (100, 255, 100), "name": "起始"}, "combat": {"color": (200, 200, 200), "name": "战斗"}, 
@@ -25,24 +26,29 @@ NODE_STYLE = {
 }
 
 class DungeonScreen(BaseState):
-    def __init__(self, game, dungeon_id="sunstone_ruins", floor_number=1):
+    def __init__(self, game, dungeon_id="sunstone_ruins", floor_number=1, saved_state=None):
+        """saved_state 为 save_state() 的结果：读档时按它恢复这一层的清空进度和玩家位置。"""
         super().__init__(game)
         self.dungeon_id = dungeon_id
         self.floor_number = floor_number
         self.dungeon_data = self.game.dungeon_data.get(dungeon_id, {})
-        self.current_floor_data = next((pool for pool in self.dungeon_data.get("floor_pools", []) if floor_number in pool["floors"]), {})
-        
-        self.impassable_sprites = pygame.sprite.Group()
+        self.current_floor_data = self._floor_data(floor_number) or {}
 
-        # 1. 生成地牢的静态部分（墙壁、地板、门）
-        self.all_sprites, self.wall_sprites, self.door_sprites, self.logical_rooms, self.start_room = \
-            dungeon_generator.generate_new_dungeon_floor(num_rooms=10, floor_data=self.current_floor_data, impassable_group_for_doors=self.impassable_sprites)
-        
-        self.impassable_sprites.add(self.wall_sprites)
+        # 1. 布局、墙壁、门和烘焙好的静态图层；进入首领房间时已经在后台准备过的话直接拿来用
+        if saved_state:
+            floor = prepare_floor(dungeon_id, floor_number, self.current_floor_data, None, layout=FloorLayout.from_data(saved_state["layout"]))
+        else:
+            floor = self.game.floor_prefetcher.take(self.game.rng, dungeon_id, floor_number, self.current_floor_data)
+        self.layout = floor.layout
+        self.logical_rooms, self.start_room = self.layout.rooms, self.layout.start_room
+        self.all_sprites, self.wall_sprites, self.door_sprites = floor.all_sprites, floor.wall_sprites, floor.door_sprites
+        self.impassable_sprites = floor.impassable_sprites  # 墙和关着的门；门开关时自己加入 / 移出
+        self.static_layer, self.room_doors = floor.static_layer, floor.room_doors
 
         # 2. 初始化玩家
-        start_pos = self.start_room.world_rect.center
+        start_pos = saved_state["player_pos"] if saved_state else self.start_room.world_rect.center
         self.player_sprite = Player(start_pos[0], start_pos[1])
+        self.player_group = pygame.sprite.GroupSingle(self.player_sprite)
         self.all_sprites.add(self.player_sprite)
         
         # 3. 初始化摄像机
@@ -50,16 +56,22 @@ class DungeonScreen(BaseState):
         
         # 4. 初始化空的动态精灵组
         self.monster_sprites = pygame.sprite.Group()
+        self.room_monsters = {}     # 房间 -> 该房间怪物精灵的组（怪物被击败 kill() 后自动移出）
+        self.monster_by_uid = {}
         self.treasure_sprites = pygame.sprite.Group()
         self.portal_sprites = pygame.sprite.Group()
         
         ### --- 核心修改：在这里一次性生成本层所有的动态内容 --- ###
         print("正在预生成本层所有房间内容...")
+        monster_rng = self.game.rng.derive(DUNGEON, dungeon_id, floor_number, "monsters")  # 怪物游荡只由 run seed 和层号决定
         for room in self.logical_rooms:
             if not room.is_cleared:
                 # 为每个未清空的房间生成怪物
                 for m_data in room.monsters:
-                    self.monster_sprites.add(Monster(m_data, room.world_rect))
+                    monster = Monster(m_data, room.world_rect, monster_rng)
+                    self.monster_sprites.add(monster)
+                    self.room_monsters.setdefault(room, pygame.sprite.Group()).add(monster)
+                    self.monster_by_uid[monster.uid] = monster
                 
                 # 如果是宝藏房，生成宝箱
                 if room.type == "treasure":
@@ -71,6 +83,7 @@ class DungeonScreen(BaseState):
         
         # 将所有新生成的动态精灵一次性加入总绘制组
         self.all_sprites.add(self.monster_sprites, self.treasure_sprites, self.portal_sprites)
+        self.monster_activity = MonsterActivity(self.layout, self.room_monsters)
         print("内容生成完毕！")
         
         # 5. 初始化状态和UI
@@ -80,8 +93,13 @@ class DungeonScreen(BaseState):
         self.minimap_glow = 0.0
         self._create_ui_buttons()
         
-        # 6. 手动触发一次“进入起始房间”的逻辑（现在只负责关门和特殊事件）
-        self._on_enter_room(self.start_room)
+        # 6. 手动触发一次“进入起始房间”的逻辑（现在只负责关门和特殊事件）；读档时进入玩家所在的房间
+        self._on_enter_room(self.layout.room_at(*start_pos) or self.start_room)
+
+    def save_state(self):
+        """这一层的存档数据：布局连同各房间的清空进度、剩下的怪物，以及玩家的位置。都是可以 pickle 的纯数据。"""
+        return {"dungeon_id": self.dungeon_id, "floor_number": self.floor_number,
+                "layout": self.layout.to_data(), "player_pos": self.player_sprite.rect.center}
 
     def _on_enter_room(self, new_room):
         """当玩家进入一个新房间时触发。"""
@@ -96,6 +114,25 @@ class DungeonScreen(BaseState):
             self.pending_lockdown_room = new_room
         
         self._handle_special_room_entry()
+        # 走进首领房间就开始在后台准备下一层，打完首领走进传送门时几乎不用等
+        if new_room.type == "boss":
+            next_floor_data = self._floor_data(self.floor_number + 1)
+            if next_floor_data is not None:
+                self.game.floor_prefetcher.prefetch(self.game.rng, self.dungeon_id, self.floor_number + 1, next_floor_data)
+
+    def _floor_data(self, floor_number):
+        """第 floor_number 层的配置；这个地牢没有这一层时返回 None。"""
+        return next((pool for pool in self.dungeon_data.get("floor_pools", []) if floor_number in pool["floors"]), None)
+
+    def _enter_next_floor(self):
+        """走进传送门：换成下一层的地牢界面；已经是最后一层就回到标题画面。"""
+        if self._floor_data(self.floor_number + 1) is None:
+            from .title import TitleScreen
+            print(f"{self.dungeon_data.get('name', self.dungeon_id)} 已通关!")
+            self.game.state_stack = [TitleScreen(self.game)]
+            return
+        print(f"进入第 {self.floor_number + 1} 层...")
+        self.game.state_stack[-1] = DungeonScreen(self.game, self.dungeon_id, self.floor_number + 1)
         
     # ... (其他所有函数，如 update, draw, on_monster_defeated 等，都保持不变) ...
     def handle_event(self, event):
@@ -121,9 +158,10 @@ class DungeonScreen(BaseState):
 
         self.player_sprite.update(self.impassable_sprites)
         self.camera.update(self.player_sprite)
-        self.monster_sprites.update(self.wall_sprites, dt_sec)
-        
         self._check_current_room()
+        # 只有玩家附近（和镜头里）的怪物跑完整的 AI，其余的睡着，醒来时再粗略补上
+        self.monster_activity.focus(self.current_room, self.camera.view_rect)
+        self.monster_activity.update(self.wall_sprites, dt_sec)
         if self.pending_lockdown_room:
             self._check_and_trigger_lockdown()
         self._check_interactions()
@@ -132,13 +170,24 @@ class DungeonScreen(BaseState):
         surface.fill((10, 15, 25))
         view_surf = surface.subsurface(pygame.Rect(DUNGEON_VIEW_X, DUNGEON_VIEW_Y, DUNGEON_VIEW_WIDTH, DUNGEON_VIEW_HEIGHT))
         view_surf.fill((10, 15, 25))
-        for sprite in self.all_sprites: view_surf.blit(sprite.image, self.camera.apply(sprite.rect))
+        self.static_layer.draw(view_surf, self.camera)
+        # 动态部分按原来的叠放顺序画，只画镜头里的；打开的门是透明的，不用画
+        # 门都在自己房间的矩形里、怪物只在自己的房间里活动，只需看镜头覆盖的那几个房间
+        view_rect = self.camera.view_rect
+        visible_rooms = self.layout.rooms_touching(view_rect)
+        for room in visible_rooms:
+            for sprite in self.room_doors.get(room, ()):
+                if sprite.is_closed and sprite.rect.colliderect(view_rect): view_surf.blit(sprite.image, self.camera.apply(sprite.rect))
+        visible_monsters = [m for room in visible_rooms for m in self.room_monsters.get(room, ())]
+        for group in (self.player_group, visible_monsters, self.treasure_sprites, self.portal_sprites):
+            for sprite in group:
+                if sprite.rect.colliderect(view_rect): view_surf.blit(sprite.image, self.camera.apply(sprite.rect))
         self._draw_ui_panel(surface)
     def _check_current_room(self):
-        colliding_rooms = [r for r in self.logical_rooms if r.world_rect.colliderect(self.player_sprite.rect)]
+        colliding_rooms = self.layout.rooms_touching(self.player_sprite.rect)
         if colliding_rooms and colliding_rooms[0] is not self.current_room: self._on_enter_room(colliding_rooms[0])
     def _check_and_trigger_lockdown(self):
-        room_doors = [d for d in self.door_sprites if self.pending_lockdown_room.world_rect.collidepoint(d.rect.center)]
+        room_doors = self.room_doors.get(self.pending_lockdown_room, ())
         is_player_clear_of_doors = not any(self.player_sprite.rect.colliderect(d.rect) for d in room_doors)
         if is_player_clear_of_doors:
             print(f"玩家已进入房间 {self.pending_lockdown_room.x}, {self.pending_lockdown_room.y}，正在关门...")
@@ -146,21 +195,33 @@ class DungeonScreen(BaseState):
             self.pending_lockdown_room = None
     def on_monster_defeated(self, monster_uid):
         self.current_room.monsters = [m for m in self.current_room.monsters if m['uid'] != monster_uid]
-        for monster in self.monster_sprites:
-            if monster.uid == monster_uid: monster.kill()
+        monster = self.monster_by_uid.pop(monster_uid, None)
+        if monster is not None: monster.kill()
         if not self.current_room.monsters and self.current_room.type in ["combat", "elite", "boss"]:
             self.current_room.is_cleared = True
             print(f"房间 {self.current_room.x}, {self.current_room.y} 已清空! 正在开门...")
-            for door in self.door_sprites:
-                if self.current_room.world_rect.collidepoint(door.rect.center): door.open()
+            for door in self.room_doors.get(self.current_room, ()): door.open()
+            if self.current_room.type == "boss":
+                # 首领倒下，房间中央出现通往下一层的传送门
+                portal = PortalSprite(*self.current_room.world_rect.center)
+                self.portal_sprites.add(portal); self.all_sprites.add(portal)
     def _check_interactions(self):
         if not self.current_room.is_cleared:
-            collided_monster = pygame.sprite.spritecollideany(self.player_sprite, self.monster_sprites)
+            # 怪物不会离开自己的房间，只看玩家碰到的那几个格子里的怪物
+            collided_monster = None
+            for room in self.layout.rooms_touching(self.player_sprite.rect):
+                collided_monster = pygame.sprite.spritecollideany(self.player_sprite, self.room_monsters.get(room, ()))
+                if collided_monster: break
             if collided_monster:
+                # 碰到房间里任意一只怪物，就和整个房间的怪物打一场遭遇战：只建一次战斗、胜利后只存一次档
                 from .combat import CombatScreen
-                self.game.state_stack.append(CombatScreen(self.game, collided_monster.enemy_id, collided_monster.uid)); self.is_returning = True; return
+                group = self.current_room.monsters if any(m['uid'] == collided_monster.uid for m in self.current_room.monsters) \
+                    else [{'id': collided_monster.enemy_id, 'uid': collided_monster.uid}]
+                self.game.state_stack.append(CombatScreen(self.game, [m['id'] for m in group], [m['uid'] for m in group])); self.is_returning = True; return
             collided_treasure = pygame.sprite.spritecollideany(self.player_sprite, self.treasure_sprites)
             if collided_treasure: self._open_treasure_chest(collided_treasure)
+        elif pygame.sprite.spritecollideany(self.player_sprite, self.portal_sprites):
+            self._enter_next_floor()
     def _get_font(self, font_name, default_size=20):
         try: return self.game.fonts[font_name]
         except (AttributeError, KeyError): return pygame.font.Font(None, default_size)
@@ -186,20 +247,20 @@ class DungeonScreen(BaseState):
         if room_type == "event":
             from .event_screen import EventScreen
             if self.game.event_data:
-                event_id = random.choice(list(self.game.event_data.keys()))
+                event_id = self.game.rng.stream(EVENTS).choice(list(self.game.event_data.keys()))
                 self.game.state_stack.append(EventScreen(self.game, event_id, self.current_room)); sub_screen_opened = True
         elif room_type == "shop":
             from .shop_screen import ShopScreen
-            self.game.state_stack.append(ShopScreen(self.game, self.current_room)); sub_screen_opened = True
+            self.game.state_stack.append(ShopScreen(self.game, self.current_room, self.dungeon_id, self.floor_number)); sub_screen_opened = True
         elif room_type == "rest":
             from .rest_screen import RestScreen
             self.game.state_stack.append(RestScreen(self.game, self.current_room)); sub_screen_opened = True
         if sub_screen_opened: self.is_returning = True
     def _open_treasure_chest(self, chest_sprite):
-        loot_config = self.current_floor_data.get("treasure_loot", {}); item_count = loot_config.get("item_count", 2)
-        all_items = [cls for name, cls in inspect.getmembers(Equips, inspect.isclass) if issubclass(cls, Equips.Equipment) and cls is not Equips.Equipment and cls is not Equips.DragonHeart]
-        if all_items:
-            choices = [random.choice(all_items)() for _ in range(item_count)]
+        sampler = self.game.loot_samplers.treasure(self.dungeon_id, self.floor_number)
+        if sampler.table:
+            rng = self.game.rng.stream(LOOT)
+            choices = [cls() for cls in sampler.draw_many(rng, sampler.item_count)]
             from .choice_screen import ChoiceScreen
             self.game.state_stack.append(ChoiceScreen(self.game, choices, self.current_room)); self.is_returning = True
         chest_sprite.kill()
@@ -5,6 +5,7 @@ from .base import BaseState
 from ui import Button, draw_panel, draw_text
 from settings import *
 import Talents # 导入天赋模块
+from rng import EVENTS
 
 class EventScreen(BaseState):
     def __init__(self, game, event_id, origin_room):
@@ -54,7 +55,7 @@ class EventScreen(BaseState):
         choice_data = self.event_data["choices"][choice_index]
         outcomes = choice_data["outcomes"]
         
-        rand_val = random.random()
+        rand_val = self.game.rng.stream(EVENTS).random()
         cumulative_chance = 0.0
         selected_outcome = None
         for outcome in outcomes:
@@ -74,12 +75,13 @@ class EventScreen(BaseState):
                 player.hp = player.max_hp
         
         elif outcome_type == "WEAPON_UPGRADE":
-            player.base_attack += 5
-            player.attack += 5
+            player.add_modifier("base_attack", object(), flat=5, label="武器强化")
+            player.recalculate_stats()
         
         elif outcome_type == "WEAPON_CURSE":
-            player.base_attack = max(1, player.base_attack - 3)
-            player.attack = max(1, player.attack - 3)
+            # 与原先一样，装备攻击最低保留 1 点
+            player.add_modifier("base_attack", object(), flat=-min(3, max(0, player.base_attack - 1)), label="武器诅咒")
+            player.recalculate_stats()
             
         # --- 核心修复：使用新的天赋学习和装备逻辑 ---
         elif outcome_type == "GAIN_TALENT":
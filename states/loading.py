@@ -26,6 +26,7 @@ class LoadScreen(BaseState):
                         from states.story import StoryScreen
                         # 清空整个状态栈，然后压入一个新的、基于已加载数据的 StoryScreen
                         self.game.state_stack = [StoryScreen(self.game)]
+                        self.game.resume_dungeon()
                     else:
                         self.load_fail_message = f"槽位 {i} 为空或损坏！"
                     return
@@ -5,10 +5,11 @@ from .base import BaseState
 from ui import draw_panel, draw_text
 from settings import *
 import Equips
+from rng import LOOT
 from Character import Character # 需要导入Character类用于类型检查
 
 class LootScreen(BaseState):
-    def __init__(self, game, defeated_enemy_object=None, next_story_stage=None):
+    def __init__(self, game, defeated_enemy_object=None, next_story_stage=None, defeated_enemies=None):
         super().__init__(game)
         self.is_overlay = True
 
@@ -17,6 +18,8 @@ class LootScreen(BaseState):
         self.defeated_enemy_object = defeated_enemy_object
         # 我们仍然需要 enemy_id 来查询装备掉落表
         self.defeated_enemy_id = defeated_enemy_object.id if isinstance(defeated_enemy_object, Character) else None
+        # 遭遇战一次击败的所有敌人；1v1 时只有 defeated_enemy_object（开宝箱时为空）
+        self.defeated_enemies = list(defeated_enemies) if defeated_enemies else ([defeated_enemy_object] if self.defeated_enemy_id else [])
 
         self.next_story_stage = next_story_stage
 
@@ -32,8 +35,8 @@ class LootScreen(BaseState):
     def _process_rewards(self):
         self.exp_messages = []
         if self.defeated_enemy_id:
-            enemy_preset = self.game.enemy_data.get(self.defeated_enemy_id, {})
-            self.exp_messages = self.game.player.add_exp(enemy_preset.get("exp_reward", 0))
+            exp_gain = sum(self.game.enemy_data.get(enemy.id, {}).get("exp_reward", 0) for enemy in self.defeated_enemies)
+            self.exp_messages = self.game.player.add_exp(exp_gain)
         
         self.loot_messages = self._generate_loot()
         self.game.save_to_slot(0)
@@ -43,42 +46,42 @@ class LootScreen(BaseState):
     # 文件: states/loot.py (替换这个函数)
 
     def _generate_loot(self):
+        rng = self.game.rng.stream(LOOT)
         messages = []
         found_any_loot = False
         
         # --- Part 1: 装备掉落逻辑 ---
         if self.defeated_enemy_id:
-            equipment_drops = self.game.loot_data.get(self.defeated_enemy_id, [])
-            if equipment_drops:
+            dropped_names = self.game.loot_samplers.roll_drops([enemy.id for enemy in self.defeated_enemies], rng)
+            if dropped_names:
                 equipment_header_added = False
-                for drop_info in equipment_drops:
-                    if random.random() < drop_info.get("chance", 1.0):
-                        if not equipment_header_added:
-                            messages.append("--- 战利品 ---")
-                            equipment_header_added = True
-                        
-                        found_any_loot = True
-                        item_class_name = drop_info["item_class_name"]
-                        try:
-                            item_class = getattr(Equips, item_class_name)
-                            new_item = item_class()
-                            display_name = getattr(new_item, 'display_name', item_class_name)
-                            feedback = self.game.player.pickup_item(new_item)
-                            if "放入你的背包" in feedback:
-                                messages.append(f"获得了装备：{display_name}！")
-                            else:
-                                messages.append(feedback)
-                        except AttributeError:
-                            messages.append(f"错误：未找到物品 {item_class_name}。")
+                for item_class_name in dropped_names:
+                    if not equipment_header_added:
+                        messages.append("--- 战利品 ---")
+                        equipment_header_added = True
+                    
+                    found_any_loot = True
+                    try:
+                        item_class = getattr(Equips, item_class_name)
+                        new_item = item_class()
+                        display_name = getattr(new_item, 'display_name', item_class_name)
+                        feedback = self.game.player.pickup_item(new_item)
+                        if "放入你的背包" in feedback:
+                            messages.append(f"获得了装备：{display_name}！")
+                        else:
+                            messages.append(feedback)
+                    except AttributeError:
+                        messages.append(f"错误：未找到物品 {item_class_name}。")
 
         # --- Part 2: 天赋掉落逻辑 ---
         import Talents
-        if self.defeated_enemy_object and self.defeated_enemy_object.equipped_talents:
+        enemy_talents = [t for enemy in self.defeated_enemies for t in enemy.equipped_talents]
+        if enemy_talents:
             talent_header_added = False
-            for possessed_talent in self.defeated_enemy_object.equipped_talents:
+            for possessed_talent in enemy_talents:
                 
                 # --- 核心修复：在处理前，先确保这个槽位里的天赋不是空的 (None) ---
-                if possessed_talent and random.random() < 0.15: # 15% 的掉落率
+                if possessed_talent and rng.random() < 0.15: # 15% 的掉落率
                     was_new = self.game.player.learn_talent(possessed_talent)
                     if was_new:
                         if not talent_header_added:
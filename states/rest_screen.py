@@ -5,6 +5,7 @@ import random
 from .base import BaseState
 from ui import Button, draw_panel, draw_text
 from settings import *
+from rng import LOOT
 
 class RestScreen(BaseState):
 
@@ -78,7 +79,7 @@ class RestScreen(BaseState):
             player = self.game.player
 
             # 1. 从可升级列表中随机选一件 (现在这个列表包含了背包物品)
-            item_to_upgrade = random.choice(self.upgradable_items)
+            item_to_upgrade = self.game.rng.stream(LOOT).choice(self.upgradable_items)
             item_name = getattr(item_to_upgrade, 'display_name', '装备')
 
             from Equips import UPGRADE_MAP
@@ -1,13 +1,12 @@
 # 文件: states/sandbox_screen.py (新文件)
 
 import pygame
-import inspect
+import threading
 from .base import BaseState
 from ui import Button, draw_panel, draw_text
 from settings import *
 from Character import Character
-import Equips
-import Talents
+from content_registry import ITEMS, TALENTS
 
 class SandboxScreen(BaseState):
 # 文件: states/sandbox_screen.py (替换这个函数)
@@ -22,18 +21,26 @@ class SandboxScreen(BaseState):
         )
         
         # 2. 解锁所有装备到背包
-        all_equipment_classes = [cls for name, cls in inspect.getmembers(Equips, inspect.isclass) if issubclass(cls, Equips.Equipment) and cls is not Equips.Equipment]
-        for eq_class in all_equipment_classes:
-            self.sandbox_player.backpack.append(eq_class())
-            
-        # 3. 解锁所有天赋
-        all_talent_classes = [cls for name, cls in inspect.getmembers(Talents, inspect.isclass) if issubclass(cls, Talents.Talent) and cls is not Talents.Talent]
-        for talent_class in all_talent_classes:
-            self.sandbox_player.learn_talent(talent_class())
+        with self.sandbox_player.batch_loadout():  # 一次性解锁全部内容，不逐条打印、不逐条重算
+            for eq_class in ITEMS.classes:
+                self.sandbox_player.backpack.append(eq_class())
+
+            # 3. 解锁所有天赋
+            for talent_class in TALENTS.classes:
+                self.sandbox_player.learn_talent(talent_class())
+        self.sandbox_player.invalidate_hooks("items")
 
         # 4. 设置UI
         self.enemy_ids = list(self.game.enemy_data.keys())
         self.selected_enemy_index = 0
+
+        # 自动配装的目标：(地牢 id, 层数)，每个楼层配置取第一层作为代表
+        self.optimize_targets = [(dungeon_id, pool["floors"][0]) for dungeon_id, dungeon in self.game.dungeon_data.items()
+                                 for pool in dungeon.get("floor_pools", []) if pool.get("floors")]
+        self.selected_target_index = 0
+        self.optimizer = None          # 正在运行的 build_optimizer.BuildOptimizer
+        self.optimizer_results = None  # 后台线程写入的结果
+        self.optimizer_status = ""
         
         self._setup_ui()
 
@@ -51,11 +58,16 @@ class SandboxScreen(BaseState):
         # --- 新增结束 ---
 
         self.start_combat_button = Button((100, 450, 300, 80), "开始战斗", self.game.fonts['large'])
+        self.replay_button = Button((100, 560, 300, 60), "回放上一场战斗", self.game.fonts['normal'])
         self.back_button = Button((20, 20, 100, 50), "返回", self.game.fonts['small'])
 
         # 敌人选择器
         self.prev_enemy_button = Button((SCREEN_WIDTH - 450, 250, 50, 50), "<", self.game.fonts['normal'])
         self.next_enemy_button = Button((SCREEN_WIDTH - 100, 250, 50, 50), ">", self.game.fonts['normal'])
+
+        # 自动配装
+        self.target_button = Button((SCREEN_WIDTH - 450, 400, 400, 50), self._target_label(), self.game.fonts['small'])
+        self.optimize_button = Button((SCREEN_WIDTH - 450, 470, 400, 60), "自动配装", self.game.fonts['normal'])
         
     def handle_event(self, event):
         from .backpack import BackpackScreen
@@ -65,6 +77,8 @@ class SandboxScreen(BaseState):
         if self.back_button.handle_event(event):
             self.game.state_stack.pop()
             return
+
+        if self.optimizer is not None: return  # 自动配装进行中，结果要换回这个角色，期间不允许改动它
             
         if self.backpack_button.handle_event(event):
             self.game.state_stack.append(BackpackScreen(self.game, player_override=self.sandbox_player))
@@ -90,6 +104,15 @@ class SandboxScreen(BaseState):
         if self.next_enemy_button.handle_event(event):
             self.selected_enemy_index = (self.selected_enemy_index + 1) % len(self.enemy_ids)
 
+        if self.optimize_targets:
+            if self.target_button.handle_event(event):
+                self.selected_target_index = (self.selected_target_index + 1) % len(self.optimize_targets)
+                self.target_button.text = self._target_label()
+                return
+            if self.optimize_button.handle_event(event):
+                self._start_optimizer()
+                return
+
         if self.start_combat_button.handle_event(event):
             original_player = self.game.player
             self.game.player = self.sandbox_player
@@ -97,6 +120,49 @@ class SandboxScreen(BaseState):
             self.game.state_stack.append(CombatScreen(self.game, selected_enemy_id))
             return
 
+        if self.replay_button.handle_event(event):
+            from replay import list_replays, load_replay
+            replays = list_replays()
+            if not replays:
+                print("还没有任何战斗回放")
+                return
+            replay = load_replay(replays[0])
+            self.game.state_stack.append(CombatScreen(self.game, replay.enemy_id, replay=replay))
+            return
+
+    def _target_label(self):
+        if not self.optimize_targets: return "没有可用的地牢"
+        dungeon_id, floor = self.optimize_targets[self.selected_target_index]
+        return f"目标: {self.game.dungeon_data[dungeon_id].get('name', dungeon_id)} 第{floor}层"
+
+    def _start_optimizer(self):
+        """在后台线程里为沙盒角色搜索配装，界面不卡住；结果在 update 里应用。"""
+        from build_optimizer import BuildOptimizer, floor_enemy_groups
+        dungeon_id, floor = self.optimize_targets[self.selected_target_index]
+        groups = floor_enemy_groups(self.game.dungeon_data[dungeon_id], floor)
+        self.optimizer = BuildOptimizer(self.sandbox_player, groups, self.game.enemy_data)
+        self.optimizer_results = None
+        self.optimizer_status = "正在估算配装..."
+
+        def progress(round_index, candidates, fights):
+            self.optimizer_status = f"模拟第 {round_index + 1} 轮：{candidates} 个候选，每个敌人 {fights} 场"
+
+        def worker():
+            try: self.optimizer_results = self.optimizer.run(budget=1500, finalists=8, fights=4, progress=progress)
+            except Exception as e: self.optimizer_results = e
+        threading.Thread(target=worker, daemon=True).start()
+
+    def update(self):
+        if self.optimizer is None or self.optimizer_results is None: return
+        results, optimizer = self.optimizer_results, self.optimizer
+        self.optimizer = self.optimizer_results = None
+        if isinstance(results, Exception):
+            self.optimizer_status = f"自动配装失败: {results}"
+            return
+        best = results[0]
+        optimizer.apply(self.sandbox_player, best["loadout"])
+        self.optimizer_status = f"已换上最佳配装，预计胜率 {best['win_rate']:.0%}"
+
     def draw(self, surface):
         surface.fill(BG_COLOR)
         draw_panel(surface, pygame.Rect(50, 50, 400, SCREEN_HEIGHT - 100), "配置角色", self.game.fonts['large'])
@@ -106,9 +172,15 @@ class SandboxScreen(BaseState):
         self.backpack_button.draw(surface)
         self.talents_button.draw(surface)
         self.start_combat_button.draw(surface)
+        self.replay_button.draw(surface)
         self.back_button.draw(surface)
         self.prev_enemy_button.draw(surface)
         self.next_enemy_button.draw(surface)
+        self.target_button.draw(surface)
+        self.optimize_button.draw(surface)
+        if self.optimizer_status:
+            status_rect = pygame.Rect(SCREEN_WIDTH - 450, 540, 400, 60)
+            draw_text(surface, self.optimizer_status, self.game.fonts['small'], TEXT_COLOR, status_rect)
         
         # --- 新增：绘制等级控制器 ---
         self.level_up_button.draw(surface)
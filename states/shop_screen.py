@@ -6,15 +6,16 @@ import inspect
 from .base import BaseState
 from ui import Button, TooltipManager
 from settings import *
-import Equips
+from rng import SHOP
 
 RARITY_PRICES = {"common": 50, "uncommon": 100, "rare": 250, "epic": 500, "legendary": 1000}
 
 class ShopScreen(BaseState):
-    def __init__(self, game, origin_room):
+    def __init__(self, game, origin_room, dungeon_id=None, floor_number=None):
         super().__init__(game)
         self.is_overlay = True
         self.origin_room = origin_room
+        self.dungeon_id, self.floor_number = dungeon_id, floor_number  # 决定用哪一层的商品配置
         self.shop_items = []
         self.feedback_message = ""
         self.feedback_timer = 0
@@ -42,19 +43,16 @@ class ShopScreen(BaseState):
 
     def _generate_inventory(self):
         """生成商店物品"""
-        all_item_classes = [getattr(Equips, name) for name in dir(Equips) 
-                           if isinstance(getattr(Equips, name), type) 
-                           and issubclass(getattr(Equips, name), Equips.Equipment) 
-                           and getattr(Equips, name) is not Equips.Equipment]
-        
-        choices = random.sample(all_item_classes, min(4, len(all_item_classes)))  # 增加到4个商品
+        rng = self.game.rng.stream(SHOP)
+        # 按本层配置的 rarity_weights 抽 item_count 件不重复的商品（没有配置时 4 件、各装备等概率）
+        choices = self.game.loot_samplers.shop(self.dungeon_id, self.floor_number).draw_distinct(rng)
         
         for item_class in choices:
             item = item_class()
             rarity = getattr(item, 'rarity', 'common')
             base_price = RARITY_PRICES.get(rarity, 9999)
             # 添加价格波动
-            price_variation = random.uniform(0.8, 1.2)
+            price_variation = rng.uniform(0.8, 1.2)
             price = int(base_price * price_variation)
             self.shop_items.append([None, item, price, False])
 
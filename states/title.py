@@ -74,6 +74,7 @@ class TitleScreen(BaseState):
         elif self.buttons['continue_game'].handle_event(event):
             if self.game.load_from_slot(0):
                 self.game.state_stack.append(StoryScreen(self.game))
+                self.game.resume_dungeon()
             else:
                 self.game.start_new_game()
                 self.game.state_stack.append(StoryScreen(self.game))
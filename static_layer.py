@@ -0,0 +1,44 @@
+# 文件: static_layer.py (新文件)
+"""
+地牢的静态图层：一层地牢里不会动的部分（地板、墙壁）进入楼层时按 CHUNK_SIZE 分块预先画好，
+之后每帧只贴出与镜头相交的那几块，开销只取决于屏幕上有什么，与房间数量无关。
+
+只有真的画了东西的块才会创建（地图大部分是空白）；空白处就是背景色，和以前的画法一致。
+门会开关，不放进静态图层，由地牢界面在上面叠加。
+"""
+import pygame
+
+CHUNK_SIZE = 256
+
+
+class StaticLayer:
+    def __init__(self, sprites, background=(10, 15, 25), chunk_size=CHUNK_SIZE):
+        """sprites 按绘制顺序给出（后画的盖住先画的），每个精灵画进与它相交的所有块。"""
+        self.chunk_size = chunk_size
+        self.chunks = {}  # (块 x, 块 y) -> Surface
+        buckets = {}
+        for sprite in sprites:
+            for key in self._keys_for(sprite.rect):
+                buckets.setdefault(key, []).append(sprite)
+        display = pygame.display.get_surface()  # 有窗口时直接用窗口的像素格式，贴图时不用再转换
+        for (cx, cy), chunk_sprites in buckets.items():
+            chunk = pygame.Surface((chunk_size, chunk_size), 0, display) if display else pygame.Surface((chunk_size, chunk_size))
+            chunk.fill(background)
+            origin_x, origin_y = cx * chunk_size, cy * chunk_size
+            for sprite in chunk_sprites:
+                chunk.blit(sprite.image, (sprite.rect.x - origin_x, sprite.rect.y - origin_y))
+            self.chunks[(cx, cy)] = chunk
+
+    def _keys_for(self, rect):
+        size = self.chunk_size
+        for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+                yield cx, cy
+
+    def draw(self, surface, camera):
+        """把与镜头可见区域相交的块贴到 surface 上（surface 为镜头对应的视图）。"""
+        offset_x, offset_y = camera.camera_rect.topleft
+        size = self.chunk_size
+        for key in self._keys_for(camera.view_rect):
+            chunk = self.chunks.get(key)
+            if chunk is not None: surface.blit(chunk, (key[0] * size + offset_x, key[1] * size + offset_y))
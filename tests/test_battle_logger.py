@@ -0,0 +1,46 @@
+from battle_logger import BattleLogger, DAMAGE, DEBUG, IMPORTANT, INFO, ITEM, SYSTEM
+
+
+class _Sink:
+    def __init__(self): self.records = []
+    def add_record(self, record): self.records.append(record)
+
+
+def _formatter(calls):
+    def format_(text):
+        calls.append(text)
+        return [(text, (255, 255, 255))]
+    return format_
+
+
+def test_records_below_the_level_or_outside_the_categories_are_dropped():
+    logger, sink, calls = BattleLogger(), _Sink(), []
+    logger.register_renderer(sink, min_level=INFO, categories=(DAMAGE, SYSTEM))
+    fmt = _formatter(calls)
+    logger.emit(DAMAGE, DEBUG, fmt, "debug")
+    logger.emit(ITEM, IMPORTANT, fmt, "item")
+    logger.emit(DAMAGE, INFO, fmt, "hit")
+    logger.log("system")
+    assert [record.text for record in sink.records] == ["hit", "system"]
+    assert not logger.enabled(ITEM) and logger.enabled(DAMAGE, IMPORTANT) and not logger.enabled(DAMAGE, DEBUG)
+    logger.set_filter(DEBUG)
+    logger.emit(ITEM, DEBUG, fmt, "all")
+    assert sink.records[-1].text == "all"
+
+
+def test_formatting_is_lazy_and_happens_once():
+    logger, sink, calls = BattleLogger(), _Sink(), []
+    logger.register_renderer(sink)
+    logger.emit(DAMAGE, INFO, _formatter(calls), "hit")
+    assert calls == []  # 显示前不格式化
+    record = sink.records[0]
+    assert record.text == "hit" and record.parts == [("hit", (255, 255, 255))]
+    assert calls == ["hit"]
+
+
+def test_nothing_is_kept_without_a_renderer():
+    logger, sink, calls = BattleLogger(), _Sink(), []
+    logger.register_renderer(sink)
+    logger.unregister_renderer()
+    logger.emit(DAMAGE, IMPORTANT, _formatter(calls), "hit")
+    assert sink.records == [] and calls == [] and not logger.enabled(DAMAGE, IMPORTANT)
@@ -0,0 +1,83 @@
+import contextlib
+import io
+
+import pytest
+
+import Buffs
+from Buffs import Buff, BuffContainer
+from Character import Character
+
+
+class _Early(Buff): priority = 10
+class _Late(Buff): priority = -5
+class _Plain(Buff): pass
+class _AlsoPlain(Buff): pass
+
+
+def _fighter():
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Character("dummy", hp=1000, defense=10, magic_resist=0, attack=10, attack_speed=1.5)
+
+
+def test_iteration_follows_priority_then_insertion_order():
+    plain, late, early, also = _Plain(), _Late(), _Early(), _AlsoPlain()
+    buffs = BuffContainer([plain, late, early, also])
+    assert list(buffs) == [early, plain, also, late]
+    buffs.remove(plain)
+    buffs.add(plain)  # 重新施加排到同优先级的末尾
+    assert list(buffs) == [early, also, plain, late]
+
+
+def test_one_instance_per_class():
+    first, second = _Plain(), _Plain()
+    buffs = BuffContainer([first])
+    assert _Plain in buffs and first in buffs and second not in buffs
+    with pytest.raises(ValueError): buffs.remove(second)
+    assert buffs.get(_Plain) is first and buffs.get(_Early) is None and len(buffs) == 1
+
+
+def test_stacking_merges_into_the_existing_instance():
+    fighter = _fighter()
+    fighter.add_status(Buffs.PoisonDebuff(stacks=2))
+    poison = fighter.buffs.get(Buffs.PoisonDebuff)
+    fighter.add_status(Buffs.PoisonDebuff(stacks=3))
+    assert fighter.buffs.get(Buffs.PoisonDebuff) is poison and fighter.buffs.stacks(Buffs.PoisonDebuff) == 5
+    fighter.add_status(Buffs.PoisonDebuff(stacks=10**3))
+    assert poison.stacks == poison.max_stacks
+    assert fighter.buffs.stacks(Buffs.FrenzyBuff) == 0
+
+
+def test_reapplying_an_unstackable_buff_refreshes_its_duration():
+    fighter = _fighter()
+    fighter.add_status(Buffs.FrenzyBuff())
+    frenzy = fighter.buffs.get(Buffs.FrenzyBuff)
+    frenzy.remaining = 1.0
+    fighter.add_status(Buffs.FrenzyBuff())
+    assert frenzy.stacks == 1 and frenzy.remaining == Buffs.FrenzyBuff.duration
+
+
+def test_attack_disabled_counts_every_disabling_buff():
+    stun, hold = Buffs.StunDebuff(), Buffs.AttackDisabledBuff(None)
+    buffs = BuffContainer([_Plain(), stun, hold])
+    assert buffs.attack_disabled
+    buffs.remove(stun)
+    assert buffs.attack_disabled
+    buffs.remove(hold)
+    assert not buffs.attack_disabled
+    buffs.add(stun)
+    buffs.clear()
+    assert not buffs.attack_disabled and len(buffs) == 0
+
+
+def test_sunder_and_frenzy_stats_follow_stacks_and_removal():
+    fighter = _fighter()
+    defense, attack_speed, interval = fighter.defense, fighter.attack_speed, fighter.attack_interval
+    fighter.add_status(Buffs.SunderDebuff(stacks=3))
+    fighter.add_status(Buffs.SunderDebuff(stacks=2))
+    assert fighter.defense == defense - 5
+    fighter.add_status(Buffs.FrenzyBuff())
+    assert fighter.attack_speed == pytest.approx(attack_speed * 2) and fighter.attack_interval == pytest.approx(interval / 2)
+    fighter.remove_buff(fighter.buffs.get(Buffs.SunderDebuff))
+    fighter.remove_buff(fighter.buffs.get(Buffs.FrenzyBuff))
+    assert fighter.defense == defense and fighter.attack_speed == pytest.approx(attack_speed)
+    assert fighter.attack_interval == pytest.approx(interval)
@@ -0,0 +1,32 @@
+import threading
+
+import build_optimizer
+import simulator
+
+
+def _optimizer(build, seed=1):
+    with build_optimizer._quiet():
+        player = simulator.build_player(build)
+    groups = build_optimizer.floor_enemy_groups(build_optimizer.load_dungeon_data("sunstone_ruins"), 1)
+    return build_optimizer.BuildOptimizer(player, groups, seed=seed)
+
+
+def test_search_finishes_when_fewer_loadouts_than_budget():
+    # 4 件装备 + 1 个天赋，合法配装远少于 budget；以前会一直重启下去
+    optimizer = _optimizer({"level": 3, "equipment": ["IronSword", "WoodenSword", "WoodenArmor", "IronRing"],
+                            "talents": ["DualWieldTalent"]})
+    result = []
+    worker = threading.Thread(target=lambda: result.append(optimizer.search(budget=100)), daemon=True)
+    worker.start()
+    worker.join(timeout=30)
+    assert not worker.is_alive(), "search() 在配装数量少于 budget 时没有结束"
+    ranked = result[0]
+    assert 0 < len(ranked) < 100
+    assert len({loadout for loadout, _ in ranked}) == len(ranked)
+    assert [score for _, score in ranked] == sorted((score for _, score in ranked), reverse=True)
+
+
+def test_search_respects_budget():
+    optimizer = _optimizer({"level": 3, "equipment": ["IronSword", "WoodenSword", "WoodenArmor", "IronRing"],
+                            "talents": ["DualWieldTalent"]})
+    assert len(optimizer.search(budget=2)) == 2
@@ -0,0 +1,131 @@
+import contextlib
+import io
+
+import pytest
+
+import Buffs
+import Equips
+import Talents
+import simulator
+
+
+def _player(build=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return simulator.build_player(build or {})
+
+
+def _owners(player, source, name):
+    return [hook.__self__ for hook in player.hooks(source, name)]
+
+
+def test_hook_tables_are_cached_until_the_owners_change():
+    player = _player()
+    assert player.hooks("equipment", "after_attack") is player.hooks("equipment", "after_attack")
+    sword = Equips.Plaguebringer()
+    with contextlib.redirect_stdout(io.StringIO()):
+        player.equip(sword)
+        assert _owners(player, "equipment", "after_attack") == [sword]
+        player.unequip(sword)
+        assert _owners(player, "equipment", "after_attack") == []
+
+        talent = Talents.ThousandWorldTalent()
+        player.learn_talent(talent); player.equip_talent(talent)
+        assert talent in _owners(player, "talents", "on_attack")
+        player.unequip_talent(talent)
+        assert talent not in _owners(player, "talents", "on_attack")
+
+    regen = Buffs.RegenerationBuff()
+    player.add_buff(regen)
+    assert regen in _owners(player, "buffs", "on_tick")
+    player.remove_buff(regen)
+    assert regen not in _owners(player, "buffs", "on_tick")
+
+
+def test_only_overridden_hooks_are_dispatched():
+    with contextlib.redirect_stdout(io.StringIO()):
+        player = _player({"equipment": ["WoodenArmor"], "talents": ["DualWieldTalent"]})
+    # 木甲和二刀流没有重写这些钩子，基类的空实现不进表
+    assert player.hooks("equipment", "after_attack") == () and player.hooks("talents", "on_attack") == ()
+
+
+def test_direct_slot_edits_are_picked_up_on_entering_combat():
+    player = _player()
+    assert player.hooks("equipment", "after_attack") == ()
+    sword = Equips.Plaguebringer()
+    player.slots["weapon"][0] = sword  # 界面直接改槽位，没有经过 equip
+    player.on_enter_combat()
+    assert _owners(player, "equipment", "after_attack") == [sword]
+
+
+STATS = ("max_hp", "hp", "attack", "defense", "magic_resist", "attack_speed", "attack_interval", "crit_chance", "damage_resistance")
+
+
+def _stats(fighter):
+    return {stat: getattr(fighter, stat) for stat in STATS}
+
+
+def test_clone_is_independent_of_the_original():
+    player = _player({"level": 3, "equipment": ["WoodenSword", "WoodenArmor"], "talents": ["Brawler", "DualWieldTalent"]})
+    player.add_buff(Buffs.SunderDebuff(stacks=2))
+    before = _stats(player)
+    twin = player.clone()
+    assert _stats(twin) == before
+
+    sword = next(eq for eq in twin.all_equipment if isinstance(eq, Equips.WoodenSword))
+    sword._count = 5
+    twin.buffs.get(Buffs.SunderDebuff).stacks = 9
+    twin.SLOT_CAPACITY["weapon"] = 3
+    twin.add_modifier("attack", "test", flat=100)
+    twin.recalculate_stats()
+    with contextlib.redirect_stdout(io.StringIO()): twin.unequip(next(eq for eq in twin.all_equipment if isinstance(eq, Equips.WoodenArmor)))
+    twin.hp = 1
+
+    assert _stats(player) == before
+    assert next(eq for eq in player.all_equipment if isinstance(eq, Equips.WoodenSword))._count == 0
+    assert player.buffs.stacks(Buffs.SunderDebuff) == 2 and player.SLOT_CAPACITY["weapon"] == 2
+    assert sword not in player.all_equipment and len(player.all_equipment) == 2
+
+
+def test_enemies_from_the_same_prototype_do_not_share_state():
+    from combat_engine import create_enemy
+    enemy_data = simulator.load_enemy_data()
+    first = create_enemy("goblin_captain", enemy_data["goblin_captain"])
+    first.add_buff(Buffs.FrenzyBuff())
+    first.hp = 1
+    second = create_enemy("goblin_captain", enemy_data["goblin_captain"])
+    assert second.hp == second.max_hp and Buffs.FrenzyBuff not in second.buffs
+    assert second.attack_speed == pytest.approx(first.attack_speed / 2)
+
+
+LOADOUTS = [
+    (["IronSword", "WoodenSword", "WoodenArmor", "IronRing", "PhoenixCrown"], ["DualWieldTalent", "GlassCannon"]),
+    (["IronSword", "WoodenShield", "NaturalNecklace", "AdventurersPouch"], ["Brawler", "Giant"]),
+    (["Plaguebringer", "IronSword", "SlimeSword", "TowerShield"], ["TripleWieldTalent", "MagicShield"]),
+]
+
+
+def _equipped(fighter):
+    return {slot: [type(eq).__name__ if eq else None for eq in items] for slot, items in fighter.slots.items()}
+
+
+@pytest.mark.parametrize("items, talents", LOADOUTS)
+def test_batch_loadout_matches_equipping_one_by_one(items, talents, monkeypatch):
+    from content_registry import ITEMS, TALENTS
+    sequential, batched = _player({"level": 5}), _player({"level": 5})
+    with contextlib.redirect_stdout(io.StringIO()):
+        seq_leftovers = []
+        for name in talents:
+            talent = TALENTS.create(name)
+            sequential.learn_talent(talent); sequential.equip_talent(talent)
+        for name in items:
+            replaced = sequential.equip(ITEMS.create(name))
+            if replaced is not None: seq_leftovers.append(replaced)
+
+        recalcs = []  # 块内的 recalculate_stats 只记一笔就返回，真正的同步只在块结束时做一次
+        sync = type(batched)._sync_item_modifiers
+        monkeypatch.setattr(type(batched), "_sync_item_modifiers", lambda self: recalcs.append(self) or sync(self))
+        leftovers = batched.apply_loadout([ITEMS.create(name) for name in items], [TALENTS.create(name) for name in talents])
+    assert len(recalcs) == 1  # 整套配装只重算一次
+    assert _stats(batched) == pytest.approx(_stats(sequential))
+    assert _equipped(batched) == _equipped(sequential) and batched.SLOT_CAPACITY == sequential.SLOT_CAPACITY
+    assert [type(eq).__name__ for eq in leftovers] == [type(eq).__name__ for eq in seq_leftovers]
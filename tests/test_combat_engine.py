@@ -0,0 +1,82 @@
+import contextlib
+import io
+import random
+
+import pytest
+
+import Buffs
+import combat_engine
+import simulator
+from Character import Character
+from combat_engine import CombatEngine, create_enemy
+from damage import DamagePacket, DamageType
+
+
+def _fighter(name, attack_speed, hp=10**6):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Character(name, hp=hp, defense=0, magic_resist=0, attack=1, attack_speed=attack_speed)
+
+
+def _first_swing(player, enemy, stun):
+    engine = CombatEngine(player, enemy, max_duration=20)
+    engine.start()
+    player.add_status(Buffs.StunDebuff(stun))
+    while engine.elapsed < 20:
+        for attacker, _ in engine.step(engine.next_event_delay() + combat_engine.EVENT_EPSILON):
+            if attacker is player: return engine.elapsed
+    return None
+
+
+@pytest.mark.parametrize("enemy_speed", [0.0001, 60])
+def test_stunned_time_does_not_count_toward_cooldown(enemy_speed):
+    # 眩晕在一步中间结束时，眩晕的那段不能算进冷却；对手闲着（一步跨过整个眩晕）和忙着结果要一样
+    player = _fighter("player", 6 / 5.71)
+    swing = _first_swing(player, _fighter("enemy", enemy_speed), stun=3.0)
+    assert swing == pytest.approx(3.0 + player.attack_interval, abs=0.05)
+
+
+def _rebuild_peek(fighters, now):
+    """不做增量，直接询问所有计时源得到的最早到期时间。"""
+    best = None
+    for fighter in fighters:
+        if fighter.hp <= 0: continue
+        delays = [fighter.next_attack_in()]
+        for source in ("buffs", "items"):
+            delays += [next_tick_in() for next_tick_in in fighter.hooks(source, "next_tick_in")]
+        for delay in delays:
+            if delay is not None and (best is None or now + delay < best): best = now + delay
+    return best
+
+
+def test_incremental_scheduler_matches_full_rebuild(monkeypatch):
+    checked = []
+    next_event_delay = CombatEngine.next_event_delay
+
+    def checked_next_event_delay(self):
+        delay = next_event_delay(self)
+        event = self.scheduler.peek()
+        expected = _rebuild_peek(self.fighters, self.elapsed)
+        assert (event is None) == (expected is None)
+        if event is not None: assert event[0] == pytest.approx(expected, abs=1e-7)
+        checked.append(delay)
+        return delay
+
+    monkeypatch.setattr(CombatEngine, "next_event_delay", checked_next_event_delay)
+    build = {"level": 5, "equipment": ["IronSword", "WoodenSword", "WoodenArmor", "IronRing"], "talents": ["DualWieldTalent"]}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for enemy_id, preset in simulator.load_enemy_data().items():
+            random.seed(enemy_id)
+            CombatEngine(simulator.build_player(build), create_enemy(enemy_id, preset)).run()
+    assert checked
+
+
+def test_phoenix_threshold_triggers_on_the_damage_event():
+    with contextlib.redirect_stdout(io.StringIO()):
+        wearer = simulator.build_player({"level": 3, "equipment": ["PhoenixCrown", "NaturalNecklace"]})
+        engine = CombatEngine(wearer, _fighter("enemy", 0.0001))
+        engine.start()
+        engine.step(combat_engine.EVENT_EPSILON)  # 第一次 tick：属性转换
+        wearer.take_damage(DamagePacket(amount=wearer.hp - wearer.max_hp * 0.1, damage_type=DamageType.TRUE))
+    # 不用等下一个计时事件，这一击结算完就进入第二阶段
+    names = [type(buff).__name__ for buff in wearer.buffs]
+    assert "PhoenixCrownStage2Buff" in names and "PhoenixCrownStage1Buff" not in names
@@ -0,0 +1,48 @@
+import inspect
+import random
+
+import pytest
+
+import Equips
+import Talents
+from content_registry import ITEMS, TALENTS
+
+
+def _scan(module, base_class):
+    """以前的做法：遍历模块、逐个实例化。"""
+    return [(cls, cls()) for _, cls in inspect.getmembers(module, inspect.isclass) if issubclass(cls, base_class) and cls is not base_class]
+
+
+@pytest.mark.parametrize("filters", [{}, {"rarity": "rare"}, {"slot": "weapon"}, {"rarity": "common", "slot": "armor"},
+                                     {"type": "weapon", "exclude": ("IronSword",)}, {"rarity": "legendary", "slot": "nowhere"}])
+def test_select_matches_scanning_the_module(filters):
+    exclude = filters.get("exclude", ())
+    expected = tuple(cls for cls, probe in _scan(Equips, Equips.Equipment)
+                     if all(getattr(probe, field, "common" if field == "rarity" else None) == value
+                            for field, value in filters.items() if field != "exclude")
+                     and cls.__name__ not in exclude)
+    assert ITEMS.select(**filters) == expected
+    assert ITEMS.select(**filters) is ITEMS.select(**filters)  # 同样的条件只筛选一次
+
+
+def test_tier_and_upgrade_follow_the_upgrade_map():
+    for base, upgraded in Equips.UPGRADE_MAP.items():
+        assert ITEMS.info(base).upgrade is upgraded and ITEMS.info(upgraded).base is base
+        assert ITEMS.info(upgraded).tier == ITEMS.info(base).tier + 1
+    upgraded = set(Equips.UPGRADE_MAP.values())
+    assert set(ITEMS.select(tier=0)) == set(ITEMS.classes) - upgraded
+    assert all(ITEMS.info(cls).upgrade is None for cls in ITEMS.classes if cls not in Equips.UPGRADE_MAP)
+
+
+def test_lookup_by_name():
+    assert TALENTS.get("DualWieldTalent") is Talents.DualWieldTalent and "DualWieldTalent" in TALENTS
+    assert isinstance(TALENTS.create("DualWieldTalent"), Talents.DualWieldTalent)
+    assert TALENTS.create("NoSuchTalent") is None and ITEMS.get("NoSuchItem") is None
+    assert ITEMS.info("WoodenSword") is ITEMS.info(Equips.WoodenSword)
+    assert len(TALENTS) == len(_scan(Talents, Talents.Talent))
+
+
+def test_choice_draws_like_the_old_module_scan():
+    pool = [cls for cls, probe in _scan(Equips, Equips.Equipment) if getattr(probe, "rarity", "common") == "rare"]
+    assert ITEMS.choice(random.Random(3), rarity="rare") is random.Random(3).choice(pool)
+    assert ITEMS.choice(random.Random(3), slot="nowhere") is None
@@ -0,0 +1,50 @@
+import json
+import random
+
+import pygame
+
+import build_optimizer
+from dungeon_layout import FloorLayout, generate_layout
+from rng import seeded_stream
+
+
+def _floor_data(floor=1):
+    dungeon = build_optimizer.load_dungeon_data("sunstone_ruins")
+    return next(pool for pool in dungeon["floor_pools"] if floor in pool["floors"])
+
+
+def _snapshot(layout):
+    return [(room.x, room.y, room.type, room.is_corridor, room.doors, room.is_cleared, room.monsters) for room in layout.rooms]
+
+
+def test_same_seed_same_layout():
+    a = generate_layout(10, _floor_data(), seeded_stream(17))
+    b = generate_layout(10, _floor_data(), seeded_stream(17))
+    assert _snapshot(a) == _snapshot(b)
+    assert a.validate() == []
+
+
+def test_to_data_round_trip_keeps_progress():
+    layout = generate_layout(10, _floor_data(), seeded_stream(4))
+    cleared = next(room for room in layout.rooms if room.monsters)
+    cleared.is_cleared, cleared.monsters = True, cleared.monsters[1:]
+    # 写成 JSON 再读回来：元组会变成列表，读出来的布局要和原来完全一样
+    twin = FloorLayout.from_data(json.loads(json.dumps(layout.to_data())))
+    assert _snapshot(twin) == _snapshot(layout)
+    assert (twin.start_room.x, twin.start_room.y) == (layout.start_room.x, layout.start_room.y)
+    assert twin.room_at(*cleared.world_rect.center).is_cleared
+
+
+def test_grid_lookups_match_scanning_every_room():
+    layout = generate_layout(10, _floor_data(), seeded_stream(23))
+    rng = random.Random(5)
+    left = min(room.world_rect.left for room in layout.rooms) - 500
+    top = min(room.world_rect.top for room in layout.rooms) - 500
+    right = max(room.world_rect.right for room in layout.rooms) + 500
+    bottom = max(room.world_rect.bottom for room in layout.rooms) + 500
+    for _ in range(500):
+        x, y = rng.randrange(left, right), rng.randrange(top, bottom)
+        inside = [room for room in layout.rooms if room.world_rect.collidepoint(x, y)]
+        assert layout.room_at(x, y) is (inside[0] if inside else None)
+        rect = pygame.Rect(x, y, rng.randrange(1, 2500), rng.randrange(1, 1500))
+        assert layout.rooms_touching(rect) == [room for room in layout.rooms if room.world_rect.colliderect(rect)]
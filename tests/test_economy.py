@@ -0,0 +1,39 @@
+import contextlib
+import io
+
+import pytest
+
+import economy
+import simulator
+from content_registry import ITEMS
+from Equips import UPGRADE_MAP
+
+# 每件物品分别在 "没有 / 已有同名 / 已有升级版" 三种背包里被捡到
+CASES = ([(cls, None) for cls in ITEMS.classes] + [(cls, cls) for cls in ITEMS.classes]
+         + [(cls, upgraded) for cls, upgraded in UPGRADE_MAP.items()])
+
+
+def _character_pickup(cls, owned):
+    with contextlib.redirect_stdout(io.StringIO()):
+        player = simulator.build_player({})
+        player.backpack = [owned()] if owned else []
+        player.gold = player.refinement_crystals = 0
+        player.pickup_item(cls())
+    return len(player.backpack) > (1 if owned else 0), player.gold, player.refinement_crystals
+
+
+def _economy_pickup(cls, owned):
+    state = economy.RunState([owned.__name__] if owned else [])
+    state.pickup(cls)
+    return cls in state.owned and state.floor["new_items"] == 1, state.floor["gold"], state.crystals
+
+
+@pytest.mark.parametrize("cls, owned", CASES, ids=lambda value: getattr(value, "__name__", "empty"))
+def test_pickup_conversion_matches_character(cls, owned):
+    assert _economy_pickup(cls, owned) == _character_pickup(cls, owned)
+
+
+def test_simulation_is_deterministic_for_a_fixed_seed():
+    first = economy.simulate_economy(300, floors=[1, 2], seed=4)
+    assert economy.simulate_economy(300, floors=[1, 2], seed=4) == first
+    assert economy.simulate_economy(300, floors=[1, 2], seed=5) != first
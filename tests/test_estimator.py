@@ -0,0 +1,36 @@
+import contextlib
+import io
+
+import pytest
+
+import estimator
+import simulator
+from Character import Character
+from combat_engine import CombatEngine
+
+
+def _player(equipment):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return simulator.build_player({"level": 3, "equipment": equipment})
+
+
+@pytest.mark.parametrize("sword", ["WoodenSword", "WoodenSword_Star"])
+def test_normal_attack_damage_matches_the_engine(sword):
+    # 木剑靠 after_attack 计数，普攻不触发它，估算也不能把第 4 击双倍算进去
+    player = _player([sword])
+    with contextlib.redirect_stdout(io.StringIO()):
+        dummy = Character("dummy", hp=10**6, defense=0, magic_resist=0, attack=0, attack_speed=0.0001)
+    player.crit_chance = 0.0
+    engine = CombatEngine(player, dummy, max_duration=player.attack_interval * 12.5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.run()
+    per_hit = player.attack * (1 - dummy.defense / (dummy.defense + 100))
+    assert dummy.max_hp - dummy.hp == 12 * int(per_hit)  # 12 次普攻，没有一次翻倍
+    profile = estimator.profile(player)
+    assert profile.hit_mult == 1.0
+    dps, _ = estimator.time_to_kill(profile, estimator.profile(dummy))
+    assert dps * player.attack_interval == pytest.approx(per_hit)
+
+
+def test_wooden_armor_reduces_expected_physical_damage():
+    assert estimator.profile(_player(["WoodenArmor"])).physical_taken == pytest.approx(1 - 0.3 * 0.3)
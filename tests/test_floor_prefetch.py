@@ -0,0 +1,64 @@
+import functools
+import threading
+
+import pygame
+
+import floor_prefetch
+import layout_cache
+from floor_prefetch import FloorPrefetcher
+from rng import RunRNG
+from tests.test_dungeon_layout import _floor_data, _snapshot
+
+prepare_floor = floor_prefetch.prepare_floor
+
+
+def _floor_key(floor):
+    chunks = {key: pygame.image.tostring(chunk, "RGB") for key, chunk in floor.static_layer.chunks.items()}
+    doors = sorted(tuple(door.rect) for door in floor.door_sprites)
+    walls = sorted(tuple(wall.rect) for wall in floor.wall_sprites)
+    room_doors = {(room.x, room.y): sorted(tuple(door.rect) for door in doors_) for room, doors_ in floor.room_doors.items()}
+    return _snapshot(floor.layout), doors, walls, room_doors, chunks
+
+
+def _use_cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(layout_cache, "load_layout", functools.partial(layout_cache.load_layout, cache_dir=str(tmp_path)))
+
+
+def _on_the_spot(rng, floor_number):
+    return _floor_key(prepare_floor("sunstone_ruins", floor_number, _floor_data(floor_number),
+                                    floor_prefetch.floor_seed(rng, "sunstone_ruins", floor_number)))
+
+
+def test_prefetched_floor_equals_on_the_spot_generation(tmp_path, monkeypatch):
+    _use_cache_dir(monkeypatch, tmp_path)
+    rng, prefetcher = RunRNG(41), FloorPrefetcher()
+    prefetcher.prefetch(rng, "sunstone_ruins", 2, _floor_data(2))
+    prefetched = prefetcher.take(rng, "sunstone_ruins", 2, _floor_data(2))
+    assert prefetcher._future is None  # 取走后不再占着
+    assert _floor_key(prefetched) == _on_the_spot(rng, 2)
+    assert _floor_key(prefetcher.take(RunRNG(42), "sunstone_ruins", 2, _floor_data(2))) == _on_the_spot(RunRNG(42), 2)
+
+
+def test_retarget_cancels_the_queued_floor(tmp_path, monkeypatch):
+    _use_cache_dir(monkeypatch, tmp_path)
+    gate, started = threading.Event(), []
+
+    def gated_prepare_floor(dungeon_id, floor_number, *args, **kwargs):
+        started.append(floor_number)
+        if len(started) == 1: assert gate.wait(10)  # 第一层卡住，后面提交的只能排队
+        return prepare_floor(dungeon_id, floor_number, *args, **kwargs)
+
+    monkeypatch.setattr(floor_prefetch, "prepare_floor", gated_prepare_floor)
+    rng, prefetcher = RunRNG(7), FloorPrefetcher()
+    prefetcher.prefetch(rng, "sunstone_ruins", 1, _floor_data(1))
+    prefetcher.prefetch(rng, "sunstone_ruins", 2, _floor_data(2))
+    queued = prefetcher._future
+    prefetcher.prefetch(rng, "sunstone_ruins", 3, _floor_data(3))  # 换目标：排着队的第 2 层被取消
+    assert queued.cancelled()
+    gate.set()
+    floor = prefetcher.take(rng, "sunstone_ruins", 3, _floor_data(3))
+    assert started == [1, 3]
+    assert _floor_key(floor) == _on_the_spot(rng, 3)
+    # 被取消的楼层在真正进入时当场生成，结果一样
+    assert _floor_key(prefetcher.take(rng, "sunstone_ruins", 2, _floor_data(2))) == _on_the_spot(rng, 2)
+    assert started == [1, 3, 2]
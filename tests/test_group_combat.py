@@ -0,0 +1,98 @@
+import contextlib
+import functools
+import io
+
+import pygame
+import pytest
+
+import Buffs
+import layout_cache
+import simulator
+import states.combat
+from Character import Character
+from combat_engine import CombatEngine, first_alive, lowest_hp
+from conftest import ROOT_DIR
+
+
+def _fighter(name, hp=100, attack=1, attack_speed=1.0):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Character(name, hp=hp, defense=0, magic_resist=0, attack=attack, attack_speed=attack_speed)
+
+
+def _run(player, enemies, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return CombatEngine(player, enemies, **kwargs).run()
+
+
+def test_player_beats_the_whole_room():
+    player = _fighter("player", hp=10**6, attack=50, attack_speed=6)
+    enemies = [_fighter(f"enemy{i}", hp=100 + 50 * i) for i in range(3)]
+    result = _run(player, enemies)
+    assert result.winners == [player] and result.losers == enemies and result.loser is enemies[0]
+    assert all(enemy.hp <= 0 for enemy in enemies) and not result.timed_out
+
+
+def test_every_enemy_in_the_room_attacks_until_the_player_falls():
+    player = _fighter("player", hp=200, attack_speed=0.0001)
+    enemies = [_fighter(f"enemy{i}", attack=5, attack_speed=3) for i in range(3)]
+    engine = CombatEngine(player, enemies)
+    with contextlib.redirect_stdout(io.StringIO()): result = engine.run()
+    assert result.winners == enemies and result.losers == [player] and result.winner is enemies[0]
+    assert all(enemy.current_opponent is None for enemy in enemies)  # finish() 解除了对手引用
+
+
+def _targets(policy, enemy_hp):
+    player = _fighter("player", hp=10**6, attack=40, attack_speed=6)
+    enemies = [_fighter(f"enemy{i}", hp=hp, attack_speed=0.0001) for i, hp in enumerate(enemy_hp)]
+    engine = CombatEngine(player, enemies, target_policy=policy)
+    order = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.start()
+        while not engine.is_over:
+            if player.current_opponent not in order: order.append(player.current_opponent)
+            engine.step(engine.next_event_delay() + 1e-6)
+    return [enemies.index(enemy) for enemy in order]
+
+
+def test_first_alive_focuses_enemies_in_order():
+    assert _targets(first_alive, [300, 100, 200]) == [0, 1, 2]
+
+
+def test_lowest_hp_finishes_the_weakest_first():
+    assert _targets(lowest_hp, [300, 100, 200]) == [1, 2, 0]
+
+
+def test_sunfire_aura_burns_every_opponent():
+    with contextlib.redirect_stdout(io.StringIO()):
+        player = simulator.build_player({"level": 3, "talents": ["SunfireAura"]})
+        enemies = [_fighter(f"enemy{i}") for i in range(3)]
+        CombatEngine(player, enemies).start()
+    assert all(enemy.buffs.get(Buffs.SunfireAuraDebuff) for enemy in enemies)
+
+
+def test_room_is_cleared_after_one_encounter(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT_DIR)
+    monkeypatch.setattr(layout_cache, "load_layout", functools.partial(layout_cache.load_layout, cache_dir=str(tmp_path)))
+    monkeypatch.setattr(states.combat, "RECORD_REPLAYS", False)
+    from game import Game
+    from states.dungeon_screen import DungeonScreen
+    with contextlib.redirect_stdout(io.StringIO()):
+        game = Game()
+        game.save_to_slot = lambda slot: None
+        game.player = simulator.build_player({"level": 8, "base_stats": {"attack": 10**5, "hp": 10**6}})
+        dungeon = DungeonScreen(game)
+        game.state_stack.append(dungeon)
+        room = next(r for r in dungeon.logical_rooms if len(r.monsters) > 1)
+        dungeon.current_room = room
+        monster = next(s for s in dungeon.monster_sprites if s.uid == room.monsters[0]["uid"])
+        dungeon.player_sprite.rect.center = monster.rect.center
+        dungeon._check_interactions()
+        combat = game.state_stack[-1]
+        assert len(combat.engine.enemies) == len(room.monsters)  # 整个房间一场打完
+        for _ in range(1000):
+            combat._handle_attacks(0.2); combat._check_battle_end()
+            if combat.battle_ended: break
+        combat._handle_battle_end(combat.END_DELAY)
+    assert room.is_cleared and room.monsters == []
+    assert not any(dungeon.room_monsters.get(room, ()))
+    pygame.quit()
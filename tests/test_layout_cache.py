@@ -0,0 +1,38 @@
+import os
+
+import layout_cache
+from tests.test_dungeon_layout import _floor_data, _snapshot
+
+
+def _no_generate(*args):
+    raise AssertionError("有缓存时不应重新生成")
+
+
+def test_cache_path_changes_with_every_key_part(tmp_path):
+    floor_data = _floor_data()
+    base = layout_cache.cache_path("sunstone_ruins", 1, 99, floor_data, 10, str(tmp_path))
+    assert base == layout_cache.cache_path("sunstone_ruins", 1, 99, dict(floor_data), 10, str(tmp_path))
+    changed = dict(floor_data, monster_pool=["slime"])
+    others = [layout_cache.cache_path("forest", 1, 99, floor_data, 10, str(tmp_path)),
+              layout_cache.cache_path("sunstone_ruins", 2, 99, floor_data, 10, str(tmp_path)),
+              layout_cache.cache_path("sunstone_ruins", 1, 98, floor_data, 10, str(tmp_path)),
+              layout_cache.cache_path("sunstone_ruins", 1, 99, changed, 10, str(tmp_path)),
+              layout_cache.cache_path("sunstone_ruins", 1, 99, floor_data, 8, str(tmp_path))]
+    assert base not in others and len(set(others)) == len(others)
+
+
+def test_second_load_reads_the_cached_layout(tmp_path, monkeypatch):
+    floor_data = _floor_data()
+    first = layout_cache.load_layout("sunstone_ruins", 1, floor_data, 123, cache_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == [os.path.basename(layout_cache.cache_path("sunstone_ruins", 1, 123, floor_data, 10, str(tmp_path)))]
+    monkeypatch.setattr(layout_cache, "generate_layout", _no_generate)
+    second = layout_cache.load_layout("sunstone_ruins", 1, floor_data, 123, cache_dir=str(tmp_path))
+    assert _snapshot(second) == _snapshot(first)
+
+
+def test_corrupt_cache_falls_back_to_generating(tmp_path):
+    floor_data = _floor_data()
+    path = layout_cache.cache_path("sunstone_ruins", 1, 5, floor_data, 10, str(tmp_path))
+    with open(path, "w", encoding="utf-8") as f: f.write("{not json")
+    layout = layout_cache.load_layout("sunstone_ruins", 1, floor_data, 5, cache_dir=str(tmp_path))
+    assert layout.validate() == []
@@ -0,0 +1,41 @@
+import collections
+import random
+
+import pytest
+
+from content_registry import ITEMS
+from loot_sampler import AliasTable, DropTable, ItemSampler
+
+
+def test_alias_table_matches_weights():
+    table = AliasTable("abcd", [1, 2, 3, 0])
+    counts = collections.Counter(table.draw_many(random.Random(1), 60000))
+    assert "d" not in counts  # 权重为 0 的项永远抽不到
+    for outcome, weight in zip("abc", [1, 2, 3]):
+        assert counts[outcome] / 60000 == pytest.approx(weight / 6, abs=0.01)
+
+
+def test_draw_many_equals_repeated_draw():
+    table = AliasTable(range(7), [5, 1, 1, 3, 0.5, 2, 8])
+    a, b = random.Random(3), random.Random(3)
+    assert table.draw_many(a, 500) == [table.draw(b) for _ in range(500)]
+
+
+def test_alias_table_needs_a_positive_weight():
+    with pytest.raises(ValueError):
+        AliasTable("ab", [0, 0])
+
+
+def test_drop_table_combines_independent_chances():
+    table = DropTable([{"item_class_name": "A", "chance": 0.5}, {"item_class_name": "B", "chance": 0.2}])
+    draws = table.draw_many(random.Random(5), 40000)
+    assert sum("A" in d for d in draws) / 40000 == pytest.approx(0.5, abs=0.01)
+    assert sum("B" in d for d in draws) / 40000 == pytest.approx(0.2, abs=0.01)
+    assert sum(d == ("A", "B") for d in draws) / 40000 == pytest.approx(0.1, abs=0.01)
+
+
+def test_item_sampler_draws_distinct_classes_of_configured_rarities():
+    sampler = ItemSampler({"item_count": 3, "rarity_weights": {"common": 1}})
+    chosen = sampler.draw_distinct(random.Random(2))
+    assert len(chosen) == len(set(chosen)) == 3
+    assert all(ITEMS.info(cls).rarity == "common" for cls in chosen)
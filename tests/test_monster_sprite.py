@@ -0,0 +1,18 @@
+import random
+
+import pygame
+
+from monster_sprite import Monster
+from rng import seeded_stream
+
+
+def _wander(seed):
+    monster = Monster({"id": "slime", "uid": "m1", "pos": (400, 300)}, pygame.Rect(0, 0, 800, 600), seeded_stream(seed))
+    random.seed()  # 全局 random 的状态不应影响结果
+    monster.fast_forward(8.0)
+    return monster.rect.center, monster.ai_state, monster.ai_timer, monster.target_pos
+
+
+def test_fast_forward_draws_from_the_injected_stream():
+    assert _wander(7) == _wander(7)
+    assert _wander(7) != _wander(8)
@@ -0,0 +1,43 @@
+import contextlib
+import io
+import random
+
+import Equips
+import simulator
+from combat_engine import CombatEngine, create_enemy
+from profiler import HookProfiler
+
+
+def _counting(monkeypatch, cls, name, counts):
+    method = getattr(cls, name)
+    def counted(self, *args):
+        counts[name] = counts.get(name, 0) + 1
+        return method(self, *args)
+    monkeypatch.setattr(cls, name, counted)
+
+
+def test_profiler_counts_every_hook_call(monkeypatch):
+    counts = {}
+    for name in ("on_battle_start", "on_critical", "on_non_critical"): _counting(monkeypatch, Equips.IronSword, name, counts)
+    profiler = HookProfiler()
+    with contextlib.redirect_stdout(io.StringIO()):
+        player = simulator.build_player({"level": 3, "equipment": ["IronSword"], "talents": ["ThousandWorldTalent"]})
+        enemy_data = simulator.load_enemy_data()
+        for seed in range(3):
+            random.seed(seed)
+            CombatEngine(player, create_enemy("goblin_captain", enemy_data["goblin_captain"]), profiler=profiler).run()
+    calls = {key.rsplit(".", 1)[1]: value[0] for key, value in profiler.as_dict().items() if ".IronSword." in key}
+    assert counts["on_battle_start"] == 3 and calls == counts
+    assert all(own <= total for _, total, own in profiler.as_dict().values())
+    # 战斗结束后撤下分析器，钩子表里又是原始的绑定方法
+    assert all(hook.__func__ is Equips.IronSword.on_battle_start for hook in player.hooks("items", "on_battle_start"))
+
+
+def test_merge_adds_up_counts():
+    first, second = HookProfiler(), HookProfiler()
+    for profiler, times in ((first, 2), (second, 3)):
+        hook = profiler.wrap(Equips.IronSword(), "on_critical", lambda *args: None)
+        for _ in range(times): hook()
+    first.merge(second.as_dict())
+    (calls, _, _), = first.as_dict().values()
+    assert calls == 5 and "IronSword.on_critical" in first.report()
@@ -0,0 +1,93 @@
+import contextlib
+import io
+import json
+import random
+import struct
+
+import pytest
+
+import replay
+import simulator
+from combat_engine import CombatEngine, create_enemies
+from rng import seeded_stream
+
+BUILDS = [
+    {"level": 3, "equipment": ["IronSword", "WoodenSword", "WoodenArmor", "IronRing"], "talents": ["DualWieldTalent"]},
+    {"level": 5, "equipment": ["PhoenixCrown", "NaturalNecklace", "AdventurersPouch"], "talents": ["Brawler", "GlassCannon"],
+     "attributes": {"strength": 4, "dexterity": 6}},
+]
+
+
+def _record(build, enemy_ids, seed, path, prepare=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        player = simulator.build_player(build)
+        if prepare: prepare(player)
+        player.gold = 130
+        player.add_modifier("base_attack", object(), flat=5, label="武器强化")
+        player.recalculate_stats()
+        player.hp = player.max_hp * 0.7
+        random.seed(seed)
+        enemies = create_enemies(enemy_ids, simulator.load_enemy_data())
+        opponents = enemies if len(enemy_ids) > 1 else enemies[0]
+        enemy_id = enemy_ids if len(enemy_ids) > 1 else enemy_ids[0]
+        recorder = replay.ReplayRecorder(seed, enemy_id, player, opponents)
+        CombatEngine(player, opponents, rng=seeded_stream(seed), recorder=recorder).run()
+    return recorder.save(str(path))
+
+
+@pytest.mark.parametrize("build", BUILDS)
+@pytest.mark.parametrize("enemy_ids", [["goblin_captain"], ["slime", "goblin"]])
+def test_replay_round_trip_reproduces_the_fight(tmp_path, build, enemy_ids):
+    loaded = replay.load_replay(_record(build, enemy_ids, 11, tmp_path / "fight.crpl"))
+    engine = loaded.build_engine()
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.run()
+    assert loaded.matches(engine.recorder)
+    assert any(kind == replay.DAMAGE for kind, _, _ in loaded.iter_events())
+
+
+def _carry_sword_count(player):
+    # 木剑的计数跨战斗保留：上一场结束时已经数到 3
+    next(eq for eq in player.all_equipment if type(eq).__name__ == "WoodenSword")._count = 3
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_replay_keeps_item_counters_from_earlier_fights(tmp_path, seed):
+    build = {"level": 3, "equipment": ["WoodenSword"], "talents": ["ThousandWorldTalent"]}
+    loaded = replay.load_replay(_record(build, ["goblin_captain"], seed, tmp_path / "fight.crpl", _carry_sword_count))
+    assert loaded.fighters[0]["equipment"]["weapon"][0] == ["WoodenSword", {"_count": 3}]
+    engine = loaded.build_engine()
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.run()
+    assert loaded.matches(engine.recorder)
+
+
+@pytest.mark.parametrize("version", [1, 2, 4])
+def test_only_the_json_header_version_loads(tmp_path, version):
+    path = _record(BUILDS[0], ["slime"], 1, tmp_path / "fight.crpl")
+    with open(path, "r+b") as f:
+        f.seek(4)
+        f.write(struct.pack("<H", version))
+    with pytest.raises(ValueError):
+        replay.load_replay(path)
+
+
+def test_header_is_plain_data(tmp_path):
+    path = _record(BUILDS[1], ["slime"], 3, tmp_path / "fight.crpl")
+    with open(path, "rb") as f: data = f.read()
+    (length,) = struct.unpack_from("<I", data, 6)
+    header = json.loads(data[11:10 + length].decode("utf-8"))  # 文件头是 JSON，不再是 pickle 下来的角色
+    assert set(header) == {"seed", "enemy_id", "max_duration", "fighters"}
+    player_data = header["fighters"][0]
+    assert player_data["talents"][:2] == ["Brawler", "GlassCannon"]
+    assert ["base_attack", "武器强化", 5, 1] in player_data["modifiers"]
+
+
+def test_build_fighter_restores_stats():
+    with contextlib.redirect_stdout(io.StringIO()):
+        player = simulator.build_player(BUILDS[1])
+        player.add_modifier("base_attack", object(), flat=5, label="武器强化")
+        player.recalculate_stats()
+        twin = replay.build_fighter(replay.fighter_data(player))
+    for stat in ("max_hp", "hp", "attack", "defense", "magic_resist", "attack_speed", "crit_chance", "damage_resistance"):
+        assert getattr(twin, stat) == pytest.approx(getattr(player, stat)), stat
@@ -0,0 +1,15 @@
+import json
+
+import pytest
+
+import simulator
+
+
+@pytest.mark.parametrize("extra", [[], ["--group"]])
+def test_unknown_enemy_ids_are_rejected(tmp_path, capsys, extra):
+    build = tmp_path / "build.json"
+    build.write_text(json.dumps({"level": 1}), encoding="utf-8")
+    with pytest.raises(SystemExit) as exc:
+        simulator.main([str(build), "-n", "1", "--enemies", "slime", "slmie", *extra])
+    assert exc.value.code == 2
+    assert "slmie" in capsys.readouterr().err
@@ -0,0 +1,29 @@
+import random
+
+import pygame
+
+from spatial_hash import SpatialGroup
+
+
+class _Block(pygame.sprite.Sprite):
+    def __init__(self, x, y, w, h):
+        super().__init__()
+        self.rect = pygame.Rect(x, y, w, h)
+
+
+def test_collide_matches_spritecollide():
+    rng = random.Random(8)
+    blocks = [_Block(rng.randrange(0, 2000), rng.randrange(0, 2000), rng.randrange(5, 200), rng.randrange(5, 200)) for _ in range(300)]
+    walls = SpatialGroup(*blocks, cell_size=64)
+    probe = _Block(0, 0, 40, 40)
+    for _ in range(200):
+        probe.rect.topleft = (rng.randrange(-50, 2050), rng.randrange(-50, 2050))
+        assert walls.collide(probe.rect) == pygame.sprite.spritecollide(probe, walls, False)
+
+
+def test_removed_sprites_leave_the_index():
+    door = _Block(100, 100, 64, 64)
+    walls = SpatialGroup(door, cell_size=64)
+    assert walls.collide(pygame.Rect(120, 120, 10, 10)) == [door]
+    walls.remove(door)
+    assert walls.collide(pygame.Rect(120, 120, 10, 10)) == [] and not walls._cells
@@ -0,0 +1,119 @@
+import contextlib
+import io
+
+import pytest
+
+import Buffs
+import Equips
+import Talents
+import combat_engine
+import simulator
+from Character import Character
+from combat_engine import CombatEngine
+from stat_ledger import StatLedger
+
+
+def test_set_marks_only_the_changed_stat_dirty():
+    ledger = StatLedger()
+    ledger.set("attack", "innate", 10)
+    ledger.set("defense", "innate", 5)
+    assert ledger.pop_dirty() == {"attack", "defense"}
+    ledger.set("attack", "innate", 10)  # 数值没变
+    assert ledger.pop_dirty() == set()
+    ledger.set("attack", "buff", 2, mult=1.5)
+    assert ledger.pop_dirty() == {"attack"}
+    assert ledger.get("attack") == pytest.approx(18)
+
+
+def test_link_propagates_dirty_and_value():
+    ledger = StatLedger()
+    ledger.set("attack", "innate", 10)
+    ledger.set("base_attack", "sword", 4)
+    ledger.link("base_attack", "attack", "装备")
+    ledger.set("base_attack", "brawler", mult=1.5)
+    assert ledger.get("attack") == pytest.approx(16)
+    ledger.pop_dirty()
+    ledger.remove("sword")
+    assert ledger.pop_dirty() == {"base_attack", "attack"}
+    assert ledger.get("attack") == 10
+
+
+def test_copy_is_independent():
+    ledger = StatLedger()
+    ledger.set("attack", "innate", 10)
+    twin = ledger.copy()
+    twin.set("attack", "buff", 5)
+    assert ledger.get("attack") == 10 and twin.get("attack") == 15
+
+
+def _player(talents):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return simulator.build_player({"level": 3, "equipment": ["IronSword", "WoodenArmor"], "talents": talents})
+
+
+@pytest.mark.parametrize("talent, expected", [
+    ("Giant", {"max_hp": (1.5, 0), "attack_speed": (0.8, 0)}),
+    ("MagicShield", {"magic_resist": (1, 20)}),
+    ("GlassCannon", {"attack": (1.5, 0), "damage_resistance": (1, -0.3)}),
+])
+def test_talents_apply_their_described_effect(talent, expected):
+    plain, with_talent = _player([]), _player([talent])
+    for stat, (mult, flat) in expected.items():
+        assert getattr(with_talent, stat) == pytest.approx(getattr(plain, stat) * mult + flat), stat
+    if talent == "Giant":
+        assert with_talent.attack_interval == pytest.approx(plain.attack_interval / 0.8)
+
+
+def test_remove_drops_every_stat_of_the_source_or_only_the_given_ones():
+    ledger = StatLedger()
+    ledger.set("attack", "innate", 10)
+    ledger.set("attack", "buff", 2)
+    ledger.set("defense", "buff", mult=0.5)
+    ledger.remove("buff", ("defense",))
+    assert "buff" in ledger and ledger.get("attack") == 12
+    ledger.remove("buff")
+    assert "buff" not in ledger and ledger.get("attack") == 10
+
+
+def _in_combat(build):
+    with contextlib.redirect_stdout(io.StringIO()):
+        player = simulator.build_player(build)
+        engine = CombatEngine(player, Character("enemy", hp=10**6, defense=0, magic_resist=0, attack=1, attack_speed=0.0001))
+        engine.start()
+    return player, engine
+
+
+def test_bamboo_leaf_bonus_survives_other_buffs_expiring():
+    # 竹叶青的加成登记在账本里，别的 Buff 移除触发重算时不会被抹掉
+    player, _ = _in_combat({"level": 3, "talents": ["BambooLeafTalent"]})
+    attack, attack_speed = player.attack, player.attack_speed
+    talent = next(t for t in player.equipped_talents if isinstance(t, Talents.BambooLeafTalent))
+    talent.on_inflict_debuff(player, player.opponents[0], Buffs.PoisonDebuff(stacks=3), 3)
+    frenzy = Buffs.FrenzyBuff()
+    player.add_buff(frenzy)
+    player.remove_buff(frenzy)
+    assert player.attack == pytest.approx(attack + 3)
+    assert player.attack_speed == pytest.approx(attack_speed + 0.3)
+
+
+def test_iron_sword_crit_chance_starts_over_every_fight():
+    player, engine = _in_combat({"level": 3, "equipment": ["IronSword"]})
+    start = player.crit_chance
+    sword = next(eq for eq in player.all_equipment if isinstance(eq, Equips.IronSword))
+    for _ in range(3): sword.on_non_critical(player, None, 0)
+    assert player.crit_chance == pytest.approx(start + 0.15)
+    with contextlib.redirect_stdout(io.StringIO()):
+        CombatEngine(player, Character("enemy", hp=10, defense=0, magic_resist=0, attack=1, attack_speed=0.0001)).start()
+    assert player.crit_chance == pytest.approx(start)
+
+
+def test_phoenix_stage_one_boosts_revert_when_the_stage_ends():
+    build = {"level": 3, "equipment": ["PhoenixCrown", "NaturalNecklace"]}
+    with contextlib.redirect_stdout(io.StringIO()): plain = simulator.build_player(build)
+    player, engine = _in_combat(build)
+    engine.step(combat_engine.EVENT_EPSILON)  # 第一次 tick：属性转换
+    assert player.defense == 0 and player.attack == pytest.approx(player.base_attack + player.base_defense)
+    stage1 = next(buff for buff in player.buffs if isinstance(buff, Buffs.PhoenixCrownStage1Buff))
+    player.remove_buff(stage1)
+    assert stage1 not in player.stat_ledger
+    for stat in ("max_hp", "attack", "attack_speed", "defense"): assert getattr(player, stat) == pytest.approx(getattr(plain, stat)), stat
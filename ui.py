@@ -299,6 +299,13 @@ def format_damage_log(damage_details, action_name="效果"):
         
     return log_parts
 
+def format_effect_log(effect_name, template, *values):
+    """
+    装备 / 天赋 / Buff 触发效果的日志格式化工具：金色的 [效果名] 加上 template.format(*values)。
+    配合 battle_logger.emit 使用时，只有真正显示这一行才会执行 format。
+    """
+    return [(f"[{effect_name}] ", (255, 215, 0)), (template.format(*values), TEXT_COLOR)]
+
 def draw_text(surface, text, font, color, rect, aa=True, return_cursor_pos=False):
     """
     绘制自动换行的文本，并可选择性地返回最后一个字符后的光标位置。